@@ -0,0 +1,400 @@
+"""
+Almacenamiento en SQLite para BIODESICION.
+
+Guarda inventario, clientes, ventas, créditos y abonos en una base SQLite con
+índices sobre Caja, Cliente, Cedula y Fecha. Las ventas, los abonos, las
+cajas y los clientes se escriben con INSERT/UPDATE/DELETE de las filas
+afectadas en lugar de reescribir la tabla completa.
+
+Migración desde los CSV existentes:
+
+    python almacenamiento_sqlite.py migrar [carpeta_datos]
+"""
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from urllib.request import pathname2url
+
+import pandas as pd
+
+SQLITE_FILE = "datos/biodesicion.db"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS inventario (
+    id INTEGER PRIMARY KEY,
+    Caja TEXT NOT NULL,
+    Cantidad INTEGER NOT NULL DEFAULT 0,
+    Valor_Unitario REAL NOT NULL DEFAULT 0,
+    Cantidad_Total INTEGER NOT NULL DEFAULT 0,
+    Punto_Reorden INTEGER NOT NULL DEFAULT 2
+);
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY,
+    Nombre TEXT NOT NULL,
+    Cedula TEXT,
+    Telefono TEXT
+);
+CREATE TABLE IF NOT EXISTS ventas (
+    id INTEGER PRIMARY KEY,
+    Fecha TEXT NOT NULL,
+    Cliente TEXT,
+    Caja TEXT,
+    Cantidad INTEGER NOT NULL DEFAULT 0,
+    Valor_Unitario REAL NOT NULL DEFAULT 0,
+    Monto REAL NOT NULL DEFAULT 0,
+    Es_Credito INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS creditos (
+    id INTEGER PRIMARY KEY,
+    Cliente TEXT,
+    Monto REAL NOT NULL DEFAULT 0,
+    Fecha_Credito TEXT,
+    Pagado INTEGER NOT NULL DEFAULT 0,
+    Fecha_Pago TEXT,
+    Venta_ID INTEGER,
+    Abonado REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS abonos (
+    id INTEGER PRIMARY KEY,
+    Fecha TEXT NOT NULL,
+    Cliente TEXT,
+    Monto REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (clave, valor) VALUES ('version', 0);
+CREATE INDEX IF NOT EXISTS idx_inventario_caja ON inventario (Caja);
+CREATE INDEX IF NOT EXISTS idx_clientes_cedula ON clientes (Cedula);
+CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (Fecha);
+CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON ventas (Cliente);
+CREATE INDEX IF NOT EXISTS idx_ventas_caja ON ventas (Caja);
+CREATE INDEX IF NOT EXISTS idx_creditos_cliente ON creditos (Cliente, Pagado);
+CREATE INDEX IF NOT EXISTS idx_creditos_fecha ON creditos (Fecha_Credito);
+CREATE INDEX IF NOT EXISTS idx_abonos_cliente ON abonos (Cliente);
+"""
+# Columnas agregadas después de crear el esquema: (tabla, columna, definición,
+# UPDATE que completa las filas existentes o None)
+COLUMNAS_NUEVAS = [("creditos", "Venta_ID", "INTEGER", None),
+                   ("inventario", "Punto_Reorden", "INTEGER NOT NULL DEFAULT 2", None),
+                   ("creditos", "Abonado", "REAL NOT NULL DEFAULT 0",
+                    "UPDATE creditos SET Abonado = Monto WHERE Pagado = 1")]
+INDICES_NUEVOS = "CREATE INDEX IF NOT EXISTS idx_creditos_venta ON creditos (Venta_ID);"
+
+COLUMNAS = {
+    "inventario": ["Caja", "Cantidad", "Valor_Unitario", "Cantidad_Total", "Punto_Reorden"],
+    "clientes": ["Nombre", "Cedula", "Telefono"],
+    "ventas": ["Fecha", "Cliente", "Caja", "Cantidad", "Valor_Unitario", "Monto", "Es_Credito"],
+    "creditos": ["Cliente", "Monto", "Fecha_Credito", "Pagado", "Fecha_Pago", "Venta_ID", "Abonado"],
+    "abonos": ["Fecha", "Cliente", "Monto"],
+}
+COLUMNAS_FECHA = {"ventas": ["Fecha"], "creditos": ["Fecha_Credito", "Fecha_Pago"], "abonos": ["Fecha"]}
+COLUMNAS_BOOL = {"ventas": ["Es_Credito"], "creditos": ["Pagado"]}
+# Columnas de texto: al migrar se leen como str para no convertir "007" en 7
+COLUMNAS_TEXTO = {"inventario": ["Caja"], "clientes": ["Nombre", "Cedula", "Telefono"],
+                  "ventas": ["Cliente", "Caja"], "creditos": ["Cliente"], "abonos": ["Cliente"]}
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+# Umbral de alerta de stock de las cajas que no tienen uno propio
+PUNTO_REORDEN_DEFECTO = 2
+# Tablas cuyo id se expone como columna "ID" (identificador estable)
+TABLAS_CON_ID = {"inventario", "ventas"}
+
+
+# Bases cuyo esquema ya se creó o actualizó en este proceso: (ruta, dispositivo,
+# inodo), para volver a prepararla si el archivo se reemplaza
+bases_preparadas = set()
+bloqueo_esquema = threading.Lock()
+
+
+def identidad(ruta):
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+    return (os.path.abspath(ruta), info.st_dev, info.st_ino)
+
+
+def crear_esquema(conexion):
+    """Crea las tablas que falten y agrega las columnas e índices nuevos"""
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA)
+    for tabla, columna, definicion, completar in COLUMNAS_NUEVAS:
+        existentes = {fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+        if columna not in existentes:
+            with conexion:
+                conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+                if completar:
+                    conexion.execute(completar)
+    conexion.executescript(INDICES_NUEVOS)
+
+
+def conectar(ruta=SQLITE_FILE):
+    """Abre la base para escribir (el esquema se prepara una vez por base y proceso)"""
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    if identidad(ruta) not in bases_preparadas:
+        with bloqueo_esquema:
+            crear_esquema(conexion)
+            bases_preparadas.add(identidad(ruta))
+    return conexion
+
+
+def conectar_lectura(ruta=SQLITE_FILE):
+    """
+    Abre la base solo para leer: sin DDL ni escrituras, así con WAL no
+    espera a las transacciones de escritura de otras conexiones.
+    """
+    if identidad(ruta) not in bases_preparadas:
+        conectar(ruta).close()
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(ruta))}?mode=ro", uri=True, timeout=30)
+
+
+def nueva_version(conexion):
+    """Incrementa el contador de escrituras (dentro de la transacción)"""
+    conexion.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version'")
+
+
+def version_datos(ruta=SQLITE_FILE):
+    """Contador de escrituras; cambia con cada transacción que modifica datos"""
+    if not os.path.exists(ruta):
+        return 0
+    with closing(conectar_lectura(ruta)) as conexion:
+        return conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+
+
+def columnas_escritura(tabla, df):
+    """Columnas del INSERT; incluye id si el DataFrame trae su columna ID"""
+    return (["id"] if "ID" in df.columns else []) + COLUMNAS[tabla]
+
+
+def a_filas(tabla, df):
+    """Convierte un DataFrame al formato de filas de la tabla"""
+    datos = df.rename(columns={"ID": "id"}).reindex(columns=columnas_escritura(tabla, df)).copy()
+    for col in COLUMNAS_FECHA.get(tabla, []):
+        fechas = pd.to_datetime(datos[col], errors="coerce", format="mixed")
+        datos[col] = fechas.dt.strftime(FORMATO_FECHA).astype(object)
+        datos.loc[fechas.isna(), col] = None
+    for col in COLUMNAS_BOOL.get(tabla, []):
+        datos[col] = datos[col].fillna(False).astype(bool).astype(int)
+    datos = datos.astype(object).where(datos.notna(), None)
+    return list(datos.itertuples(index=False, name=None))
+
+
+def leer_tabla(tabla, ruta=SQLITE_FILE, where="", parametros=(), orden="id", limite=None):
+    """Lee una tabla completa (o filtrada, o las primeras limite filas) con el id como índice"""
+    with closing(conectar_lectura(ruta)) as conexion:
+        columnas = ", ".join(["id"] + COLUMNAS[tabla])
+        limitar = f"LIMIT {int(limite)}" if limite is not None else ""
+        df = pd.read_sql_query(
+            f"SELECT {columnas} FROM {tabla} {where} ORDER BY {orden} {limitar}",
+            conexion, params=parametros, index_col="id"
+        )
+    for col in COLUMNAS_FECHA.get(tabla, []):
+        df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed")
+    for col in COLUMNAS_BOOL.get(tabla, []):
+        df[col] = df[col].astype(bool)
+    if tabla == "clientes":
+        df["Telefono"] = df["Telefono"].astype(object)
+    if tabla in TABLAS_CON_ID:
+        df.insert(0, "ID", df.index)
+    df.index.name = None
+    return df
+
+
+def contar_filas(tabla, ruta=SQLITE_FILE):
+    with closing(conectar_lectura(ruta)) as conexion:
+        return conexion.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+
+def insertar_filas(conexion, tabla, df):
+    columnas = columnas_escritura(tabla, df)
+    marcadores = ", ".join("?" * len(columnas))
+    conexion.executemany(
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})",
+        a_filas(tabla, df)
+    )
+
+
+def reemplazar_tablas(tablas, ruta=SQLITE_FILE):
+    """Reemplaza el contenido de varias tablas en una sola transacción"""
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            for tabla, df in tablas.items():
+                conexion.execute(f"DELETE FROM {tabla}")
+                insertar_filas(conexion, tabla, df)
+            nueva_version(conexion)
+    finally:
+        conexion.close()
+
+
+def insertar_venta(nueva_venta, nuevo_credito=None, ruta=SQLITE_FILE):
+    """
+    Inserta la venta (y su crédito) y descuenta el stock de la caja en una
+    sola transacción. Las líneas reciben ID consecutivos desde el siguiente
+    libre; el Venta_ID de los créditos llega como posición de su línea.
+    Retorna False si no hay stock suficiente.
+    """
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            for caja, cantidad in nueva_venta.groupby("Caja")["Cantidad"].sum().items():
+                cursor = conexion.execute(
+                    "UPDATE inventario SET Cantidad = Cantidad - ? WHERE Caja = ? AND Cantidad >= ?",
+                    (int(cantidad), caja, int(cantidad))
+                )
+                if cursor.rowcount == 0:
+                    raise ValueError(f"Stock insuficiente para {caja}")
+            inicio = conexion.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM ventas").fetchone()[0]
+            nueva_venta = nueva_venta.assign(ID=range(inicio, inicio + len(nueva_venta)))
+            insertar_filas(conexion, "ventas", nueva_venta)
+            if nuevo_credito is not None and not nuevo_credito.empty:
+                insertar_filas(conexion, "creditos",
+                               nuevo_credito.assign(Venta_ID=nuevo_credito["Venta_ID"] + inicio))
+            nueva_version(conexion)
+        return True
+    except ValueError:
+        return False
+    finally:
+        conexion.close()
+
+
+def registrar_abono(abono, creditos, ruta=SQLITE_FILE):
+    """
+    Inserta el abono y actualiza Abonado/Pagado/Fecha_Pago de los créditos
+    a los que se aplicó (índice = id) en una sola transacción. Cada UPDATE
+    exige que el crédito siga con el Abonado_Anterior leído; si otra sesión
+    abonó antes, se revierte todo y retorna False.
+    """
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            insertar_filas(conexion, "abonos", abono)
+            for credito_id, fila in creditos.iterrows():
+                fecha_pago = None if pd.isna(fila["Fecha_Pago"]) else pd.Timestamp(fila["Fecha_Pago"]).strftime(FORMATO_FECHA)
+                cursor = conexion.execute(
+                    "UPDATE creditos SET Abonado = ?, Pagado = ?, Fecha_Pago = ? WHERE id = ? AND Abonado = ?",
+                    (float(fila["Abonado"]), int(bool(fila["Pagado"])), fecha_pago, int(credito_id),
+                     float(fila["Abonado_Anterior"]))
+                )
+                if cursor.rowcount != 1:
+                    raise ValueError("El crédito cambió en otra sesión")
+            nueva_version(conexion)
+        return True
+    except ValueError:
+        return False
+    finally:
+        conexion.close()
+
+
+def sumar_unidades(caja_id, unidades, nuevo_precio, punto_reorden=None, ruta=SQLITE_FILE):
+    """
+    Suma unidades al stock de una caja y fija su precio (UPDATE relativo);
+    con punto_reorden también cambia su umbral de alerta.
+    """
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            cursor = conexion.execute(
+                "UPDATE inventario SET Cantidad = Cantidad + ?, Cantidad_Total = Cantidad_Total + ?, "
+                "Valor_Unitario = ?, Punto_Reorden = COALESCE(?, Punto_Reorden) WHERE id = ?",
+                (int(unidades), int(unidades), float(nuevo_precio),
+                 None if punto_reorden is None else int(punto_reorden), int(caja_id))
+            )
+            nueva_version(conexion)
+        return cursor.rowcount > 0
+    finally:
+        conexion.close()
+
+
+def insertar_fila(tabla, df, ruta=SQLITE_FILE):
+    """INSERT de una fila nueva (sin columna ID); retorna su id"""
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            columnas = COLUMNAS[tabla]
+            cursor = conexion.execute(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                a_filas(tabla, df.drop(columns="ID", errors="ignore"))[0]
+            )
+            nueva_version(conexion)
+        return cursor.lastrowid
+    finally:
+        conexion.close()
+
+
+def eliminar_ventas(venta_ids, credito_ids, devoluciones, ruta=SQLITE_FILE):
+    """
+    DELETE de las ventas y créditos por id y devolución de su stock
+    (id de caja → unidades) en una sola transacción
+    """
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            conexion.executemany("DELETE FROM ventas WHERE id = ?", [(int(i),) for i in venta_ids])
+            conexion.executemany("DELETE FROM creditos WHERE id = ?", [(int(i),) for i in credito_ids])
+            conexion.executemany(
+                "UPDATE inventario SET Cantidad = Cantidad + ? WHERE id = ?",
+                [(int(unidades), int(caja_id)) for caja_id, unidades in devoluciones.items()]
+            )
+            nueva_version(conexion)
+    finally:
+        conexion.close()
+
+
+def eliminar_fila(tabla, fila_id, ruta=SQLITE_FILE):
+    """DELETE de una fila por id"""
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            cursor = conexion.execute(f"DELETE FROM {tabla} WHERE id = ?", (int(fila_id),))
+            nueva_version(conexion)
+        return cursor.rowcount == 1
+    finally:
+        conexion.close()
+
+
+def creditos_pendientes_cliente(cliente, ruta=SQLITE_FILE):
+    """Créditos sin pagar de un cliente (consulta por índice)"""
+    return leer_tabla("creditos", ruta, "WHERE Cliente = ? AND Pagado = 0", (cliente,))
+
+
+def leer_csv_con_diario(carpeta, nombre):
+    archivo = os.path.join(carpeta, f"{nombre}.csv")
+    diario = os.path.join(carpeta, f"{nombre}_diario.csv")
+    if not os.path.exists(archivo):
+        return pd.DataFrame(columns=COLUMNAS[nombre])
+    texto = dict.fromkeys(COLUMNAS_TEXTO[nombre], str)
+    df = pd.read_csv(archivo, dtype=texto)
+    if os.path.exists(diario) and os.path.getsize(diario) > 0:
+        df = pd.concat([df, pd.read_csv(diario, dtype=texto)], ignore_index=True)
+    return df
+
+
+def migrar_desde_csv(carpeta="datos", ruta=None):
+    """Copia los CSV (incluidos los diarios pendientes) a la base SQLite"""
+    ruta = ruta or os.path.join(carpeta, os.path.basename(SQLITE_FILE))
+    tablas = {nombre: leer_csv_con_diario(carpeta, nombre) for nombre in COLUMNAS}
+    if "Cantidad_Total" not in tablas["inventario"].columns:
+        tablas["inventario"]["Cantidad_Total"] = tablas["inventario"]["Cantidad"]
+    # Créditos anteriores a los abonos: los pagados quedan abonados completos
+    creditos = tablas["creditos"]
+    pagados = creditos["Pagado"].astype(str).str.lower().isin(["true", "1"])
+    abonado = creditos.get("Abonado", pd.Series(index=creditos.index, dtype="float64"))
+    creditos["Abonado"] = abonado.fillna(creditos["Monto"].where(pagados, 0))
+    if "Punto_Reorden" not in tablas["inventario"].columns:
+        tablas["inventario"]["Punto_Reorden"] = PUNTO_REORDEN_DEFECTO
+    reemplazar_tablas(tablas, ruta)
+    return {nombre: len(df) for nombre, df in tablas.items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrar":
+        print(__doc__)
+        sys.exit(1)
+    carpeta = sys.argv[2] if len(sys.argv) > 2 else "datos"
+    for nombre, filas in migrar_desde_csv(carpeta).items():
+        print(f"✅ {nombre}: {filas} filas migradas")
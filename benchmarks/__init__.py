@@ -0,0 +1,10 @@
+"""
+Benchmarks de BIODESICION.
+
+generar_datos arma una carpeta datos/ sintética (cajas, clientes, ventas y
+créditos con distribuciones sesgadas); medir cronometra las rutas de datos
+de la aplicación sobre ella y compara con umbrales y una corrida anterior.
+
+    python -m benchmarks.medir --ventas 100000 --salida resultados.json
+    python -m benchmarks.medir --ventas 100000 --base resultados.json
+"""
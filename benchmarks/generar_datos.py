@@ -0,0 +1,122 @@
+"""
+Generador de datos sintéticos con el formato de datos/.
+
+Clientes y cajas se eligen con pesos de Zipf (pocos concentran la mayoría
+de las ventas), las cantidades siguen una geométrica y las fechas cubren
+los últimos dos años con más ventas en los meses recientes. Una parte de
+las ventas es a crédito y la mayoría de esos créditos ya está pagada.
+
+    python -m benchmarks.generar_datos carpeta --ventas 1000000 [--backend sqlite|parquet]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import almacenamiento_sqlite
+import historial_parquet
+
+DIAS_HISTORIA = 730
+PROPORCION_CREDITO = 0.2
+PROPORCION_PAGADOS = 0.7
+
+
+def pesos_zipf(n, exponente=1.1):
+    pesos = 1.0 / np.arange(1, n + 1) ** exponente
+    return pesos / pesos.sum()
+
+
+def generar_tablas(cajas=50, clientes=500, ventas=10_000, semilla=0):
+    """Retorna (inventario, clientes, ventas, creditos) con el esquema de la aplicación"""
+    rng = np.random.default_rng(semilla)
+    hoy = pd.Timestamp.now().normalize()
+
+    precios = rng.choice([5000, 8000, 10000, 12000, 15000, 20000], size=cajas)
+    total = rng.integers(50, 500, size=cajas)
+    inventario = pd.DataFrame({
+        "ID": np.arange(1, cajas + 1),
+        "Caja": [f"Caja {i:04d}" for i in range(1, cajas + 1)],
+        "Cantidad": (total * rng.uniform(0, 0.3, size=cajas)).astype(int),
+        "Valor_Unitario": precios,
+        "Cantidad_Total": total,
+    })
+
+    tabla_clientes = pd.DataFrame({
+        "Nombre": [f"Cliente {i:06d}" for i in range(1, clientes + 1)],
+        "Cedula": [str(10_000_000 + i) for i in range(1, clientes + 1)],
+        "Telefono": [f"3{rng.integers(0, 10**9):09d}" for _ in range(clientes)],
+    })
+
+    caja = rng.choice(cajas, size=ventas, p=pesos_zipf(cajas))
+    cliente = rng.choice(clientes, size=ventas, p=pesos_zipf(clientes))
+    cantidad = rng.geometric(0.5, size=ventas)
+    # Más ventas recientes: antigüedad en días con distribución exponencial
+    antiguedad = np.minimum(rng.exponential(DIAS_HISTORIA / 3, size=ventas), DIAS_HISTORIA - 1)
+    segundos = rng.integers(8 * 3600, 20 * 3600, size=ventas)
+    fecha = (hoy - pd.to_timedelta(antiguedad.astype(int), unit="D")
+             + pd.to_timedelta(segundos, unit="s"))
+    es_credito = rng.random(ventas) < PROPORCION_CREDITO
+    tabla_ventas = pd.DataFrame({
+        "ID": np.arange(1, ventas + 1),
+        "Fecha": fecha,
+        "Cliente": tabla_clientes["Nombre"].to_numpy()[cliente],
+        "Caja": inventario["Caja"].to_numpy()[caja],
+        "Cantidad": cantidad,
+        "Valor_Unitario": precios[caja],
+        "Monto": cantidad * precios[caja],
+        "Es_Credito": es_credito,
+    }).sort_values("Fecha", kind="stable").reset_index(drop=True)
+
+    a_credito = tabla_ventas[tabla_ventas["Es_Credito"]]
+    pagado = rng.random(len(a_credito)) < PROPORCION_PAGADOS
+    demora = pd.to_timedelta(rng.integers(1, 60, size=len(a_credito)), unit="D")
+    fecha_pago = (a_credito["Fecha"] + demora).where(pagado)
+    tabla_creditos = pd.DataFrame({
+        "Cliente": a_credito["Cliente"].to_numpy(),
+        "Monto": a_credito["Monto"].to_numpy(),
+        "Fecha_Credito": a_credito["Fecha"].to_numpy(),
+        "Pagado": pagado,
+        "Fecha_Pago": fecha_pago.to_numpy(),
+        "Venta_ID": a_credito["ID"].to_numpy(),
+    })
+    return inventario, tabla_clientes, tabla_ventas, tabla_creditos
+
+
+def generar(carpeta, cajas=50, clientes=500, ventas=10_000, semilla=0, backend="csv"):
+    """
+    Escribe la carpeta de datos (carpeta/datos). backend "sqlite" o
+    "parquet" migran además los CSV al formato correspondiente.
+    """
+    datos = os.path.join(carpeta, "datos")
+    os.makedirs(datos, exist_ok=True)
+    tablas = generar_tablas(cajas, clientes, ventas, semilla)
+    for nombre, df in zip(["inventario", "clientes", "ventas", "creditos"], tablas):
+        df.to_csv(os.path.join(datos, f"{nombre}.csv"), index=False, date_format="%Y-%m-%d %H:%M:%S")
+    if backend == "sqlite":
+        almacenamiento_sqlite.migrar_desde_csv(datos)
+    elif backend == "parquet":
+        historial_parquet.migrar_desde_csv(datos)
+    return datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una carpeta datos/ sintética")
+    parser.add_argument("carpeta")
+    parser.add_argument("--cajas", type=int, default=50)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--ventas", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv")
+    args = parser.parse_args()
+    datos = generar(args.carpeta, args.cajas, args.clientes, args.ventas, args.semilla, args.backend)
+    print(f"✅ Datos generados en {datos}")
+
+
+if __name__ == "__main__":
+    main()
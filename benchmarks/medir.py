@@ -0,0 +1,198 @@
+"""
+Cronometra las rutas de datos de BIODESICION sobre una carpeta sintética.
+
+Genera los datos en una carpeta temporal, importa la aplicación con el
+backend pedido y mide cada operación varias veces (mediana, mínimo y
+máximo en segundos). El resultado se escribe como JSON.
+
+Regresiones:
+  - umbrales.json: límite en segundos de cada medición para
+    filas_referencia ventas; se escala linealmente con el número de ventas.
+  - --base: corrida anterior; es regresión si la mediana supera la de la
+    base por más de --tolerancia (y por más de RUIDO_SEGUNDOS).
+Con alguna regresión el proceso termina con código 1.
+
+    python -m benchmarks.medir --ventas 100000 --backend sqlite --salida r.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generar_datos import RAIZ, generar
+
+UMBRALES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "umbrales.json")
+RUIDO_SEGUNDOS = 0.005
+VENTAS_A_ELIMINAR = 100
+
+
+def cronometrar(funcion, repeticiones, preparar=None):
+    """Mide funcion(*preparar()) repeticiones veces (preparar no se cronometra)"""
+    tiempos = []
+    for _ in range(repeticiones):
+        argumentos = preparar() if preparar else ()
+        inicio = time.perf_counter()
+        funcion(*argumentos)
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana": statistics.median(tiempos),
+        "minimo": min(tiempos),
+        "maximo": max(tiempos),
+        "repeticiones": repeticiones,
+    }
+
+
+def importar_aplicacion(backend):
+    """Importa el motor con el backend pedido (lee la configuración al importar)"""
+    os.environ["BIODESICION_BACKEND"] = "sqlite" if backend == "sqlite" else "csv"
+    os.environ["BIODESICION_VENTAS_FORMATO"] = "parquet" if backend == "parquet" else "csv"
+    import motor
+    return motor
+
+
+def mediciones(app, repeticiones, excel_filas, semilla):
+    """Nombre → resultado de cronometrar, para cada ruta de datos"""
+    rng = np.random.default_rng(semilla)
+    inventario, clientes, ventas, creditos = app.cargar_datos()
+    agregados = app.agregar_por_dia(ventas)
+    agregados["Mes"] = agregados["Dia"].dt.to_period("M")
+
+    def cargar_en_frio():
+        app.invalidar_cache(inventario=True, clientes=True, ventas=True, creditos=True)
+        app.cargar_datos()
+
+    def datos_frescos():
+        return app.cargar_datos()
+
+    def ventas_a_eliminar():
+        datos = app.cargar_datos()
+        ids = rng.choice(datos[2]["ID"].to_numpy(), size=min(VENTAS_A_ELIMINAR, len(datos[2])), replace=False)
+        return (ids,) + tuple(datos)
+
+    # Último mes del historial: el rango típico del selector de Reportes
+    hasta_rango = ventas["Fecha"].iloc[-1] if not ventas.empty else pd.Timestamp.now()
+    desde_rango = hasta_rango - pd.Timedelta(days=30)
+
+    hojas_excel = {"Ventas": ventas.head(excel_filas), "Inventario": inventario,
+                   "Clientes": clientes, "Créditos": creditos.head(excel_filas)}
+
+    casos = {
+        "cargar_datos_frio": (cargar_en_frio, None),
+        "cargar_datos_cache": (app.cargar_datos, None),
+        "guardar_datos_inventario": (lambda i, c, v, cr: app.guardar_datos(inventario=i), datos_frescos),
+        "guardar_datos_completo": (lambda i, c, v, cr: app.guardar_datos(i, c, v, cr), datos_frescos),
+        "calcular_ganancia_neta": (lambda: app.calcular_ganancia_neta(ventas), None),
+        "verificar_stock_bajo": (lambda: app.verificar_stock_bajo(inventario), None),
+        "dashboard_agregar_por_dia": (lambda: app.agregar_por_dia(ventas), None),
+        "dashboard_por_mes": (lambda: agregados.groupby("Mes")["Cantidad"].sum(), None),
+        "reportes_ventas_por_cliente": (
+            lambda: ventas.groupby("Cliente", observed=True).agg(
+                {"Monto": "sum", "Cantidad": "sum", "Es_Credito": "sum"}), None),
+        "reportes_rango_fechas": (lambda: app.filas_en_rango(ventas, *app.limites_dias(desde_rango, hasta_rango)),
+                                  None),
+        "productos_reposicion": (lambda: app.pronostico.reposicion(agregados, inventario, datetime.now().date()),
+                                 None),
+        "historial_eliminar_ventas": (lambda ids, i, c, v, cr: app.eliminar_ventas(ids, i, v, cr),
+                                      ventas_a_eliminar),
+        "exportar_excel": (lambda: app.exportar_reporte(hojas_excel, "Excel (.xlsx)")[1].close(), None),
+    }
+    resultados = {}
+    for nombre, (funcion, preparar) in casos.items():
+        resultados[nombre] = cronometrar(funcion, repeticiones, preparar)
+        print(f"{nombre:32s} {resultados[nombre]['mediana'] * 1000:10.1f} ms", file=sys.stderr)
+    return resultados
+
+
+def buscar_regresiones(resultados, ventas, base=None, tolerancia=1.25):
+    """Lista de mediciones que superan su umbral o empeoran respecto a la base"""
+    regresiones = []
+    if os.path.exists(UMBRALES_FILE):
+        with open(UMBRALES_FILE, encoding="utf-8") as f:
+            umbrales = json.load(f)
+        escala = max(ventas / umbrales["filas_referencia"], 1.0)
+        for nombre, limite in umbrales["segundos"].items():
+            if nombre in resultados and resultados[nombre]["mediana"] > limite * escala:
+                regresiones.append({"medicion": nombre, "motivo": "umbral",
+                                    "mediana": resultados[nombre]["mediana"], "limite": limite * escala})
+    if base is not None:
+        for nombre, anterior in base["resultados"].items():
+            if nombre not in resultados:
+                continue
+            actual = resultados[nombre]["mediana"]
+            if actual > anterior["mediana"] * tolerancia and actual - anterior["mediana"] > RUIDO_SEGUNDOS:
+                regresiones.append({"medicion": nombre, "motivo": "base",
+                                    "mediana": actual, "base": anterior["mediana"]})
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas de datos")
+    parser.add_argument("--cajas", type=int, default=50)
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--ventas", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--excel-filas", type=int, default=100_000,
+                        help="filas de ventas y créditos en la exportación a Excel")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--base", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=1.25)
+    parser.add_argument("--conservar", action="store_true", help="no borrar la carpeta de datos generada")
+    args = parser.parse_args()
+
+    # Rutas del usuario antes de pasar a la carpeta temporal
+    salida = os.path.abspath(args.salida) if args.salida else None
+    base = None
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    carpeta = tempfile.mkdtemp(prefix="biodesicion_bench_")
+    inicio = time.perf_counter()
+    generar(carpeta, args.cajas, args.clientes, args.ventas, args.semilla, args.backend)
+    generacion = time.perf_counter() - inicio
+    directorio_original = os.getcwd()
+    os.chdir(carpeta)
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    try:
+        app = importar_aplicacion(args.backend)
+        resultados = mediciones(app, args.repeticiones, args.excel_filas, args.semilla)
+    finally:
+        os.chdir(directorio_original)
+        if not args.conservar:
+            shutil.rmtree(carpeta, ignore_errors=True)
+    regresiones = buscar_regresiones(resultados, args.ventas, base, args.tolerancia)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "pandas": pd.__version__,
+                    "plataforma": platform.platform(), "backend": args.backend},
+        "datos": {"cajas": args.cajas, "clientes": args.clientes, "ventas": args.ventas,
+                  "semilla": args.semilla, "carpeta": carpeta, "generacion_segundos": generacion},
+        "resultados": resultados,
+        "regresiones": regresiones,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if salida:
+        with open(salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    for regresion in regresiones:
+        print(f"❌ Regresión en {regresion['medicion']} ({regresion['motivo']})", file=sys.stderr)
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Historial de ventas particionado por mes en archivos Parquet.
+
+Cada mes se guarda en datos/ventas_parquet/ventas_AAAA-MM.parquet. Las
+consultas por rango de fechas solo abren las particiones de los meses
+pedidos y el filtro de fecha se aplica al leer cada archivo. El mes en
+curso se escribe con compresión rápida (snappy); los meses cerrados con
+zstd, y una venta nueva o eliminada solo reescribe la partición de su mes.
+El número de ventas y el mayor ID salen de los metadatos de cada archivo,
+sin leer sus filas. Las funciones preparar_* escriben las particiones en
+archivos temporales y retornan los renombres y borrados pendientes, para
+completarlos dentro de una transacción junto con las demás tablas.
+
+Requiere pyarrow. Migración desde el CSV:
+
+    python historial_parquet.py migrar [carpeta_datos]
+"""
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+VENTAS_PARQUET_DIR = "datos/ventas_parquet"
+COLUMNAS_VENTAS = ["ID", "Fecha", "Cliente", "Caja", "Cantidad", "Valor_Unitario", "Monto", "Es_Credito"]
+PREFIJO = "ventas_"
+
+
+def archivo_particion(mes, carpeta=VENTAS_PARQUET_DIR):
+    return os.path.join(carpeta, f"{PREFIJO}{mes}.parquet")
+
+
+def meses_disponibles(carpeta=VENTAS_PARQUET_DIR):
+    """Meses con particiones ('AAAA-MM'), en orden"""
+    if not os.path.isdir(carpeta):
+        return []
+    return sorted(
+        nombre[len(PREFIJO):-len(".parquet")]
+        for nombre in os.listdir(carpeta)
+        if nombre.startswith(PREFIJO) and nombre.endswith(".parquet")
+    )
+
+
+def version(carpeta=VENTAS_PARQUET_DIR):
+    """(nombre, mtime, tamaño) de cada partición, para la caché"""
+    if not os.path.isdir(carpeta):
+        return ()
+    return tuple(sorted(
+        (entrada.name, entrada.stat().st_mtime_ns, entrada.stat().st_size)
+        for entrada in os.scandir(carpeta) if entrada.name.endswith(".parquet")
+    ))
+
+
+def normalizar(ventas):
+    """Aplica el esquema fijo de las particiones"""
+    ventas = ventas.reindex(columns=COLUMNAS_VENTAS).copy()
+    # ID 0: venta anterior a los ID (se numera al cargar el historial)
+    ventas["ID"] = pd.to_numeric(ventas["ID"]).fillna(0).astype("int64")
+    ventas["Fecha"] = pd.to_datetime(ventas["Fecha"], format="mixed").astype("datetime64[ns]")
+    ventas["Cliente"] = ventas["Cliente"].astype(str)
+    ventas["Caja"] = ventas["Caja"].astype(str)
+    ventas["Cantidad"] = pd.to_numeric(ventas["Cantidad"]).fillna(0).astype("int64")
+    ventas["Valor_Unitario"] = pd.to_numeric(ventas["Valor_Unitario"]).fillna(0).astype("float64")
+    ventas["Monto"] = pd.to_numeric(ventas["Monto"]).fillna(0).astype("float64")
+    ventas["Es_Credito"] = ventas["Es_Credito"].fillna(False).astype(bool)
+    return ventas
+
+
+def preparar_particion(mes, ventas_mes, carpeta=VENTAS_PARQUET_DIR):
+    """
+    Escribe un mes completo en un archivo temporal. Retorna (reemplazos
+    [(temporal, archivo)], borrados [archivo]); un mes vacío se borra.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    archivo = archivo_particion(mes, carpeta)
+    if ventas_mes.empty:
+        return [], [archivo]
+    mes_actual = datetime.now().strftime("%Y-%m")
+    compresion = "snappy" if mes >= mes_actual else "zstd"
+    temporal = archivo + ".tmp"
+    ventas_mes.sort_values("Fecha", kind="stable").to_parquet(
+        temporal, engine="pyarrow", index=False, compression=compresion
+    )
+    return [(temporal, archivo)], []
+
+
+def completar(reemplazos, borrados):
+    """Renombra los temporales preparados y borra los meses vacíos"""
+    for temporal, archivo in reemplazos:
+        os.replace(temporal, archivo)
+    for archivo in borrados:
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+
+def leer_particion(mes, carpeta=VENTAS_PARQUET_DIR):
+    archivo = archivo_particion(mes, carpeta)
+    if not os.path.exists(archivo):
+        return normalizar(pd.DataFrame(columns=COLUMNAS_VENTAS))
+    return pd.read_parquet(archivo, engine="pyarrow")
+
+
+def leer_ventas(desde=None, hasta=None, carpeta=VENTAS_PARQUET_DIR):
+    """
+    Ventas con desde <= Fecha <= hasta (ambos opcionales). Solo se abren
+    las particiones de los meses del rango.
+    """
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+    meses = meses_disponibles(carpeta)
+    if desde is not None:
+        meses = [m for m in meses if m >= desde.strftime("%Y-%m")]
+    if hasta is not None:
+        meses = [m for m in meses if m <= hasta.strftime("%Y-%m")]
+    filtros = []
+    if desde is not None:
+        filtros.append(("Fecha", ">=", desde))
+    if hasta is not None:
+        filtros.append(("Fecha", "<=", hasta))
+    partes = [
+        pd.read_parquet(archivo_particion(mes, carpeta), engine="pyarrow", filters=filtros or None)
+        for mes in meses
+    ]
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return normalizar(pd.DataFrame(columns=COLUMNAS_VENTAS))
+    return pd.concat(partes, ignore_index=True)
+
+
+def contar_ventas(carpeta=VENTAS_PARQUET_DIR):
+    """Número de ventas (metadatos de las particiones)"""
+    import pyarrow.parquet as pq
+    return sum(pq.read_metadata(archivo_particion(mes, carpeta)).num_rows for mes in meses_disponibles(carpeta))
+
+
+def max_id(carpeta=VENTAS_PARQUET_DIR):
+    """Mayor ID guardado (estadísticas de la columna; si faltan, se lee solo esa columna)"""
+    import pyarrow.parquet as pq
+    maximo = 0
+    for mes in meses_disponibles(carpeta):
+        archivo = archivo_particion(mes, carpeta)
+        metadatos = pq.read_metadata(archivo)
+        columna = metadatos.schema.names.index("ID")
+        for i in range(metadatos.num_row_groups):
+            estadisticas = metadatos.row_group(i).column(columna).statistics
+            if estadisticas is None or not estadisticas.has_min_max:
+                maximo = max(maximo, int(pd.read_parquet(archivo, engine="pyarrow", columns=["ID"])["ID"].max()))
+                break
+            maximo = max(maximo, int(estadisticas.max))
+    return maximo
+
+
+def primera_fecha(carpeta=VENTAS_PARQUET_DIR):
+    """Fecha de la venta más antigua (solo se lee la columna Fecha del primer mes), o None"""
+    meses = meses_disponibles(carpeta)
+    if not meses:
+        return None
+    return pd.read_parquet(archivo_particion(meses[0], carpeta), engine="pyarrow", columns=["Fecha"])["Fecha"].min()
+
+
+def ultimas_ventas(n, carpeta=VENTAS_PARQUET_DIR):
+    """Las n ventas más recientes, leyendo los meses desde el último hasta juntarlas"""
+    partes, filas = [], 0
+    for mes in reversed(meses_disponibles(carpeta)):
+        partes.insert(0, leer_particion(mes, carpeta))
+        filas += len(partes[0])
+        if filas >= n:
+            break
+    if not partes:
+        return normalizar(pd.DataFrame(columns=COLUMNAS_VENTAS))
+    return pd.concat(partes, ignore_index=True).tail(n).reset_index(drop=True)
+
+
+def preparar_anexo(nuevas, carpeta=VENTAS_PARQUET_DIR):
+    """Particiones de los meses de las ventas nuevas, con ellas agregadas (ver preparar_particion)"""
+    nuevas = normalizar(nuevas)
+    reemplazos = []
+    for mes, grupo in nuevas.groupby(nuevas["Fecha"].dt.strftime("%Y-%m")):
+        actual = leer_particion(mes, carpeta)
+        reemplazos += preparar_particion(mes, pd.concat([actual, grupo], ignore_index=True), carpeta)[0]
+    return reemplazos, []
+
+
+def preparar_ventas(ventas, carpeta=VENTAS_PARQUET_DIR, meses=None):
+    """
+    Particiones del historial completo (los meses que ya no tienen ventas
+    se borran) o, con meses, solo las de esos meses ('AAAA-MM')
+    """
+    ventas = normalizar(ventas)
+    mes_de = ventas["Fecha"].dt.strftime("%Y-%m")
+    if meses is None:
+        meses = set(mes_de) | set(meses_disponibles(carpeta))
+    reemplazos, borrados = [], []
+    for mes in sorted(meses):
+        nuevos, vacios = preparar_particion(mes, ventas[mes_de == mes], carpeta)
+        reemplazos += nuevos
+        borrados += vacios
+    return reemplazos, borrados
+
+
+def escribir_ventas(ventas, carpeta=VENTAS_PARQUET_DIR, meses=None):
+    """Reescribe el historial completo o solo esos meses (ver preparar_ventas)"""
+    completar(*preparar_ventas(ventas, carpeta, meses))
+
+
+def migrar_desde_csv(carpeta="datos"):
+    """Convierte ventas.csv (y su diario pendiente) en particiones mensuales"""
+    # Cliente y Caja como texto: "007" no debe migrarse como 7
+    texto = {"Cliente": str, "Caja": str}
+    ventas = pd.read_csv(os.path.join(carpeta, "ventas.csv"), dtype=texto)
+    diario = os.path.join(carpeta, "ventas_diario.csv")
+    if os.path.exists(diario) and os.path.getsize(diario) > 0:
+        ventas = pd.concat([ventas, pd.read_csv(diario, dtype=texto)], ignore_index=True)
+    destino = os.path.join(carpeta, os.path.basename(VENTAS_PARQUET_DIR))
+    escribir_ventas(ventas, destino)
+    return len(ventas), len(meses_disponibles(destino))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrar":
+        print(__doc__)
+        sys.exit(1)
+    filas, meses = migrar_desde_csv(sys.argv[2] if len(sys.argv) > 2 else "datos")
+    print(f"✅ {filas} ventas migradas en {meses} particiones mensuales")
@@ -2,805 +2,1089 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-import hashlib
-import plotly.graph_objects as go
-import plotly.express as px
+import uuid
+import trabajos
+import rendimiento
+import pronostico
+from motor import (
+    CAJAS_UNICAS, CLIENTES_MAX_RESULTADOS, ORDENES_PRODUCTOS, FORMATOS_EXPORTACION, PARQUET_DISPONIBLE, PUNTO_REORDEN_DEFECTO,
+    TRABAJOS_HILOS, TRABAJOS_MAX_TERMINADOS, DATOS_DIR,
+    verificar_usuario, cargar_tiendas, usar_tienda, version_de, cargar_tabla,
+    indice_cajas, filtrar_productos, buscar_clientes, cliente_por_cedula, cliente_por_nombre, etiqueta_cliente,
+    agregar_caja, agregar_unidades, eliminar_caja, agregar_cliente, eliminar_cliente,
+    registrar_venta, eliminar_ventas, registrar_abono,
+    leer_importacion, armar_venta, errores_de_venta,
+    cargar_resumen, cargar_alertas, cargar_saldos, cargar_abonos, cargar_agregados, cargar_reposicion,
+    ultimas_ventas, primera_fecha_ventas, cargar_ventas_rango, filas_en_rango, limites_dias,
+    generar_reporte, leer_reporte, cargar_consolidado, directorio_datos,
+)
 
 # Configuración de Streamlit
 st.set_page_config(page_title="BIODESICION - Inventory", layout="wide", initial_sidebar_state="expanded")
 
-INVENTARIO_FILE = "datos/inventario.csv"
-CLIENTES_FILE = "datos/clientes.csv"
-VENTAS_FILE = "datos/ventas.csv"
-USUARIOS_FILE = "datos/usuarios.csv"
-CREDITOS_FILE = "datos/creditos.csv"
-
-os.makedirs("datos", exist_ok=True)
-
-# ===== FUNCIONES BÁSICAS =====
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def crear_usuario_default():
-    if not os.path.exists(USUARIOS_FILE):
-        usuarios = pd.DataFrame({
-            "usuario": ["CamilaM"],
-            "contraseña": [hash_password("1234")]
-        })
-        usuarios.to_csv(USUARIOS_FILE, index=False)
-
-def verificar_usuario(usuario, contraseña):
-    if not usuario or not contraseña:
-        return False
-    crear_usuario_default()
-    try:
-        usuarios = pd.read_csv(USUARIOS_FILE)
-        user_data = usuarios[usuarios["usuario"] == usuario]
-        if user_data.empty:
-            return False
-        return user_data["contraseña"].values[0] == hash_password(contraseña)
-    except:
-        return False
-
-def cargar_inventario():
-    try:
-        if os.path.exists(INVENTARIO_FILE):
-            inventario = pd.read_csv(INVENTARIO_FILE)
-            if "Valor_Unitario" not in inventario.columns:
-                inventario["Valor_Unitario"] = 0.0
-            if "Cantidad_Total" not in inventario.columns:
-                inventario["Cantidad_Total"] = inventario["Cantidad"]
-        else:
-            inventario = pd.DataFrame({"Caja": [], "Cantidad": [], "Valor_Unitario": [], "Cantidad_Total": []})
-            inventario.to_csv(INVENTARIO_FILE, index=False)
-        return inventario
-    except:
-        return pd.DataFrame({"Caja": [], "Cantidad": [], "Valor_Unitario": [], "Cantidad_Total": []})
-
-def cargar_clientes():
-    try:
-        if os.path.exists(CLIENTES_FILE):
-            clientes = pd.read_csv(CLIENTES_FILE, dtype={"Telefono": str})
-        else:
-            clientes = pd.DataFrame({"Nombre": [], "Cedula": [], "Telefono": []})
-            clientes.to_csv(CLIENTES_FILE, index=False)
-        return clientes
-    except:
-        return pd.DataFrame({"Nombre": [], "Cedula": [], "Telefono": []})
-
-def cargar_ventas():
-    try:
-        if os.path.exists(VENTAS_FILE):
-            ventas = pd.read_csv(VENTAS_FILE)
-            ventas["Fecha"] = pd.to_datetime(ventas["Fecha"])
-            if "Valor_Unitario" not in ventas.columns:
-                ventas["Valor_Unitario"] = 0.0
-            if "Es_Credito" not in ventas.columns:
-                ventas["Es_Credito"] = False
-        else:
-            ventas = pd.DataFrame(columns=["Fecha", "Cliente", "Caja", "Cantidad", "Valor_Unitario", "Monto", "Es_Credito"])
-            ventas.to_csv(VENTAS_FILE, index=False)
-        return ventas
-    except:
-        return pd.DataFrame(columns=["Fecha", "Cliente", "Caja", "Cantidad", "Valor_Unitario", "Monto", "Es_Credito"])
-
-def cargar_creditos():
-    try:
-        if os.path.exists(CREDITOS_FILE):
-            creditos = pd.read_csv(CREDITOS_FILE)
-            creditos["Fecha_Credito"] = pd.to_datetime(creditos["Fecha_Credito"])
-            if "Fecha_Pago" in creditos.columns:
-                creditos["Fecha_Pago"] = pd.to_datetime(creditos["Fecha_Pago"], errors='coerce')
-        else:
-            creditos = pd.DataFrame(columns=["Cliente", "Monto", "Fecha_Credito", "Pagado", "Fecha_Pago"])
-            creditos.to_csv(CREDITOS_FILE, index=False)
-        return creditos
-    except:
-        return pd.DataFrame(columns=["Cliente", "Monto", "Fecha_Credito", "Pagado", "Fecha_Pago"])
-
-def guardar_datos(inventario, clientes, ventas, creditos):
-    try:
-        inventario.to_csv(INVENTARIO_FILE, index=False)
-        clientes.to_csv(CLIENTES_FILE, index=False)
-        ventas.to_csv(VENTAS_FILE, index=False)
-        creditos.to_csv(CREDITOS_FILE, index=False)
-        return True
-    except:
-        return False
-
-def cargar_datos():
-    return cargar_inventario(), cargar_clientes(), cargar_ventas(), cargar_creditos()
-
-def verificar_stock_bajo(inventario):
-    """Retorna un DataFrame con cajas de stock bajo"""
-    if inventario.empty:
-        return pd.DataFrame()
-    cajas_alerta = inventario[inventario['Cantidad'] <= 2]
-    return cajas_alerta
-
-def calcular_ganancia_neta(ventas):
+# Medición de tiempos de esta ejecución (con cProfile si se pidió en el panel)
+rendimiento.iniciar(perfilar=st.session_state.pop('perfilar', False))
+
+RENDIMIENTO_LOG = "datos/rendimiento.log"
+MENSAJE_CONFLICTO = "❌ Los datos cambiaron en otra sesión; intenta de nuevo"
+
+# Usuarios que ven el panel de rendimiento
+ADMINISTRADORES = {u.strip() for u in os.environ.get("BIODESICION_ADMINS", "CamilaM").split(",") if u.strip()}
+
+# Vistas paginadas de productos y de saldos de crédito
+PRODUCTOS_POR_PAGINA = [10, 25, 50, 100]
+SALDOS_POR_PAGINA = [10, 25, 50]
+
+# Gráficas: figuras en caché, clientes mostrados antes de agrupar en "Otros",
+# y barras a partir de las cuales no se dibujan sus etiquetas
+GRAFICAS_MAX_ENTRADAS = 16
+GRAFICA_TOP_CLIENTES = 20
+GRAFICA_MAX_ETIQUETAS = 60
+
+# ===== TRABAJOS EN SEGUNDO PLANO =====
+@st.cache_resource(show_spinner=False)
+def ejecutor_trabajos():
+    """Grupo de hilos compartido por todas las sesiones"""
+    return trabajos.Ejecutor(TRABAJOS_HILOS, TRABAJOS_MAX_TERMINADOS)
+
+def sesion_trabajos():
+    """Identificador de esta sesión ante el ejecutor (los trabajos pueden compartirse)"""
+    if 'sesion_trabajos' not in st.session_state:
+        st.session_state.sesion_trabajos = uuid.uuid4().hex
+    return st.session_state.sesion_trabajos
+
+def soltar_trabajo(trabajo):
+    """Quita el trabajo de esta sesión; se cancela solo si ninguna otra lo tiene"""
+    st.session_state.trabajos = [i for i in st.session_state.get('trabajos', []) if i != trabajo.id]
+    ejecutor_trabajos().descartar(trabajo.id, sesion_trabajos())
+
+def trabajos_de_sesion():
+    """Trabajos lanzados en esta sesión que siguen en el registro"""
+    ejecutor = ejecutor_trabajos()
+    lista = [ejecutor.obtener(i) for i in st.session_state.get('trabajos', [])]
+    lista = [t for t in lista if t is not None]
+    st.session_state.trabajos = [t.id for t in lista]
+    return lista
+
+def mostrar_trabajos(refrescar=False):
     """
-    Ganancia Neta = (Monto Total - 7000) por cada venta
+    Avance, cancelación y descarga de los reportes de la sesión. Con
+    refrescar (fragmento que se repite cada segundo), cuando ya no queda
+    ninguno en curso se recarga la página para detener la repetición.
     """
-    ganancia_neta = 0
-    if not ventas.empty:
-        for idx, row in ventas.iterrows():
-            try:
-                monto = float(row.get('Monto', 0))
-                ganancia_por_venta = max(monto - 7000, 0)
-                ganancia_neta += ganancia_por_venta
-            except:
-                continue
-    return ganancia_neta
+    lista = trabajos_de_sesion()
+    if refrescar and all(t.terminado for t in lista):
+        st.rerun()
+    for trabajo in reversed(lista):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            if trabajo.estado == trabajos.LISTO:
+                st.markdown(f"✅ **{trabajo.nombre}** · {trabajo.duracion:.1f} s")
+            elif trabajo.estado == trabajos.ERROR:
+                st.markdown(f"❌ **{trabajo.nombre}**: {trabajo.error}")
+            elif trabajo.estado == trabajos.CANCELADO:
+                st.markdown(f"🚫 **{trabajo.nombre}** cancelado")
+            else:
+                st.progress(trabajo.avance, text=f"⏳ {trabajo.nombre} ({trabajo.estado})")
+        with col2:
+            if trabajo.estado == trabajos.LISTO:
+                nombre_reporte, buffer_reporte, mime_reporte = trabajo.resultado
+                # Se lee del búfer en disco solo al hacer clic, no en cada ejecución
+                st.download_button("💾 Descargar", lambda buffer=buffer_reporte: leer_reporte(buffer),
+                                   file_name=nombre_reporte, mime=mime_reporte, key=f"descargar_{trabajo.id}",
+                                   use_container_width=True)
+            elif not trabajo.terminado:
+                if st.button("🚫 Cancelar", key=f"cancelar_{trabajo.id}", use_container_width=True):
+                    soltar_trabajo(trabajo)
+                    st.rerun()
+            if trabajo.terminado and st.button("🗑️ Quitar", key=f"quitar_{trabajo.id}", use_container_width=True):
+                soltar_trabajo(trabajo)
+                st.rerun()
+
+# ===== GRÁFICAS =====
+# Las figuras se guardan en caché por versión de las ventas y parámetros de
+# la vista (los DataFrames con "_" no entran en la clave de la caché).
+def version_grafica():
+    return version_de("ventas")
+
+def top_con_otros(serie, n=GRAFICA_TOP_CLIENTES):
+    """Los n mayores valores y el resto sumado en una sola barra de otros"""
+    serie = serie.sort_values(ascending=False)
+    serie.index = serie.index.astype(str)
+    if len(serie) <= n:
+        return serie
+    resto = serie.iloc[n:]
+    return pd.concat([serie.iloc[:n], pd.Series({f"Otros ({len(resto)})": resto.sum()})])
+
+def figura_barras(serie, titulo, eje_x, eje_y, nombre, color, etiqueta, tendencia=None):
+    """Barras de una serie con línea de tendencia opcional"""
+    go = rendimiento.importar("plotly.graph_objects")
+    fig = go.Figure()
+    # Las etiquetas las arma el navegador con texttemplate
+    fig.add_trace(go.Bar(
+        x=serie.index,
+        y=serie.to_numpy(),
+        name=nombre,
+        marker_color=color,
+        texttemplate=etiqueta if len(serie) <= GRAFICA_MAX_ETIQUETAS else None,
+        textposition='outside'
+    ))
+    if tendencia:
+        fig.add_trace(go.Scatter(
+            x=serie.index,
+            y=serie.to_numpy(),
+            name='Tendencia',
+            mode='lines+markers',
+            line=dict(color=tendencia, width=3),
+            marker=dict(size=8)
+        ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title=eje_x,
+        yaxis_title=eje_y,
+        hovermode='x unified',
+        height=400,
+        showlegend=tendencia is not None
+    )
+    return fig
+
+@st.cache_resource(max_entries=GRAFICAS_MAX_ENTRADAS, show_spinner=False)
+def figura_por_mes(version, _agregados):
+    por_mes = _agregados.groupby('Mes')['Cantidad'].sum()
+    por_mes.index = por_mes.index.astype(str)
+    return figura_barras(por_mes, "📊 INVENTARIO POR MES", "Mes", "Cantidad de Productos",
+                         'Cantidad de Productos', '#16a085', '%{y}')
+
+@st.cache_resource(max_entries=GRAFICAS_MAX_ENTRADAS, show_spinner=False)
+def figura_por_dia(version, mes, _agregados):
+    periodo = pd.Period(mes)
+    ventas_mes = filas_en_rango(_agregados, periodo.start_time, periodo.end_time, columna='Dia')
+    por_dia = ventas_mes.groupby('Dia')['Cantidad'].sum()
+    por_dia.index = por_dia.index.date
+    return figura_barras(por_dia, f"📊 COMPORTAMIENTO DEL INVENTARIO - {mes}", "Día", "Cantidad de Productos",
+                         'Cantidad de Productos', '#e74c3c', '%{y}', tendencia='#3498db')
+
+@st.cache_resource(max_entries=GRAFICAS_MAX_ENTRADAS, show_spinner=False)
+def figura_ultimos_dias(version, hoy, dias, _agregados):
+    recientes = filas_en_rango(_agregados, hoy - timedelta(days=dias), columna='Dia')
+    if recientes.empty:
+        return None
+    por_dia = recientes.groupby('Dia')['Monto'].sum().sort_index()
+    por_dia.index = por_dia.index.date
+    return figura_barras(por_dia, f"📈 COMPORTAMIENTO DE VENTAS - ÚLTIMOS {dias} DÍAS", "Fecha", "Monto ($)",
+                         'Monto de Ventas', '#16a085', '$%{y:,.0f}', tendencia='#e74c3c')
+
+@st.cache_resource(max_entries=GRAFICAS_MAX_ENTRADAS, show_spinner=False)
+def figura_por_cliente(version, _ventas):
+    """Top de clientes por monto; los demás van en una sola barra"""
+    px = rendimiento.importar("plotly.express")
+    por_cliente = top_con_otros(_ventas.groupby('Cliente', observed=True)['Monto'].sum())
+    ventas_grafico = por_cliente.rename_axis('Cliente').reset_index(name='Monto')
+    return px.bar(ventas_grafico, x='Cliente', y='Monto',
+                  title=f'Ventas por Cliente (top {GRAFICA_TOP_CLIENTES})',
+                  labels={'Monto': 'Monto ($)', 'Cliente': 'Cliente'},
+                  color='Monto', color_continuous_scale='Viridis')
+
+# ===== SELECTOR DE CLIENTES =====
+def selector_cliente(clientes, clave):
+    """Buscador y selector de cliente (solo las coincidencias); retorna el nombre, o "Sin clientes" si no hay"""
+    busqueda = st.text_input("🔍 Buscar cliente", key=f"{clave}_busqueda")
+    # Ventas y créditos se guardan por nombre: se elige el nombre, no la fila
+    nombres = pd.unique(clientes.loc[buscar_clientes(clientes, busqueda), 'Nombre']).tolist()
+    nombre = st.selectbox("Cliente", nombres, key=clave, placeholder="Sin clientes")
+    return nombre if nombre is not None else "Sin clientes"
+
+# ===== RENDIMIENTO =====
+def es_administrador(usuario):
+    return usuario in ADMINISTRADORES
+
+def mostrar_rendimiento():
+    """Panel de la barra lateral: tiempos de esta ejecución, percentiles y perfil"""
+    medidor = rendimiento.actual()
+    with st.sidebar.expander("⏱️ Rendimiento"):
+        if medidor is not None:
+            st.caption(f"Esta ejecución: {medidor.total() * 1000:,.0f} ms")
+            st.dataframe(medidor.tabla().round(1), hide_index=True, use_container_width=True)
+        st.caption("Percentiles (últimas 1000 ejecuciones, ms)")
+        st.dataframe(rendimiento.percentiles(RENDIMIENTO_LOG), hide_index=True, use_container_width=True)
+        if st.button("🔬 Perfilar la próxima ejecución", use_container_width=True):
+            st.session_state.perfilar = True
+            st.rerun()
+        if 'perfil_rendimiento' in st.session_state:
+            texto_perfil, datos_perfil = st.session_state.perfil_rendimiento
+            st.download_button("💾 Perfil (.prof)", datos_perfil, file_name="perfil.prof",
+                               mime="application/octet-stream", use_container_width=True)
+            st.download_button("💾 Perfil (.txt)", texto_perfil, file_name="perfil.txt",
+                               mime="text/plain", use_container_width=True)
 
 # ===== SESIÓN =====
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
-if 'usuario' not in st.session_state:
-    st.session_state.usuario = None
-
-# ===== LOGIN =====
-if not st.session_state.authenticated:
-    st.title("🔐 BIODESICION - INVENTORY")
-    st.subheader("Sistema de Gestión de Inventario")
-    
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col2:
-        st.markdown("---")
-        usuario = st.text_input("👤 Usuario", placeholder="Ingresa tu usuario")
-        contraseña = st.text_input("🔑 Contraseña", type="password", placeholder="Ingresa tu contraseña")
-        
-        col_login, col_exit = st.columns(2)
-        
-        with col_login:
-            if st.button("✅ Iniciar Sesión", use_container_width=True):
-                if verificar_usuario(usuario, contraseña):
-                    st.session_state.authenticated = True
-                    st.session_state.usuario = usuario
-                    st.success("✅ ¡Bienvenido!")
-                    st.rerun()
-                else:
-                    st.error("❌ Usuario o contraseña incorrectos")
-        
-        with col_exit:
-            if st.button("❌ Salir", use_container_width=True):
-                st.info("Hasta luego")
-        st.markdown("---")
-
-# ===== APLICACIÓN PRINCIPAL =====
-else:
-    st.sidebar.title(f"👤 {st.session_state.usuario}")
-    st.sidebar.markdown(f"⏰ {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    
-    if st.sidebar.button("🚪 Cerrar Sesión", use_container_width=True):
+# La medición se cierra siempre, también cuando la ejecución termina con
+# st.rerun(), st.stop() o un error (incluida la pantalla de login)
+menu = None
+try:
+    if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
+    if 'usuario' not in st.session_state:
         st.session_state.usuario = None
-        st.rerun()
-    
-    st.sidebar.markdown("---")
-    
-    # Cargar datos
-    inventario, clientes, ventas, creditos = cargar_datos()
-    
-    # Menú de navegación
-    menu = st.sidebar.radio(
-        "📋 MENÚ",
-        ["📊 Dashboard", "👥 Clientes", "📦 Productos", "🛒 Ventas", "💳 Créditos", "📈 Reportes"]
-    )
-    
-    # ===== DASHBOARD =====
-    if menu == "📊 Dashboard":
-        st.title("📊 PANEL DE CONTROL")
+    if 'tienda' not in st.session_state:
+        st.session_state.tienda = None
+        st.session_state.directorio_tienda = DATOS_DIR
+
+    # Carpeta de datos de la tienda elegida al iniciar sesión (cada ejecución
+    # corre en su propio hilo); completa una escritura que quedó a medias
+    usar_tienda(st.session_state.directorio_tienda)
+
+    # ===== LOGIN =====
+    if not st.session_state.authenticated:
+        st.title("🔐 BIODESICION - INVENTORY")
+        st.subheader("Sistema de Gestión de Inventario")
         
-        # Calcular estadísticas
-        venta_total = ventas['Monto'].sum() if not ventas.empty else 0
-        creditos_pendientes = creditos[creditos['Pagado'] == False]['Monto'].sum() if not creditos.empty else 0
-        valor_inventario = (inventario['Cantidad'] * inventario['Valor_Unitario']).sum() if not inventario.empty else 0
-        ganancia_neta = calcular_ganancia_neta(ventas)
+        col1, col2, col3 = st.columns([1, 2, 1])
         
-        # Mostrar métricas
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("👥 CLIENTES", len(clientes))
         with col2:
-            st.metric("📦 INVENTARIO", f"${valor_inventario:,.0f}")
-        with col3:
-            st.metric("💲 GANANCIA NETA", f"${ganancia_neta:,.0f}")
+            st.markdown("---")
+            usuario = st.text_input("👤 Usuario", placeholder="Ingresa tu usuario")
+            contraseña = st.text_input("🔑 Contraseña", type="password", placeholder="Ingresa tu contraseña")
+            tiendas = cargar_tiendas()
+            if len(tiendas) > 1:
+                tienda = st.selectbox("🏬 Tienda", list(tiendas))
+            else:
+                tienda = next(iter(tiendas))
+            
+            col_login, col_exit = st.columns(2)
+            
+            with col_login:
+                if st.button("✅ Iniciar Sesión", use_container_width=True):
+                    if verificar_usuario(usuario, contraseña):
+                        st.session_state.authenticated = True
+                        st.session_state.usuario = usuario
+                        st.session_state.tienda = tienda
+                        st.session_state.directorio_tienda = tiendas[tienda]
+                        st.success("✅ ¡Bienvenido!")
+                        st.rerun()
+                    else:
+                        st.error("❌ Usuario o contraseña incorrectos")
+            
+            with col_exit:
+                if st.button("❌ Salir", use_container_width=True):
+                    st.info("Hasta luego")
+            st.markdown("---")
+
+    # ===== APLICACIÓN PRINCIPAL =====
+    else:
+        st.sidebar.title(f"👤 {st.session_state.usuario}")
+        if st.session_state.tienda:
+            st.sidebar.markdown(f"🏬 {st.session_state.tienda}")
+        st.sidebar.markdown(f"⏰ {datetime.now().strftime('%d/%m/%Y %H:%M')}")
         
-        col4, col5 = st.columns(2)
-        with col4:
-            st.metric("💳 VENTA TOTAL", f"${venta_total:,.0f}")
-        with col5:
-            st.metric("💳 CRÉDITO PENDIENTE", f"${creditos_pendientes:,.0f}")
+        if st.sidebar.button("🚪 Cerrar Sesión", use_container_width=True):
+            st.session_state.authenticated = False
+            st.session_state.usuario = None
+            st.session_state.tienda = None
+            st.session_state.directorio_tienda = DATOS_DIR
+            st.rerun()
         
-        st.markdown("---")
+        st.sidebar.markdown("---")
         
-        # ===== GRÁFICA DE COMPORTAMIENTO DEL INVENTARIO =====
-        st.subheader("📊 COMPORTAMIENTO DEL INVENTARIO")
+        # Cargar datos (el historial de ventas completo solo en la pantalla de ventas)
+        inventario, clientes, creditos = cargar_tabla("inventario"), cargar_tabla("clientes"), cargar_tabla("creditos")
+        alertas = cargar_alertas(inventario)
+        rendimiento.marca("carga")
         
-        # Filtro de vista
-        opcion_vista = st.radio("Ver por:", ["Mes Completo", "Filtrar por Mes"], horizontal=True)
+        # Alertas de stock (conjunto guardado, sin recorrer el catálogo)
+        if not alertas.empty:
+            with st.sidebar.expander(f"⚠️ Stock bajo ({len(alertas)})"):
+                st.dataframe(alertas[["Caja", "Cantidad", "Punto_Reorden"]].rename(columns={"Punto_Reorden": "Reorden"}),
+                             use_container_width=True, hide_index=True)
         
-        if not ventas.empty:
-            ventas_copy = ventas.copy()
-            ventas_copy['Fecha'] = pd.to_datetime(ventas_copy['Fecha'])
-            ventas_copy['Mes'] = ventas_copy['Fecha'].dt.to_period('M')
-            ventas_copy['Día'] = ventas_copy['Fecha'].dt.date
-            
-            if opcion_vista == "Mes Completo":
-                # Mostrar por mes
-                ventas_por_mes = ventas_copy.groupby('Mes')['Cantidad'].sum().reset_index()
-                ventas_por_mes['Mes'] = ventas_por_mes['Mes'].astype(str)
-                
-                fig_mes = go.Figure()
-                fig_mes.add_trace(go.Bar(
-                    x=ventas_por_mes['Mes'],
-                    y=ventas_por_mes['Cantidad'],
-                    name='Cantidad de Productos',
-                    marker_color='#16a085',
-                    text=ventas_por_mes['Cantidad'],
-                    textposition='outside'
-                ))
-                fig_mes.update_layout(
-                    title="📊 INVENTARIO POR MES",
-                    xaxis_title="Mes",
-                    yaxis_title="Cantidad de Productos",
-                    hovermode='x unified',
-                    height=400
-                )
-                st.plotly_chart(fig_mes, use_container_width=True)
+        # Menú de navegación
+        opciones_menu = ["📊 Dashboard", "👥 Clientes", "📦 Productos", "🛒 Ventas", "💳 Créditos", "📈 Reportes"]
+        if es_administrador(st.session_state.usuario):
+            opciones_menu.append("🏬 Consolidado")
+        menu = st.sidebar.radio("📋 MENÚ", opciones_menu)
+        
+        # ===== DASHBOARD =====
+        if menu == "📊 Dashboard":
+            st.title("📊 PANEL DE CONTROL")
+            
+            # Estadísticas desde el resumen guardado
+            resumen = cargar_resumen(inventario, creditos)
+            venta_total = resumen["venta_total"]
+            creditos_pendientes = resumen["credito_pendiente"]
+            valor_inventario = resumen["valor_inventario"]
+            ganancia_neta = resumen["ganancia_neta"]
+            
+            # Mostrar métricas
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("👥 CLIENTES", len(clientes))
+            with col2:
+                st.metric("📦 INVENTARIO", f"${valor_inventario:,.0f}")
+            with col3:
+                st.metric("💲 GANANCIA NETA", f"${ganancia_neta:,.0f}")
+            
+            col4, col5 = st.columns(2)
+            with col4:
+                st.metric("💳 VENTA TOTAL", f"${venta_total:,.0f}")
+            with col5:
+                st.metric("💳 CRÉDITO PENDIENTE", f"${creditos_pendientes:,.0f}")
             
+            st.markdown("---")
+            rendimiento.marca("dashboard: indicadores")
+            
+            # ===== GRÁFICA DE COMPORTAMIENTO DEL INVENTARIO =====
+            st.subheader("📊 COMPORTAMIENTO DEL INVENTARIO")
+            
+            # Filtro de vista
+            opcion_vista = st.radio("Ver por:", ["Mes Completo", "Filtrar por Mes"], horizontal=True)
+            
+            # Las dos gráficas usan los agregados diarios, no las ventas
+            agregados = cargar_agregados()
+            agregados['Mes'] = agregados['Dia'].dt.to_period('M')
+            
+            if not agregados.empty:
+                if opcion_vista == "Mes Completo":
+                    # Mostrar por mes
+                    st.plotly_chart(figura_por_mes(version_grafica(), agregados), use_container_width=True)
+                
+                else:
+                    # Filtrar por mes específico
+                    meses_disponibles = sorted(agregados['Mes'].unique(), reverse=True)
+                    if len(meses_disponibles) > 0:
+                        mes_seleccionado = st.selectbox(
+                            "Selecciona un mes:",
+                            meses_disponibles,
+                            format_func=lambda x: str(x)
+                        )
+                        
+                        fig_dia = figura_por_dia(version_grafica(), str(mes_seleccionado), agregados)
+                        st.plotly_chart(fig_dia, use_container_width=True)
+                    else:
+                        st.info("Sin datos disponibles")
             else:
-                # Filtrar por mes específico
-                meses_disponibles = sorted(ventas_copy['Mes'].unique(), reverse=True)
-                if len(meses_disponibles) > 0:
-                    mes_seleccionado = st.selectbox(
-                        "Selecciona un mes:",
-                        meses_disponibles,
-                        format_func=lambda x: str(x)
-                    )
-                    
-                    ventas_mes = ventas_copy[ventas_copy['Mes'] == mes_seleccionado]
-                    ventas_por_dia = ventas_mes.groupby('Día')['Cantidad'].sum().reset_index()
-                    
-                    fig_dia = go.Figure()
-                    fig_dia.add_trace(go.Bar(
-                        x=ventas_por_dia['Día'],
-                        y=ventas_por_dia['Cantidad'],
-                        name='Cantidad de Productos',
-                        marker_color='#e74c3c',
-                        text=ventas_por_dia['Cantidad'],
-                        textposition='outside'
-                    ))
-                    fig_dia.add_trace(go.Scatter(
-                        x=ventas_por_dia['Día'],
-                        y=ventas_por_dia['Cantidad'],
-                        name='Tendencia',
-                        mode='lines+markers',
-                        line=dict(color='#3498db', width=3),
-                        marker=dict(size=8)
-                    ))
-                    fig_dia.update_layout(
-                        title=f"📊 COMPORTAMIENTO DEL INVENTARIO - {mes_seleccionado}",
-                        xaxis_title="Día",
-                        yaxis_title="Cantidad de Productos",
-                        hovermode='x unified',
-                        height=400
-                    )
-                    st.plotly_chart(fig_dia, use_container_width=True)
+                st.info("Sin datos de inventario")
+            
+            st.markdown("---")
+            rendimiento.marca("dashboard: gráfica de inventario")
+            
+            # ===== GRÁFICA DE COMPORTAMIENTO DE VENTAS =====
+            st.subheader("📈 COMPORTAMIENTO DE VENTAS (Últimos 30 Días)")
+            
+            if not agregados.empty:
+                fig = figura_ultimos_dias(version_grafica(), datetime.now().date(), 30, agregados)
+                if fig is not None:
+                    st.plotly_chart(fig, use_container_width=True)
                 else:
-                    st.info("Sin datos disponibles")
-        else:
-            st.info("Sin datos de inventario")
-        
-        st.markdown("---")
-        
-        # ===== GRÁFICA DE COMPORTAMIENTO DE VENTAS =====
-        st.subheader("📈 COMPORTAMIENTO DE VENTAS (Últimos 30 Días)")
-        
-        if not ventas.empty:
-            ventas_copy = ventas.copy()
-            ventas_copy['Fecha'] = pd.to_datetime(ventas_copy['Fecha']).dt.date
-            fecha_limite = datetime.now().date() - timedelta(days=30)
-            ventas_copy = ventas_copy[ventas_copy['Fecha'] >= fecha_limite]
-            
-            if not ventas_copy.empty:
-                ventas_agrupadas = ventas_copy.groupby('Fecha')['Monto'].sum().sort_index()
-                
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=ventas_agrupadas.index,
-                    y=ventas_agrupadas.values,
-                    name='Monto de Ventas',
-                    marker_color='#16a085',
-                    text=[f'${v:,.0f}' for v in ventas_agrupadas.values],
-                    textposition='outside'
-                ))
-                fig.add_trace(go.Scatter(
-                    x=ventas_agrupadas.index,
-                    y=ventas_agrupadas.values,
-                    name='Tendencia',
-                    mode='lines+markers',
-                    line=dict(color='#e74c3c', width=3),
-                    marker=dict(size=8)
-                ))
-                fig.update_layout(
-                    title="📈 COMPORTAMIENTO DE VENTAS - ÚLTIMOS 30 DÍAS",
-                    xaxis_title="Fecha",
-                    yaxis_title="Monto ($)",
-                    hovermode='x unified',
-                    height=400,
-                    showlegend=True
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                    st.info("Sin datos en últimos 30 días")
             else:
-                st.info("Sin datos en últimos 30 días")
-        else:
-            st.info("Sin datos de ventas")
-        
-        st.markdown("---")
-        
-        # Tabla de últimas ventas
-        st.subheader("Últimas Ventas")
-        if not ventas.empty:
-            ventas_display = ventas.tail(15)[['Fecha', 'Cliente', 'Caja', 'Cantidad', 'Monto']].copy()
-            ventas_display['Fecha'] = ventas_display['Fecha'].dt.strftime("%d/%m/%Y")
-            ventas_display['Monto'] = ventas_display['Monto'].apply(lambda x: f"${x:,.0f}")
-            st.dataframe(ventas_display, use_container_width=True, hide_index=True)
-        else:
-            st.info("Sin ventas registradas")
-    
-    # ===== CLIENTES =====
-    elif menu == "👥 Clientes":
-        st.title("👥 GESTIÓN DE CLIENTES")
-        
-        tab1, tab2 = st.tabs(["Ver Clientes", "Agregar Cliente"])
+                st.info("Sin datos de ventas")
+            
+            st.markdown("---")
+            
+            # Tabla de últimas ventas
+            st.subheader("Últimas Ventas")
+            recientes = ultimas_ventas(15)
+            if not recientes.empty:
+                ventas_display = recientes[['Fecha', 'Cliente', 'Caja', 'Cantidad', 'Monto']].copy()
+                ventas_display['Fecha'] = ventas_display['Fecha'].dt.strftime("%d/%m/%Y")
+                ventas_display['Monto'] = ventas_display['Monto'].apply(lambda x: f"${x:,.0f}")
+                st.dataframe(ventas_display, use_container_width=True, hide_index=True)
+            else:
+                st.info("Sin ventas registradas")
         
-        with tab1:
-            if not clientes.empty:
-                st.dataframe(clientes, use_container_width=True, hide_index=True)
-                
-                # Eliminar cliente
-                st.subheader("Eliminar Cliente")
+        # ===== CLIENTES =====
+        elif menu == "👥 Clientes":
+            st.title("👥 GESTIÓN DE CLIENTES")
+            
+            tab1, tab2 = st.tabs(["Ver Clientes", "Agregar Cliente"])
+            
+            with tab1:
                 if not clientes.empty:
-                    cliente_a_eliminar = st.selectbox("Selecciona cliente a eliminar", clientes['Nombre'].tolist())
-                    if st.button("🗑️ Eliminar", key="eliminar_cliente"):
-                        clientes = clientes[clientes['Nombre'] != cliente_a_eliminar].reset_index(drop=True)
-                        guardar_datos(inventario, clientes, ventas, creditos)
-                        st.success("✅ Cliente eliminado")
+                    # Solo se muestran las coincidencias de la búsqueda (o los primeros por nombre)
+                    busqueda = st.text_input("🔍 Buscar cliente", key="clientes_busqueda")
+                    filas = buscar_clientes(clientes, busqueda)
+                    st.dataframe(clientes.loc[filas], use_container_width=True, hide_index=True)
+                    st.caption(f"Mostrando {len(filas)} de {len(clientes)} clientes "
+                               f"(hasta {CLIENTES_MAX_RESULTADOS}; busca por nombre para ver otros)")
+                    
+                    # Eliminar cliente: por fila, para no borrar a los homónimos
+                    st.subheader("Eliminar Cliente")
+                    if filas:
+                        fila_a_eliminar = st.selectbox("Selecciona cliente a eliminar", filas,
+                                                       format_func=lambda f: etiqueta_cliente(clientes, f),
+                                                       index=None, placeholder="Selecciona un cliente",
+                                                       key="cliente_a_eliminar")
+                        if st.button("🗑️ Eliminar", key="eliminar_cliente") and fila_a_eliminar is not None:
+                            if not eliminar_cliente(clientes, fila_a_eliminar):
+                                st.error(MENSAJE_CONFLICTO)
+                                st.stop()
+                            st.success("✅ Cliente eliminado")
+                            st.rerun()
+                else:
+                    st.info("Sin clientes registrados")
+            
+            with tab2:
+                st.subheader("Agregar Nuevo Cliente")
+                nombre = st.text_input("Nombre")
+                cedula = st.text_input("Cédula")
+                telefono = st.text_input("Teléfono")
+                
+                if st.button("💾 Guardar Cliente", use_container_width=True):
+                    if nombre and cedula and cliente_por_cedula(clientes, cedula) is not None:
+                        st.error("❌ Ya existe un cliente con esa cédula")
+                    elif nombre and cedula and cliente_por_nombre(clientes, nombre) is not None:
+                        st.error("❌ Ya existe un cliente con ese nombre")
+                    elif nombre and cedula:
+                        if not agregar_cliente(nombre, cedula, telefono):
+                            st.error(MENSAJE_CONFLICTO)
+                            st.stop()
+                        st.success("✅ Cliente agregado")
                         st.rerun()
-            else:
-                st.info("Sin clientes registrados")
+                    else:
+                        st.error("Completa nombre y cédula")
         
-        with tab2:
-            st.subheader("Agregar Nuevo Cliente")
-            nombre = st.text_input("Nombre")
-            cedula = st.text_input("Cédula")
-            telefono = st.text_input("Teléfono")
-            
-            if st.button("💾 Guardar Cliente", use_container_width=True):
-                if nombre and cedula:
-                    nuevo = pd.DataFrame({
-                        "Nombre": [nombre],
-                        "Cedula": [cedula],
-                        "Telefono": [telefono]
-                    })
-                    clientes = pd.concat([clientes, nuevo], ignore_index=True)
-                    guardar_datos(inventario, clientes, ventas, creditos)
-                    st.success("✅ Cliente agregado")
-                    st.rerun()
+        # ===== PRODUCTOS =====
+        elif menu == "📦 Productos":
+            st.title("📦 GESTIÓN DE PRODUCTOS (CAJAS)")
+            
+            tab1, tab2, tab3, tab_reposicion = st.tabs(["Ver Cajas", "Agregar Nueva Caja", "➕ AGREGAR UNIDADES",
+                                                        "🔮 Reposición Sugerida"])
+            
+            with tab1:
+                if not inventario.empty:
+                    st.subheader("📊 Inventario de Cajas")
+                    
+                    # Filtros: solo se dibujan las cajas de la página actual
+                    col_buscar, col_orden, col_bajo = st.columns([3, 2, 1.5])
+                    with col_buscar:
+                        busqueda = st.text_input("🔍 Buscar caja", key="productos_busqueda")
+                    with col_orden:
+                        orden = st.selectbox("Ordenar por", list(ORDENES_PRODUCTOS), key="productos_orden")
+                    with col_bajo:
+                        solo_stock_bajo = st.checkbox("⚠️ Solo stock bajo", key="productos_stock_bajo")
+                    
+                    productos = filtrar_productos(inventario, busqueda, solo_stock_bajo, orden)
+                    
+                    col_tamano, col_pagina = st.columns(2)
+                    with col_tamano:
+                        por_pagina = st.selectbox("Cajas por página", PRODUCTOS_POR_PAGINA, key="productos_por_pagina")
+                    total_paginas = max(1, -(-len(productos) // por_pagina))
+                    with col_pagina:
+                        pagina = st.number_input(f"Página (de {total_paginas})", min_value=1,
+                                                 max_value=total_paginas, value=1, key="productos_pagina")
+                    
+                    st.caption(f"{len(productos)} caja(s) encontradas")
+                    inicio = (int(pagina) - 1) * por_pagina
+                    
+                    # Crear tabla con formato especial
+                    ids_alerta = set(alertas["ID"].tolist())
+                    for row in productos.iloc[inicio:inicio + por_pagina].itertuples(index=False):
+                        col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1.5, 1.5])
+                        
+                        with col1:
+                            st.write(f"**📦 Caja:** {row.Caja}")
+                        
+                        with col2:
+                            st.write(f"**💰 Precio:** ${row.Valor_Unitario:,.0f}")
+                        
+                        with col3:
+                            cantidad = int(row.Cantidad)
+                            if row.ID in ids_alerta:
+                                st.warning(f"**⚠️ Stock:** {cantidad} unidades (reorden: {int(row.Punto_Reorden)})")
+                            else:
+                                st.write(f"**📦 Stock:** {cantidad} unidades")
+                        
+                        with col4:
+                            st.write(f"**📈 Total Registrado:** {int(row.Cantidad_Total)} unidades")
+                        
+                        with col5:
+                            if st.button("🗑️ Eliminar", key=f"eliminar_caja_{int(row.ID)}"):
+                                if not eliminar_caja(int(row.ID)):
+                                    st.error(MENSAJE_CONFLICTO)
+                                    st.stop()
+                                st.success("✅ Caja eliminada")
+                                st.rerun()
+                        
+                        st.divider()
                 else:
-                    st.error("Completa nombre y cédula")
-    
-    # ===== PRODUCTOS =====
-    elif menu == "📦 Productos":
-        st.title("📦 GESTIÓN DE PRODUCTOS (CAJAS)")
-        
-        tab1, tab2, tab3 = st.tabs(["Ver Cajas", "Agregar Nueva Caja", "➕ AGREGAR UNIDADES"])
-        
-        with tab1:
-            if not inventario.empty:
-                st.subheader("📊 Inventario de Cajas")
+                    st.info("Sin cajas registradas")
+            
+            with tab2:
+                st.subheader("Agregar Nueva Caja")
+                caja = st.text_input("Nombre de la Caja")
+                cantidad = st.number_input("Cantidad Inicial", min_value=1, value=1)
+                valor_unitario = st.number_input("Valor Unitario ($)", min_value=0, value=0, step=1000)
+                punto_reorden = st.number_input("Punto de Reorden (alerta con este stock o menos)", min_value=0,
+                                                value=PUNTO_REORDEN_DEFECTO)
                 
-                # Crear tabla con formato especial
-                for idx, row in inventario.iterrows():
-                    col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1.5, 1.5])
+                if st.button("💾 Guardar Caja", use_container_width=True):
+                    if CAJAS_UNICAS and caja in indice_cajas(inventario):
+                        st.error(f"❌ Ya existe una caja llamada '{caja}'")
+                    elif caja and valor_unitario > 0:
+                        if not agregar_caja(caja, cantidad, valor_unitario, punto_reorden):
+                            st.error(MENSAJE_CONFLICTO)
+                            st.stop()
+                        st.success(f"✅ Caja '{caja}' agregada con {cantidad} unidades")
+                        st.rerun()
+                    else:
+                        st.error("Completa todos los campos correctamente")
+            
+            with tab3:
+                st.subheader("➕ AGREGAR UNIDADES A UNA CAJA")
+                
+                if not inventario.empty:
+                    # Las opciones son las filas; el texto se arma al mostrarlas
+                    indice = st.selectbox(
+                        "🔍 Selecciona una Caja:",
+                        inventario.index.tolist(),
+                        format_func=lambda i: f"{inventario.at[i, 'Caja']} - Stock Actual: {int(inventario.at[i, 'Cantidad'])} unidades",
+                        key="agregar_unidades_combo"
+                    )
+                    
+                    cantidad_actual = int(inventario.loc[indice]['Cantidad'])
+                    cantidad_total_registrada = int(inventario.loc[indice]['Cantidad_Total'])
+                    precio_actual = int(inventario.loc[indice]['Valor_Unitario'])
+                    punto_actual = int(inventario.loc[indice]['Punto_Reorden'])
+                    
+                    st.markdown("---")
+                    
+                    col1, col2, col3 = st.columns(3)
                     
                     with col1:
-                        st.write(f"**📦 Caja:** {row['Caja']}")
+                        unidades_agregar = st.number_input("📦 ¿Cuántas unidades deseas agregar?", min_value=1, value=10)
                     
                     with col2:
-                        st.write(f"**💰 Precio:** ${row['Valor_Unitario']:,.0f}")
+                        nuevo_precio = st.number_input("💰 Nuevo Precio Unitario ($)", min_value=0, value=precio_actual, step=1000)
                     
                     with col3:
-                        cantidad = int(row['Cantidad'])
-                        if cantidad <= 2:
-                            st.warning(f"**⚠️ Stock:** {cantidad} unidades")
-                        else:
-                            st.write(f"**📦 Stock:** {cantidad} unidades")
+                        nuevo_punto = st.number_input("⚠️ Punto de Reorden", min_value=0, value=punto_actual)
                     
-                    with col4:
-                        st.write(f"**📈 Total Registrado:** {int(row['Cantidad_Total'])} unidades")
+                    nueva_cantidad = cantidad_actual + unidades_agregar
+                    nueva_cantidad_total = cantidad_total_registrada + unidades_agregar
                     
-                    with col5:
-                        if st.button("🗑️ Eliminar", key=f"eliminar_caja_{idx}"):
-                            inventario = inventario.drop(idx).reset_index(drop=True)
-                            guardar_datos(inventario, clientes, ventas, creditos)
-                            st.success("✅ Caja eliminada")
-                            st.rerun()
+                    # Mostrar información
+                    st.info(f"""
+                    🔍 **INFORMACIÓN DE LA CAJA: {inventario.loc[indice]['Caja']}**
                     
-                    st.divider()
-            else:
-                st.info("Sin cajas registradas")
-        
-        with tab2:
-            st.subheader("Agregar Nueva Caja")
-            caja = st.text_input("Nombre de la Caja")
-            cantidad = st.number_input("Cantidad Inicial", min_value=1, value=1)
-            valor_unitario = st.number_input("Valor Unitario ($)", min_value=0, value=0, step=1000)
-            
-            if st.button("💾 Guardar Caja", use_container_width=True):
-                if caja and valor_unitario > 0:
-                    nuevo = pd.DataFrame({
-                        "Caja": [caja],
-                        "Cantidad": [cantidad],
-                        "Valor_Unitario": [valor_unitario],
-                        "Cantidad_Total": [cantidad]
-                    })
-                    inventario = pd.concat([inventario, nuevo], ignore_index=True)
-                    guardar_datos(inventario, clientes, ventas, creditos)
-                    st.success(f"✅ Caja '{caja}' agregada con {cantidad} unidades")
-                    st.rerun()
+                    **Stock Actual:** {cantidad_actual} unidades  
+                    **Unidades a Agregar:** {unidades_agregar} unidades  
+                    **Stock Final:** {nueva_cantidad} unidades  
+                    
+                    **Total Registrado Anteriormente:** {cantidad_total_registrada} unidades  
+                    **Total Registrado Final:** {nueva_cantidad_total} unidades  
+                    
+                    **Precio Anterior:** ${precio_actual:,.0f}  
+                    **Precio Nuevo:** ${nuevo_precio:,.0f}  
+                    
+                    **Punto de Reorden:** {nuevo_punto} unidades
+                    """)
+                    
+                    if st.button("💾 Guardar Cambios", use_container_width=True, key="guardar_unidades"):
+                        caja_nombre = inventario.loc[indice]["Caja"]
+                        if not agregar_unidades(int(inventario.loc[indice]["ID"]), unidades_agregar, nuevo_precio, nuevo_punto):
+                            st.error("❌ No se pudo actualizar la caja, intenta de nuevo")
+                            st.stop()
+                        st.success(f"""
+                        ✅ Caja '{caja_nombre}' actualizada:
+                        - Se agregaron {unidades_agregar} unidades
+                        - Total registrado: {nueva_cantidad_total} unidades
+                        - Nuevo precio: ${nuevo_precio:,.0f}
+                        """)
+                        st.rerun()
                 else:
-                    st.error("Completa todos los campos correctamente")
+                    st.error("❌ No hay cajas registradas")
+            
+            with tab_reposicion:
+                st.subheader("🔮 REPOSICIÓN SUGERIDA")
+                
+                if not inventario.empty:
+                    reposicion = cargar_reposicion(inventario)
+                    st.caption(f"Demanda diaria: promedio exponencial de los últimos {pronostico.VENTANA_DIAS} días. "
+                               f"Se sugiere reponer para {pronostico.DIAS_ENTREGA} días de entrega "
+                               f"más {pronostico.DIAS_OBJETIVO} días de cobertura.")
+                    
+                    por_reponer = reposicion[reposicion["Reponer"] > 0]
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("📦 Cajas por reponer", len(por_reponer))
+                    with col2:
+                        st.metric("📥 Unidades sugeridas", f"{int(por_reponer['Reponer'].sum()):,}")
+                    
+                    if not st.checkbox("Mostrar todas las cajas", key="reposicion_todas"):
+                        reposicion = por_reponer
+                    st.dataframe(
+                        reposicion.sort_values("Dias_Cobertura", kind="stable").drop(columns="ID"),
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "Cantidad": st.column_config.NumberColumn("Stock"),
+                            "Punto_Reorden": st.column_config.NumberColumn("Reorden actual"),
+                            "Velocidad": st.column_config.NumberColumn("Velocidad (u/día)", format="%.2f"),
+                            "Media_Movil": st.column_config.NumberColumn(f"Media {pronostico.MEDIA_MOVIL_DIAS} días", format="%.2f"),
+                            "Demanda": st.column_config.NumberColumn("Demanda EWMA (u/día)", format="%.2f"),
+                            "Dias_Cobertura": st.column_config.NumberColumn("Días de cobertura", format="%.1f"),
+                            "Punto_Sugerido": st.column_config.NumberColumn("Reorden sugerido"),
+                            "Reponer": st.column_config.NumberColumn("Reponer (u)"),
+                        }
+                    )
+                else:
+                    st.info("Sin cajas registradas")
         
-        with tab3:
-            st.subheader("➕ AGREGAR UNIDADES A UNA CAJA")
+        # ===== VENTAS =====
+        elif menu == "🛒 Ventas":
+            st.title("🛒 REGISTRAR VENTA")
             
-            if not inventario.empty:
-                # Crear opciones de caja
-                opciones = []
-                for idx, row in inventario.iterrows():
-                    text = f"{row['Caja']} - Stock Actual: {int(row['Cantidad'])} unidades"
-                    opciones.append((text, idx))
+            tab1, tab_carrito, tab_importar, tab2 = st.tabs(["Nueva Venta", "Carrito", "Importar", "Historial"])
+            
+            with tab1:
+                col1, col2 = st.columns(2)
                 
-                caja_seleccionada_text = st.selectbox(
-                    "🔍 Selecciona una Caja:",
-                    [opt[0] for opt in opciones],
-                    key="agregar_unidades_combo"
-                )
+                with col1:
+                    fecha = st.date_input("Fecha", value=datetime.now().date())
+                
+                with col2:
+                    cliente = selector_cliente(clientes, "cliente_venta")
                 
-                # Obtener índice
-                indice = next(opt[1] for opt in opciones if opt[0] == caja_seleccionada_text)
+                col3, col4 = st.columns(2)
                 
-                cantidad_actual = int(inventario.iloc[indice]['Cantidad'])
-                cantidad_total_registrada = int(inventario.iloc[indice]['Cantidad_Total'])
-                precio_actual = int(inventario.iloc[indice]['Valor_Unitario'])
+                indice = indice_cajas(inventario)
                 
-                st.markdown("---")
+                with col3:
+                    caja = st.selectbox("Caja", list(indice) if indice else ["Sin cajas"])
+                
+                caja_info = inventario.loc[indice[caja]] if caja in indice else None
+                
+                with col4:
+                    if caja_info is not None:
+                        disponibles = int(caja_info['Cantidad'])
+                        st.metric("Disponibles", disponibles)
+                
+                col5, col6 = st.columns(2)
+                
+                with col5:
+                    cantidad = st.number_input("Cantidad", min_value=1, value=1)
+                
+                with col6:
+                    if caja_info is not None:
+                        valor_unitario = int(caja_info['Valor_Unitario'])
+                        st.metric("Valor Unitario", f"${valor_unitario:,.0f}")
+                    else:
+                        valor_unitario = 0
+                
+                monto = cantidad * valor_unitario
+                st.metric("Monto Total", f"${monto:,.0f}")
+                
+                es_credito = st.checkbox("✅ Venta a Crédito")
+                
+                if st.button("💾 Guardar Venta", use_container_width=True):
+                    if cliente != "Sin clientes" and caja != "Sin cajas":
+                        # Validar stock (se vuelve a validar al registrar la venta)
+                        nueva_cantidad = disponibles - cantidad
+                        if nueva_cantidad < 0:
+                            st.error("❌ No hay suficiente stock")
+                        else:
+                            # Guardar venta
+                            nueva_venta = pd.DataFrame({
+                                "Fecha": [pd.Timestamp(fecha)],
+                                "Cliente": [cliente],
+                                "Caja": [caja],
+                                "Cantidad": [cantidad],
+                                "Valor_Unitario": [valor_unitario],
+                                "Monto": [monto],
+                                "Es_Credito": [es_credito]
+                            })
+                            
+                            # Se anexa al diario (con su crédito si aplica) y el stock se descuenta (SE DESCUENTA AUTOMÁTICAMENTE)
+                            if registrar_venta(nueva_venta):
+                                st.success("✅ Venta guardada y stock actualizado automáticamente")
+                                st.rerun()
+                            else:
+                                st.error("❌ No se pudo guardar la venta: el stock cambió o los datos están ocupados")
+                    else:
+                        st.error("❌ Completa todos los campos")
+            
+            with tab_carrito:
+                if 'carrito' not in st.session_state:
+                    st.session_state.carrito = []
                 
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    unidades_agregar = st.number_input("📦 ¿Cuántas unidades deseas agregar?", min_value=1, value=10)
+                    fecha_carrito = st.date_input("Fecha", value=datetime.now().date(), key="fecha_carrito")
                 
                 with col2:
-                    nuevo_precio = st.number_input("💰 Nuevo Precio Unitario ($)", min_value=0, value=precio_actual, step=1000)
-                
-                nueva_cantidad = cantidad_actual + unidades_agregar
-                nueva_cantidad_total = cantidad_total_registrada + unidades_agregar
-                
-                # Mostrar información
-                st.info(f"""
-                🔍 **INFORMACIÓN DE LA CAJA: {inventario.iloc[indice]['Caja']}**
-                
-                **Stock Actual:** {cantidad_actual} unidades  
-                **Unidades a Agregar:** {unidades_agregar} unidades  
-                **Stock Final:** {nueva_cantidad} unidades  
-                
-                **Total Registrado Anteriormente:** {cantidad_total_registrada} unidades  
-                **Total Registrado Final:** {nueva_cantidad_total} unidades  
-                
-                **Precio Anterior:** ${precio_actual:,.0f}  
-                **Precio Nuevo:** ${nuevo_precio:,.0f}
-                """)
-                
-                if st.button("💾 Guardar Cambios", use_container_width=True, key="guardar_unidades"):
-                    inventario.at[indice, "Cantidad"] = nueva_cantidad
-                    inventario.at[indice, "Cantidad_Total"] = nueva_cantidad_total
-                    inventario.at[indice, "Valor_Unitario"] = nuevo_precio
-                    guardar_datos(inventario, clientes, ventas, creditos)
-                    caja_nombre = inventario.iloc[indice]["Caja"]
-                    st.success(f"""
-                    ✅ Caja '{caja_nombre}' actualizada:
-                    - Se agregaron {unidades_agregar} unidades
-                    - Total registrado: {nueva_cantidad_total} unidades
-                    - Nuevo precio: ${nuevo_precio:,.0f}
-                    """)
-                    st.rerun()
-            else:
-                st.error("❌ No hay cajas registradas")
-    
-    # ===== VENTAS =====
-    elif menu == "🛒 Ventas":
-        st.title("🛒 REGISTRAR VENTA")
+                    cliente_carrito = selector_cliente(clientes, "cliente_carrito")
+                
+                col3, col4 = st.columns(2)
+                
+                with col3:
+                    caja_carrito = st.selectbox("Caja", list(indice) if indice else ["Sin cajas"], key="caja_carrito")
+                
+                with col4:
+                    cantidad_carrito = st.number_input("Cantidad", min_value=1, value=1, key="cantidad_carrito")
+                
+                if st.button("➕ Agregar al carrito", use_container_width=True):
+                    if caja_carrito in indice:
+                        st.session_state.carrito.append({"Caja": caja_carrito, "Cantidad": int(cantidad_carrito)})
+                        st.rerun()
+                
+                if st.session_state.carrito:
+                    credito_carrito = st.checkbox("✅ Venta a Crédito", key="credito_carrito")
+                    lineas = pd.DataFrame(st.session_state.carrito)
+                    lineas.insert(0, "Fecha", pd.Timestamp(fecha_carrito))
+                    lineas.insert(1, "Cliente", cliente_carrito)
+                    lineas["Es_Credito"] = credito_carrito
+                    venta_carrito = armar_venta(lineas, inventario)
+                    
+                    st.dataframe(venta_carrito[['Caja', 'Cantidad', 'Valor_Unitario', 'Monto']],
+                                 use_container_width=True, hide_index=True)
+                    st.metric("Total del Carrito", f"${venta_carrito['Monto'].sum():,.0f}")
+                    
+                    errores = errores_de_venta(venta_carrito, inventario, clientes)
+                    for error in errores:
+                        st.error(f"❌ {error}")
+                    
+                    col5, col6 = st.columns(2)
+                    
+                    with col5:
+                        if st.button("💾 Guardar Carrito", use_container_width=True, disabled=bool(errores)):
+                            if registrar_venta(venta_carrito):
+                                st.session_state.carrito = []
+                                st.success(f"✅ {len(venta_carrito)} líneas guardadas")
+                                st.rerun()
+                            else:
+                                st.error("❌ No se pudo guardar el carrito: el stock cambió o los datos están ocupados")
+                    
+                    with col6:
+                        if st.button("🗑️ Vaciar Carrito", use_container_width=True):
+                            st.session_state.carrito = []
+                            st.rerun()
+                else:
+                    st.info("El carrito está vacío")
+            
+            with tab_importar:
+                st.markdown("Columnas: **Fecha, Cliente, Caja, Cantidad** y opcionalmente **Valor_Unitario** y **Es_Credito**")
+                # Cambiar la clave vacía el cargador después de importar
+                if 'importacion' not in st.session_state:
+                    st.session_state.importacion = 0
+                archivo_ventas = st.file_uploader("Archivo CSV o Excel", type=["csv", "xlsx"],
+                                                  key=f"archivo_ventas_{st.session_state.importacion}")
+                
+                if archivo_ventas is not None:
+                    try:
+                        venta_importada = armar_venta(leer_importacion(archivo_ventas), inventario)
+                    except Exception as e:
+                        st.error(f"❌ No se pudo leer el archivo: {e}")
+                        venta_importada = None
+                    
+                    if venta_importada is not None:
+                        st.dataframe(venta_importada, use_container_width=True, hide_index=True)
+                        st.metric("Total Importado", f"${venta_importada['Monto'].sum():,.0f}")
+                        
+                        errores = errores_de_venta(venta_importada, inventario, clientes)
+                        for error in errores:
+                            st.error(f"❌ {error}")
+                        
+                        if st.button(f"📥 Importar {len(venta_importada)} ventas", use_container_width=True,
+                                     disabled=bool(errores) or venta_importada.empty):
+                            if registrar_venta(venta_importada):
+                                st.session_state.importacion += 1
+                                st.success(f"✅ {len(venta_importada)} ventas importadas")
+                                st.rerun()
+                            else:
+                                st.error("❌ No se pudo importar: el stock cambió o los datos están ocupados")
+            
+            with tab2:
+                st.subheader("Historial de Ventas")
+
+                if 'mostrar_pwd_ventas' not in st.session_state:
+                    st.session_state.mostrar_pwd_ventas = False
+
+                ventas = cargar_tabla("ventas")
+                if not ventas.empty:
+                    ventas_display = ventas[['Fecha', 'Cliente', 'Caja', 'Cantidad', 'Monto', 'Es_Credito']].copy()
+                    ventas_display['Fecha'] = ventas_display['Fecha'].dt.strftime("%d/%m/%Y")
+                    ventas_display.insert(0, 'Seleccionar', False)
+
+                    edited_df = st.data_editor(
+                        ventas_display,
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "Seleccionar": st.column_config.CheckboxColumn("✓", default=False, width="small"),
+                            "Monto": st.column_config.NumberColumn("Monto ($)", format="$%d"),
+                        },
+                        key="tabla_ventas_historial"
+                    )
+
+                    indices_seleccionados = edited_df[edited_df['Seleccionar']].index.tolist()
+                    num_seleccionados = len(indices_seleccionados)
+
+                    if num_seleccionados > 0:
+                        st.info(f"📋 {num_seleccionados} venta(s) seleccionada(s)")
+                        if st.button(
+                            f"🗑️ Eliminar {num_seleccionados} Venta(s) Seleccionada(s)",
+                            type="primary",
+                            key="btn_eliminar_ventas"
+                        ):
+                            st.session_state.mostrar_pwd_ventas = True
+
+                    if st.session_state.get('mostrar_pwd_ventas', False):
+                        st.warning("⚠️ Esta acción eliminará las ventas seleccionadas y restaurará el stock.")
+                        pwd = st.text_input("🔑 Contraseña de confirmación:", type="password", key="pwd_confirm_ventas")
+
+                        col_ok, col_cancel = st.columns(2)
+                        with col_ok:
+                            if st.button("✅ Confirmar Eliminación", key="confirmar_eliminar_ventas"):
+                                if pwd == "112915":
+                                    # Restaura stock y borra ventas y sus créditos por ID de venta
+                                    ids_seleccionados = ventas.loc[indices_seleccionados, 'ID']
+                                    if not eliminar_ventas(ids_seleccionados, inventario, ventas, creditos):
+                                        st.error(MENSAJE_CONFLICTO)
+                                        st.stop()
+                                    st.session_state.mostrar_pwd_ventas = False
+                                    st.success(f"✅ {num_seleccionados} venta(s) eliminada(s) y stock restaurado.")
+                                    st.rerun()
+                                else:
+                                    st.error("❌ Contraseña incorrecta")
+                        with col_cancel:
+                            if st.button("❌ Cancelar", key="cancelar_eliminar_ventas"):
+                                st.session_state.mostrar_pwd_ventas = False
+                                st.rerun()
+                else:
+                    st.info("Sin ventas")
         
-        tab1, tab2 = st.tabs(["Nueva Venta", "Historial"])
+        # ===== CRÉDITOS =====
+        elif menu == "💳 Créditos":
+            st.title("💳 GESTIÓN DE CRÉDITOS")
+            
+            # Saldos por cliente mantenidos con cada crédito y abono
+            saldos = cargar_saldos(creditos)
+            if not saldos.empty:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("💳 TOTAL PENDIENTE", f"${saldos['Saldo'].sum():,.0f}")
+                with col2:
+                    st.metric("👥 CLIENTES CON DEUDA", len(saldos))
+                with col3:
+                    st.metric("📋 REGISTROS PENDIENTES", int(saldos['Creditos'].sum()))
+            
+            st.markdown("---")
+            st.subheader("📋 PERSONAS CON CRÉDITO PENDIENTE")
+            
+            if not saldos.empty:
+                col_buscar, col_tamano = st.columns([3, 1])
+                with col_buscar:
+                    busqueda = st.text_input("🔍 Buscar cliente", key="saldos_busqueda")
+                with col_tamano:
+                    por_pagina = st.selectbox("Clientes por página", SALDOS_POR_PAGINA, key="saldos_por_pagina")
+                if busqueda:
+                    saldos = saldos[saldos['Cliente'].str.contains(busqueda, case=False, regex=False)]
+                total_paginas = max(1, -(-len(saldos) // por_pagina))
+                pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                                         value=1, key="saldos_pagina")
+                inicio = (int(pagina) - 1) * por_pagina
+                
+                for row in saldos.iloc[inicio:inicio + por_pagina].itertuples(index=False):
+                    with st.container():
+                        col1, col2, col3, col4, col5 = st.columns([2, 2, 1.5, 2, 1.3])
+                        
+                        with col1:
+                            st.write(f"**👤 {row.Cliente}**")
+                        
+                        with col2:
+                            st.write(f"**💰 Saldo: ${row.Saldo:,.0f}**")
+                        
+                        with col3:
+                            st.write(f"📋 {int(row.Creditos)} crédito(s)")
+                        
+                        with col4:
+                            monto_abono = st.number_input("Monto del abono", min_value=0, max_value=int(row.Saldo),
+                                                          value=int(row.Saldo), step=1000, key=f"abono_{row.Cliente}",
+                                                          label_visibility="collapsed")
+                        
+                        with col5:
+                            if st.button("💰 Abonar", key=f"abonar_{row.Cliente}", use_container_width=True):
+                                if not registrar_abono(row.Cliente, monto_abono):
+                                    st.error("❌ El abono no es válido o los datos cambiaron en otra sesión")
+                                    st.stop()
+                                st.success(f"✅ Abono registrado: {row.Cliente} abonó ${monto_abono:,.0f}")
+                                st.rerun()
+                        
+                        st.divider()
+                
+                # Detalle de un cliente: solo se filtran sus créditos al elegirlo
+                with st.expander("📜 Créditos y abonos de un cliente"):
+                    cliente_detalle = st.selectbox("Cliente", saldos['Cliente'].iloc[inicio:inicio + por_pagina].tolist(),
+                                                   index=None, placeholder="Selecciona un cliente", key="saldos_detalle")
+                    if cliente_detalle:
+                        detalle = creditos[creditos['Cliente'].astype(str) == cliente_detalle]
+                        st.dataframe(detalle[['Fecha_Credito', 'Monto', 'Abonado', 'Pagado', 'Fecha_Pago']],
+                                     use_container_width=True, hide_index=True)
+                        st.dataframe(cargar_abonos(cliente_detalle), use_container_width=True, hide_index=True)
+            else:
+                st.info("✅ Sin créditos pendientes - ¡Excelente!")
         
-        with tab1:
+        # ===== REPORTES =====
+        elif menu == "📈 Reportes":
+            st.title("📈 REPORTES Y ANÁLISIS")
+            
+            resumen = cargar_resumen(inventario, creditos)
+            venta_total = resumen["venta_total"]
+            creditos_pendientes = resumen["credito_pendiente"]
+            valor_inventario = resumen["valor_inventario"]
+            ganancia_neta = resumen["ganancia_neta"]
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("💵 Valor Inventario", f"${valor_inventario:,.0f}")
+            with col2:
+                st.metric("💳 Venta Total", f"${venta_total:,.0f}")
+            with col3:
+                st.metric("💳 Crédito Pendiente", f"${creditos_pendientes:,.0f}")
+            with col4:
+                st.metric("💲 Ganancia Neta", f"${ganancia_neta:,.0f}")
+            
+            st.markdown("---")
+            rendimiento.marca("reportes: indicadores")
+            
+            # Período: solo se cargan las ventas del rango
+            st.subheader("📅 Período")
             col1, col2 = st.columns(2)
             
             with col1:
-                fecha = st.date_input("Fecha", value=datetime.now().date())
+                primera_venta = primera_fecha_ventas()
+                primera_fecha = primera_venta.date() if primera_venta is not None else datetime.now().date()
+                desde_reporte = st.date_input("Desde", value=primera_fecha, key="desde_reporte")
             
             with col2:
-                cliente = st.selectbox("Cliente", clientes['Nombre'].tolist() if not clientes.empty else ["Sin clientes"])
+                hasta_reporte = st.date_input("Hasta", value=datetime.now().date(), key="hasta_reporte")
             
-            col3, col4 = st.columns(2)
+            ventas_periodo = cargar_ventas_rango(*limites_dias(desde_reporte, hasta_reporte))
             
-            with col3:
-                caja = st.selectbox("Caja", inventario['Caja'].tolist() if not inventario.empty else ["Sin cajas"])
+            # Ventas por cliente
+            st.subheader("📊 Ventas por Cliente")
+            if not ventas_periodo.empty:
+                ventas_por_cliente = ventas_periodo.groupby('Cliente', observed=True).agg({
+                    'Monto': 'sum',
+                    'Cantidad': 'sum',
+                    'Es_Credito': 'sum'
+                }).reset_index()
+                ventas_por_cliente.columns = ['Cliente', 'Total Vendido', 'Cantidad', 'Crédito']
+                ventas_por_cliente['Total Vendido'] = ventas_por_cliente['Total Vendido'].apply(lambda x: f"${x:,.0f}")
+                
+                st.dataframe(ventas_por_cliente, use_container_width=True, hide_index=True)
+                
+                # Gráfico de ventas por cliente
+                st.plotly_chart(figura_por_cliente((version_grafica(), desde_reporte, hasta_reporte), ventas_periodo),
+                                use_container_width=True)
+            else:
+                st.info("Sin ventas en el período")
             
-            with col4:
-                if caja != "Sin cajas" and not inventario.empty:
-                    caja_info = inventario[inventario['Caja'] == caja].iloc[0]
-                    disponibles = int(caja_info['Cantidad'])
-                    st.metric("Disponibles", disponibles)
+            st.markdown("---")
+            rendimiento.marca("reportes: ventas por cliente")
             
-            col5, col6 = st.columns(2)
+            # Descargar reportes
+            st.subheader("📥 Descargar Reportes")
             
-            with col5:
-                cantidad = st.number_input("Cantidad", min_value=1, value=1)
+            formatos = [f for f in FORMATOS_EXPORTACION if PARQUET_DISPONIBLE or not f.startswith("Parquet")]
+            formato = st.radio("Formato", formatos, horizontal=True, key="formato_reporte")
+            hojas_disponibles = ["Ventas", "Inventario", "Clientes", "Créditos"]
+            
+            if formato.startswith("Excel"):
+                hojas_elegidas = st.multiselect("Hojas", hojas_disponibles, default=hojas_disponibles, key="hojas_reporte")
+            else:
+                hojas_elegidas = [st.selectbox("Tabla", hojas_disponibles, key="tabla_reporte")]
             
-            with col6:
-                if caja != "Sin cajas" and not inventario.empty:
-                    valor_unitario = int(inventario[inventario['Caja'] == caja].iloc[0]['Valor_Unitario'])
-                    st.metric("Valor Unitario", f"${valor_unitario:,.0f}")
+            if st.button("📥 Generar Reporte", use_container_width=True):
+                if not hojas_elegidas:
+                    st.error("❌ Elige al menos una hoja")
+                elif desde_reporte > hasta_reporte:
+                    st.error("❌ El rango de fechas no es válido")
                 else:
-                    valor_unitario = 0
-            
-            monto = cantidad * valor_unitario
-            st.metric("Monto Total", f"${monto:,.0f}")
-            
-            es_credito = st.checkbox("✅ Venta a Crédito")
-            
-            if st.button("💾 Guardar Venta", use_container_width=True):
-                if cliente != "Sin clientes" and caja != "Sin cajas":
-                    # Validar stock
-                    caja_idx = None
-                    nueva_cantidad = 0
-                    for i, row in inventario.iterrows():
-                        if row["Caja"] == caja:
-                            caja_idx = i
-                            nueva_cantidad = int(row["Cantidad"]) - cantidad
-                            if nueva_cantidad < 0:
-                                st.error("❌ No hay suficiente stock")
-                                break
-                            # Actualizar cantidad (SE DESCUENTA AUTOMÁTICAMENTE)
-                            inventario.at[i, "Cantidad"] = nueva_cantidad
-                            break
-                    
-                    if caja_idx is not None and nueva_cantidad >= 0:
-                        # Guardar venta
-                        nueva_venta = pd.DataFrame({
-                            "Fecha": [pd.Timestamp(fecha)],
-                            "Cliente": [cliente],
-                            "Caja": [caja],
-                            "Cantidad": [cantidad],
-                            "Valor_Unitario": [valor_unitario],
-                            "Monto": [monto],
-                            "Es_Credito": [es_credito]
-                        })
-                        ventas = pd.concat([ventas, nueva_venta], ignore_index=True)
-                        
-                        # Guardar crédito si aplica
-                        if es_credito:
-                            nuevo_credito = pd.DataFrame({
-                                "Cliente": [cliente],
-                                "Monto": [monto],
-                                "Fecha_Credito": [pd.Timestamp(fecha)],
-                                "Pagado": [False],
-                                "Fecha_Pago": [pd.NaT]
-                            })
-                            creditos = pd.concat([creditos, nuevo_credito], ignore_index=True)
-                        
-                        guardar_datos(inventario, clientes, ventas, creditos)
-                        st.success("✅ Venta guardada y stock actualizado automáticamente")
-                        st.rerun()
+                    try:
+                        # Se arma en segundo plano (también la lectura de las ventas del rango);
+                        # mismo rango, hojas y datos reutilizan el resultado
+                        clave = (formato, tuple(hojas_elegidas), desde_reporte, hasta_reporte,
+                                 version_de("inventario"), version_de("clientes"),
+                                 version_de("ventas"), version_de("creditos"))
+                        trabajo = ejecutor_trabajos().enviar(
+                            f"{formato} {desde_reporte:%d/%m/%Y}–{hasta_reporte:%d/%m/%Y}",
+                            generar_reporte, directorio_datos(), desde_reporte, hasta_reporte, hojas_elegidas, formato,
+                            inventario, clientes, creditos, clave=clave, sesion=sesion_trabajos()
+                        )
+                        if trabajo.id not in st.session_state.get('trabajos', []):
+                            st.session_state.trabajos = st.session_state.get('trabajos', []) + [trabajo.id]
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+            
+            if trabajos_de_sesion():
+                st.markdown("**Reportes generados**")
+                en_curso = any(not t.terminado for t in trabajos_de_sesion())
+                if hasattr(st, "fragment"):
+                    # Se refresca solo este panel mientras haya reportes en curso
+                    st.fragment(run_every=1 if en_curso else None)(mostrar_trabajos)(en_curso)
                 else:
-                    st.error("❌ Completa todos los campos")
-        
-        with tab2:
-            st.subheader("Historial de Ventas")
-
-            if 'mostrar_pwd_ventas' not in st.session_state:
-                st.session_state.mostrar_pwd_ventas = False
-
-            if not ventas.empty:
-                ventas_display = ventas[['Fecha', 'Cliente', 'Caja', 'Cantidad', 'Monto', 'Es_Credito']].copy()
-                ventas_display['Fecha'] = ventas_display['Fecha'].dt.strftime("%d/%m/%Y")
-                ventas_display.insert(0, 'Seleccionar', False)
-
-                edited_df = st.data_editor(
-                    ventas_display,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Seleccionar": st.column_config.CheckboxColumn("✓", default=False, width="small"),
-                        "Monto": st.column_config.NumberColumn("Monto ($)", format="$%d"),
-                    },
-                    key="tabla_ventas_historial"
-                )
-
-                indices_seleccionados = edited_df[edited_df['Seleccionar']].index.tolist()
-                num_seleccionados = len(indices_seleccionados)
-
-                if num_seleccionados > 0:
-                    st.info(f"📋 {num_seleccionados} venta(s) seleccionada(s)")
-                    if st.button(
-                        f"🗑️ Eliminar {num_seleccionados} Venta(s) Seleccionada(s)",
-                        type="primary",
-                        key="btn_eliminar_ventas"
-                    ):
-                        st.session_state.mostrar_pwd_ventas = True
-
-                if st.session_state.get('mostrar_pwd_ventas', False):
-                    st.warning("⚠️ Esta acción eliminará las ventas seleccionadas y restaurará el stock.")
-                    pwd = st.text_input("🔑 Contraseña de confirmación:", type="password", key="pwd_confirm_ventas")
-
-                    col_ok, col_cancel = st.columns(2)
-                    with col_ok:
-                        if st.button("✅ Confirmar Eliminación", key="confirmar_eliminar_ventas"):
-                            if pwd == "112915":
-                                ventas_a_eliminar = ventas.iloc[indices_seleccionados]
-
-                                # Restaurar stock
-                                for _, venta in ventas_a_eliminar.iterrows():
-                                    idx_caja = inventario[inventario['Caja'] == venta['Caja']].index
-                                    if not idx_caja.empty:
-                                        inventario.at[idx_caja[0], 'Cantidad'] += int(venta['Cantidad'])
-
-                                # Eliminar créditos asociados
-                                for _, venta in ventas_a_eliminar.iterrows():
-                                    if venta.get('Es_Credito', False):
-                                        fecha_venta = venta['Fecha'].date()
-                                        mask = (
-                                            (creditos['Cliente'] == venta['Cliente']) &
-                                            (creditos['Monto'] == venta['Monto']) &
-                                            (creditos['Fecha_Credito'].dt.date == fecha_venta)
-                                        )
-                                        creditos = creditos[~mask].reset_index(drop=True)
-
-                                # Eliminar ventas
-                                ventas = ventas.drop(indices_seleccionados).reset_index(drop=True)
-                                guardar_datos(inventario, clientes, ventas, creditos)
-                                st.session_state.mostrar_pwd_ventas = False
-                                st.success(f"✅ {num_seleccionados} venta(s) eliminada(s) y stock restaurado.")
-                                st.rerun()
-                            else:
-                                st.error("❌ Contraseña incorrecta")
-                    with col_cancel:
-                        if st.button("❌ Cancelar", key="cancelar_eliminar_ventas"):
-                            st.session_state.mostrar_pwd_ventas = False
-                            st.rerun()
-            else:
-                st.info("Sin ventas")
-    
-    # ===== CRÉDITOS =====
-    elif menu == "💳 Créditos":
-        st.title("💳 GESTIÓN DE CRÉDITOS")
+                    mostrar_trabajos()
+                    if en_curso and st.button("🔄 Actualizar"):
+                        st.rerun()
         
-        if not creditos.empty:
-            creditos_pendientes = creditos[creditos['Pagado'] == False]
-            total_credito = creditos_pendientes['Monto'].sum()
-            cantidad_clientes = creditos_pendientes['Cliente'].nunique()
+        # ===== CONSOLIDADO =====
+        elif menu == "🏬 Consolidado":
+            st.title("🏬 CONSOLIDADO DE TIENDAS")
             
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("💳 TOTAL PENDIENTE", f"${total_credito:,.0f}")
-            with col2:
-                st.metric("👥 CLIENTES CON DEUDA", cantidad_clientes)
-            with col3:
-                st.metric("📋 REGISTROS PENDIENTES", len(creditos_pendientes))
-        
-        st.markdown("---")
-        st.subheader("📋 PERSONAS CON CRÉDITO PENDIENTE")
-        
-        if not creditos.empty:
-            for idx, row in creditos.iterrows():
-                with st.container():
-                    col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1.2, 1.3])
-                    
-                    with col1:
-                        st.write(f"**👤 {row['Cliente']}**")
-                    
-                    with col2:
-                        st.write(f"**💰 ${row.get('Monto', 0):,.0f}**")
-                    
-                    with col3:
-                        fecha_credito = row['Fecha_Credito'].strftime("%d/%m/%Y") if pd.notna(row['Fecha_Credito']) else ""
-                        st.write(f"📅 {fecha_credito}")
-                    
-                    with col4:
-                        if row['Pagado']:
-                            st.success("✅ PAGADO")
-                        else:
-                            st.error("❌ PENDIENTE")
-                    
-                    with col5:
-                        if not row['Pagado']:
-                            if st.button("💰 Pagar", key=f"pagar_{idx}", use_container_width=True):
-                                creditos.at[idx, 'Pagado'] = True
-                                creditos.at[idx, 'Fecha_Pago'] = pd.Timestamp(datetime.now())
-                                guardar_datos(inventario, clientes, ventas, creditos)
-                                st.success(f"✅ Pago registrado: {row['Cliente']} pagó ${row['Monto']:,.0f}")
-                                st.rerun()
-                    
-                    st.divider()
-        else:
-            st.info("✅ Sin créditos pendientes - ¡Excelente!")
-    
-    # ===== REPORTES =====
-    elif menu == "📈 Reportes":
-        st.title("📈 REPORTES Y ANÁLISIS")
-        
-        venta_total = ventas['Monto'].sum() if not ventas.empty else 0
-        creditos_pendientes = creditos[creditos['Pagado'] == False]['Monto'].sum() if not creditos.empty else 0
-        valor_inventario = (inventario['Cantidad'] * inventario['Valor_Unitario']).sum() if not inventario.empty else 0
-        ganancia_neta = calcular_ganancia_neta(ventas)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("💵 Valor Inventario", f"${valor_inventario:,.0f}")
-        with col2:
-            st.metric("💳 Venta Total", f"${venta_total:,.0f}")
-        with col3:
-            st.metric("💳 Crédito Pendiente", f"${creditos_pendientes:,.0f}")
-        with col4:
-            st.metric("💲 Ganancia Neta", f"${ganancia_neta:,.0f}")
-        
-        st.markdown("---")
-        
-        # Ventas por cliente
-        st.subheader("📊 Ventas por Cliente")
-        if not ventas.empty:
-            ventas_por_cliente = ventas.groupby('Cliente').agg({
-                'Monto': 'sum',
-                'Cantidad': 'sum',
-                'Es_Credito': 'sum'
-            }).reset_index()
-            ventas_por_cliente.columns = ['Cliente', 'Total Vendido', 'Cantidad', 'Crédito']
-            ventas_por_cliente['Total Vendido'] = ventas_por_cliente['Total Vendido'].apply(lambda x: f"${x:,.0f}")
-            
-            st.dataframe(ventas_por_cliente, use_container_width=True, hide_index=True)
-            
-            # Gráfico de ventas por cliente
-            ventas_grafico = ventas.groupby('Cliente')['Monto'].sum().reset_index()
-            fig = px.bar(ventas_grafico, x='Cliente', y='Monto', title='Ventas por Cliente',
-                        labels={'Monto': 'Monto ($)', 'Cliente': 'Cliente'},
-                        color='Monto', color_continuous_scale='Viridis')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("Sin ventas")
-        
-        st.markdown("---")
-        
-        # Descargar reportes
-        st.subheader("📥 Descargar Reportes")
+            # Cada tienda se calcula en su propio proceso y luego se suman
+            indicadores, agregados_tiendas, errores = cargar_consolidado()
+            for tienda, error in errores.items():
+                st.error(f"❌ {tienda}: {error}")
+            
+            if not indicadores.empty:
+                total = indicadores.drop(columns="Tienda").sum()
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("💵 Valor Inventario", f"${total['valor_inventario']:,.0f}")
+                with col2:
+                    st.metric("💳 Venta Total", f"${total['venta_total']:,.0f}")
+                with col3:
+                    st.metric("💳 Crédito Pendiente", f"${total['credito_pendiente']:,.0f}")
+                with col4:
+                    st.metric("💲 Ganancia Neta", f"${total['ganancia_neta']:,.0f}")
+                
+                st.markdown("---")
+                st.subheader("📋 Indicadores por Tienda")
+                por_tienda = indicadores.rename(columns={
+                    "venta_total": "Venta Total", "ganancia_neta": "Ganancia Neta",
+                    "credito_pendiente": "Crédito Pendiente", "valor_inventario": "Valor Inventario",
+                    "num_ventas": "Ventas", "num_creditos": "Créditos"
+                })
+                st.dataframe(por_tienda, use_container_width=True, hide_index=True, column_config={
+                    columna: st.column_config.NumberColumn(columna, format="$%d")
+                    for columna in ["Venta Total", "Ganancia Neta", "Crédito Pendiente", "Valor Inventario"]
+                })
+                
+                if not agregados_tiendas.empty:
+                    st.subheader("📈 Ventas por Mes y Tienda")
+                    px = rendimiento.importar("plotly.express")
+                    por_mes = agregados_tiendas.groupby(
+                        [agregados_tiendas['Dia'].dt.to_period('M').astype(str), 'Tienda']
+                    )['Monto'].sum().rename_axis(['Mes', 'Tienda']).reset_index()
+                    fig = px.bar(por_mes, x='Mes', y='Monto', color='Tienda', barmode='group',
+                                 labels={'Monto': 'Monto ($)', 'Mes': 'Mes'})
+                    st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("Sin tiendas disponibles")
         
-        if st.button("📥 Descargar Excel", use_container_width=True):
-            try:
-                archivo = f"Reporte_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                with pd.ExcelWriter(archivo, engine="openpyxl") as writer:
-                    if not ventas.empty:
-                        ventas.to_excel(writer, index=False, sheet_name="Ventas")
-                    if not inventario.empty:
-                        inventario.to_excel(writer, index=False, sheet_name="Inventario")
-                    if not clientes.empty:
-                        clientes.to_excel(writer, index=False, sheet_name="Clientes")
-                    if not creditos.empty:
-                        creditos.to_excel(writer, index=False, sheet_name="Créditos")
-                st.success(f"✅ Reporte guardado: {archivo}")
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
\ No newline at end of file
+        # ===== RENDIMIENTO =====
+        # Se cierra antes del panel para mostrar esta misma ejecución (el finally ya no hace nada)
+        rendimiento.marca(f"sección {menu}")
+        perfil = rendimiento.finalizar(RENDIMIENTO_LOG, usuario=st.session_state.usuario, menu=menu,
+                                       tienda=st.session_state.tienda)
+        if perfil is not None:
+            st.session_state.perfil_rendimiento = perfil
+        if es_administrador(st.session_state.usuario):
+            mostrar_rendimiento()
+finally:
+    perfil = rendimiento.finalizar(RENDIMIENTO_LOG, usuario=st.session_state.get("usuario"), menu=menu,
+                                   tienda=st.session_state.get("tienda"))
+    if perfil is not None:
+        st.session_state.perfil_rendimiento = perfil
\ No newline at end of file
@@ -0,0 +1,2054 @@
+"""
+Motor de BIODESICION sin interfaz.
+
+Cargas, escrituras seguras, ventas, créditos, stock, indicadores,
+agregados y exportaciones. No depende de Streamlit: lo usan la aplicación
+(inventario.py), los trabajos por lotes y las pruebas de carga. Trabaja
+sobre la carpeta de datos de la tienda activa (datos/ por defecto).
+
+Línea de comandos:
+
+    python motor.py importar-ventas archivo.csv
+    python motor.py recalcular
+    python motor.py compactar
+    python motor.py exportar reporte.xlsx [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+    python motor.py resumen
+    python motor.py consolidado
+
+Con --tienda NOMBRE se trabaja sobre la carpeta de esa tienda (tiendas.csv).
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+import os
+import sys
+import argparse
+import functools
+import hashlib
+import json
+import random
+import shutil
+import threading
+import time
+import tempfile
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+import almacenamiento_sqlite
+import historial_parquet
+import pronostico
+import rendimiento
+
+# Copy-on-Write: los DataFrames en caché se comparten entre sesiones y cada
+# sesión recibe una copia superficial que se duplica solo si la modifica.
+# (Desde pandas 3.0 siempre está activo.)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Archivos de cada tienda, relativos a su carpeta de datos (ver ruta())
+INVENTARIO_FILE = "inventario.csv"
+CLIENTES_FILE = "clientes.csv"
+VENTAS_FILE = "ventas.csv"
+CREDITOS_FILE = "creditos.csv"
+RESUMEN_FILE = "resumen.json"
+ALERTAS_FILE = "alertas_stock.json"
+ABONOS_FILE = "abonos.csv"
+SALDOS_FILE = "saldos_clientes.json"
+AGREGADOS_FILE = "agregados_diarios.csv"
+
+# Bloqueo entre sesiones/procesos y registro de la transacción en curso
+BLOQUEO_FILE = "datos.lock"
+TRANSACCION_FILE = "transaccion.json"
+BLOQUEO_TIMEOUT = 10
+
+# Nombres de caja únicos (poner BIODESICION_CAJAS_UNICAS=0 para permitir repetidos)
+CAJAS_UNICAS = os.environ.get("BIODESICION_CAJAS_UNICAS", "1") != "0"
+
+# Máximo de clientes que muestra el buscador de los selectores
+CLIENTES_MAX_RESULTADOS = 50
+
+# Orden de la vista de productos
+ORDENES_PRODUCTOS = {
+    "Nombre": ("Caja", True),
+    "Stock (menor a mayor)": ("Cantidad", True),
+    "Stock (mayor a menor)": ("Cantidad", False),
+    "Precio (mayor a menor)": ("Valor_Unitario", False),
+}
+
+# Umbral de alerta de las cajas sin punto de reorden propio
+PUNTO_REORDEN_DEFECTO = almacenamiento_sqlite.PUNTO_REORDEN_DEFECTO
+
+# Costo fijo que se descuenta de cada venta para la ganancia neta
+COSTO_POR_VENTA = 7000
+
+# Diario de solo-anexado: las ventas y créditos nuevos se agregan aquí y se
+# consolidan en el archivo base al compactar.
+VENTAS_DIARIO_FILE = "ventas_diario.csv"
+CREDITOS_DIARIO_FILE = "creditos_diario.csv"
+DIARIO_MAX_BYTES = 1024 * 1024
+
+COLUMNAS_VENTAS = ["ID", "Fecha", "Cliente", "Caja", "Cantidad", "Valor_Unitario", "Monto", "Es_Credito"]
+COLUMNAS_CREDITOS = ["Cliente", "Monto", "Fecha_Credito", "Pagado", "Fecha_Pago", "Venta_ID", "Abonado"]
+COLUMNAS_ABONOS = ["Fecha", "Cliente", "Monto"]
+
+# Almacenamiento: "csv" (por defecto) o "sqlite"
+BACKEND = os.environ.get("BIODESICION_BACKEND", "csv").lower()
+SQLITE_FILE = os.path.basename(almacenamiento_sqlite.SQLITE_FILE)
+VENTAS_PARQUET_DIR = os.path.basename(historial_parquet.VENTAS_PARQUET_DIR)
+
+# Historial de ventas con almacenamiento CSV: "csv" (por defecto) o
+# "parquet" (particiones mensuales, requiere pyarrow)
+VENTAS_FORMATO = os.environ.get("BIODESICION_VENTAS_FORMATO", "csv").lower()
+
+# Máximo de versiones en caché por tabla y tienda (las más antiguas se descartan)
+CACHE_MAX_ENTRADAS = 2
+
+# Carpeta de datos por defecto; ahí quedan los usuarios y la lista de
+# tiendas (columnas Tienda, Directorio). Sin tiendas.csv hay una sola tienda.
+DATOS_DIR = "datos"
+USUARIOS_FILE = os.path.join(DATOS_DIR, "usuarios.csv")
+TIENDAS_FILE = os.path.join(DATOS_DIR, "tiendas.csv")
+TIENDA_DEFECTO = "Principal"
+
+os.makedirs(DATOS_DIR, exist_ok=True)
+
+# ===== TIENDAS =====
+# Cada tienda tiene su propia carpeta con la estructura de datos/. La tienda
+# activa es por hilo: Streamlit ejecuta cada sesión en su hilo y la fija al
+# inicio de cada ejecución; la línea de comandos y los procesos del
+# consolidado la fijan una vez. Cada tienda tiene sus propias entradas en
+# la caché (ver cache_por_tienda).
+estado_tienda = threading.local()
+
+def directorio_datos():
+    return getattr(estado_tienda, "directorio", DATOS_DIR)
+
+def ruta(archivo):
+    """Ruta de un archivo de datos en la carpeta de la tienda activa"""
+    return os.path.join(directorio_datos(), archivo)
+
+def usar_tienda(directorio):
+    """Fija la carpeta de datos de este hilo y completa una escritura pendiente en ella"""
+    estado_tienda.directorio = directorio
+    os.makedirs(directorio, exist_ok=True)
+    recuperar_transaccion()
+
+@contextmanager
+def en_tienda(directorio):
+    """Trabaja temporalmente sobre otra tienda en este hilo"""
+    anterior = directorio_datos()
+    usar_tienda(directorio)
+    try:
+        yield
+    finally:
+        estado_tienda.directorio = anterior
+
+def cargar_tiendas():
+    """Tiendas configuradas: nombre → carpeta de datos"""
+    try:
+        tiendas = pd.read_csv(TIENDAS_FILE, dtype=str).dropna()
+        if not tiendas.empty:
+            return dict(zip(tiendas["Tienda"].str.strip(), tiendas["Directorio"].str.strip()))
+    except:
+        pass
+    return {TIENDA_DEFECTO: DATOS_DIR}
+
+def base_sqlite():
+    return ruta(SQLITE_FILE)
+
+def carpeta_parquet():
+    return ruta(VENTAS_PARQUET_DIR)
+
+# ===== FUNCIONES BÁSICAS =====
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def crear_usuario_default():
+    if not os.path.exists(USUARIOS_FILE):
+        usuarios = pd.DataFrame({
+            "usuario": ["CamilaM"],
+            "contraseña": [hash_password("1234")]
+        })
+        usuarios.to_csv(USUARIOS_FILE, index=False)
+
+def verificar_usuario(usuario, contraseña):
+    if not usuario or not contraseña:
+        return False
+    crear_usuario_default()
+    try:
+        usuarios = pd.read_csv(USUARIOS_FILE)
+        user_data = usuarios[usuarios["usuario"] == usuario]
+        if user_data.empty:
+            return False
+        return user_data["contraseña"].values[0] == hash_password(contraseña)
+    except:
+        return False
+
+# ===== ESQUEMA DE TABLAS =====
+# Tipos explícitos al leer: nombres repetidos en ventas/créditos como
+# categorías, cantidades int32, dinero en pesos enteros (int64) y fechas
+# parseadas por el lector del CSV.
+ESQUEMAS = {
+    "inventario": {"ID": "int64", "Caja": "str", "Cantidad": "int32",
+                   "Valor_Unitario": "int64", "Cantidad_Total": "int32", "Punto_Reorden": "int32"},
+    "clientes": {"Nombre": "str", "Cedula": "str", "Telefono": "str"},
+    "ventas": {"ID": "int64", "Fecha": "fecha", "Cliente": "category", "Caja": "category", "Cantidad": "int32",
+               "Valor_Unitario": "int64", "Monto": "int64", "Es_Credito": "bool"},
+    "creditos": {"Cliente": "category", "Monto": "int64", "Fecha_Credito": "fecha",
+                 "Pagado": "bool", "Fecha_Pago": "fecha", "Venta_ID": "int64", "Abonado": "int64"},
+    "abonos": {"Fecha": "fecha", "Cliente": "str", "Monto": "int64"},
+}
+VALORES_BOOL = {True: True, False: False, "True": True, "False": False,
+                "true": True, "false": False, 1: True, 0: False,
+                "1": True, "0": False, "Sí": True, "Si": True, "No": False}
+
+# Lector de CSV: "c" (por defecto) o "pyarrow" (más rápido, requiere pyarrow)
+CSV_MOTOR = os.environ.get("BIODESICION_CSV_MOTOR", "c").lower()
+
+def leer_csv(archivo, tabla):
+    """
+    Lee la tabla con los tipos de sus columnas conocidas. Las demás se
+    conservan como texto, para no perderlas al reescribir el archivo.
+    """
+    esquema = ESQUEMAS[tabla]
+    columnas = list(pd.read_csv(archivo, nrows=0).columns)
+    opciones = {
+        "dtype": {c: esquema.get(c, "str") for c in columnas if esquema.get(c, "str") in ("str", "category")},
+        "parse_dates": [c for c in columnas if esquema.get(c) == "fecha"],
+    }
+    # pyarrow infiere el tipo antes de aplicar dtype (p. ej. "007" pasa a "7"):
+    # las columnas desconocidas se leen con el lector de C
+    if CSV_MOTOR == "pyarrow" and set(columnas) <= set(esquema):
+        opciones["engine"] = "pyarrow"
+    else:
+        opciones["date_format"] = "ISO8601"
+    return pd.read_csv(archivo, **opciones)
+
+def aplicar_esquema(df, tabla):
+    """Convierte las columnas presentes a los tipos de ESQUEMAS"""
+    for col, tipo in ESQUEMAS[tabla].items():
+        if col not in df.columns or tipo == "str":
+            continue
+        if tipo == "fecha":
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed")
+        elif tipo == "bool":
+            if df[col].dtype != bool:
+                df[col] = df[col].map(VALORES_BOOL).fillna(False).astype(bool)
+        elif tipo == "category":
+            df[col] = df[col].astype("category")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).round().astype(tipo)
+    return df
+
+def completar_ids(ventas):
+    """
+    Ventas anteriores a los ID (ID 0): reciben ID negativos en el orden del
+    historial, por debajo del menor ya guardado (con Parquet solo se
+    reescriben algunos meses, así que pueden convivir ID 0 y negativos). No
+    chocan con los ID nuevos y quedan fijos al reescribirlas.
+    """
+    sin_id = ventas["ID"] == 0
+    if sin_id.any():
+        menor = min(int(ventas["ID"].min()), 0)
+        ventas.loc[sin_id, "ID"] = (menor - sin_id[sin_id].cumsum()).astype("int64")
+    return ventas
+
+def tabla_vacia(tabla):
+    return aplicar_esquema(pd.DataFrame(columns=list(ESQUEMAS[tabla])), tabla)
+
+def cargar_inventario():
+    try:
+        if BACKEND == "sqlite":
+            return aplicar_esquema(almacenamiento_sqlite.leer_tabla("inventario", base_sqlite()), "inventario")
+        if os.path.exists(ruta(INVENTARIO_FILE)):
+            inventario = leer_csv(ruta(INVENTARIO_FILE), "inventario")
+            if "Valor_Unitario" not in inventario.columns:
+                inventario["Valor_Unitario"] = 0
+            if "Cantidad_Total" not in inventario.columns:
+                inventario["Cantidad_Total"] = inventario["Cantidad"]
+            if "ID" not in inventario.columns:
+                # Archivos anteriores: se numeran las cajas y el ID queda fijo al guardar
+                inventario.insert(0, "ID", range(1, len(inventario) + 1))
+            if "Punto_Reorden" not in inventario.columns:
+                inventario["Punto_Reorden"] = PUNTO_REORDEN_DEFECTO
+            inventario = aplicar_esquema(inventario, "inventario")
+        else:
+            inventario = tabla_vacia("inventario")
+            inventario.to_csv(ruta(INVENTARIO_FILE), index=False)
+        return inventario
+    except:
+        return tabla_vacia("inventario")
+
+def cargar_clientes():
+    try:
+        if BACKEND == "sqlite":
+            return almacenamiento_sqlite.leer_tabla("clientes", base_sqlite())
+        if os.path.exists(ruta(CLIENTES_FILE)):
+            clientes = leer_csv(ruta(CLIENTES_FILE), "clientes")
+        else:
+            clientes = tabla_vacia("clientes")
+            clientes.to_csv(ruta(CLIENTES_FILE), index=False)
+        return clientes
+    except:
+        return tabla_vacia("clientes")
+
+def leer_con_diario(archivo_base, archivo_diario, tabla=None):
+    """
+    Lee el archivo base y le agrega los registros pendientes del diario
+    (con los tipos de la tabla si se indica; si no, todo como texto, para
+    reescribirlo sin alterar valores como "007" ni las fechas).
+    """
+    if tabla:
+        leer = lambda archivo: leer_csv(archivo, tabla)
+    else:
+        leer = lambda archivo: pd.read_csv(archivo, dtype=str, keep_default_na=False)
+    if not os.path.exists(archivo_base):
+        return leer(archivo_diario)
+    base = leer(archivo_base)
+    if os.path.exists(archivo_diario) and os.path.getsize(archivo_diario) > 0:
+        diario = leer(archivo_diario)
+        if not diario.empty:
+            base = pd.concat([base, diario], ignore_index=True)
+    return base
+
+def ventas_en_parquet():
+    return BACKEND == "csv" and VENTAS_FORMATO == "parquet"
+
+def ordenar_por_fecha(ventas):
+    """
+    Ventas en orden de Fecha; las del mismo instante conservan su orden.
+    Las ventas se anexan casi siempre en orden, así que normalmente basta
+    con comprobarlo (solo las registradas con fecha atrasada obligan a ordenar).
+    """
+    if ventas["Fecha"].is_monotonic_increasing:
+        return ventas
+    return ventas.sort_values("Fecha", kind="stable")
+
+def filas_en_rango(df, desde=None, hasta=None, columna="Fecha"):
+    """
+    Filas con desde <= columna <= hasta de un DataFrame ordenado por esa
+    columna (las ventas de cargar_ventas por Fecha, los agregados por Dia):
+    búsqueda binaria de los dos extremos y un corte, O(log n + k) en vez
+    de una máscara sobre todo el historial.
+    """
+    fechas = df[columna].to_numpy()
+    inicio = fechas.searchsorted(pd.Timestamp(desde).to_datetime64(), side="left") if desde is not None else 0
+    fin = fechas.searchsorted(pd.Timestamp(hasta).to_datetime64(), side="right") if hasta is not None else len(fechas)
+    return df.iloc[inicio:fin]
+
+def limites_dias(desde, hasta):
+    """Rango de días completos: desde las 00:00 del primero hasta el último segundo del último"""
+    return pd.Timestamp(desde), pd.Timestamp(hasta) + timedelta(days=1) - timedelta(seconds=1)
+
+def cargar_ventas(desde=None, hasta=None):
+    """
+    Ventas con desde <= Fecha <= hasta (sin límites, todo el historial),
+    ordenadas por Fecha
+    """
+    try:
+        if BACKEND == "sqlite":
+            condiciones, parametros = [], []
+            if desde is not None:
+                condiciones.append("Fecha >= ?")
+                parametros.append(pd.Timestamp(desde).strftime(almacenamiento_sqlite.FORMATO_FECHA))
+            if hasta is not None:
+                condiciones.append("Fecha <= ?")
+                parametros.append(pd.Timestamp(hasta).strftime(almacenamiento_sqlite.FORMATO_FECHA))
+            where = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+            ventas = almacenamiento_sqlite.leer_tabla("ventas", base_sqlite(), where, tuple(parametros),
+                                                     orden="Fecha, id")
+            return ordenar_por_fecha(aplicar_esquema(ventas, "ventas"))
+        if ventas_en_parquet():
+            # Particiones ordenadas por Fecha y leídas mes a mes
+            ventas = historial_parquet.leer_ventas(desde, hasta, carpeta_parquet())
+            ventas = completar_ids(aplicar_esquema(ventas, "ventas"))
+            return ordenar_por_fecha(ventas)
+        if os.path.exists(ruta(VENTAS_FILE)) or os.path.exists(ruta(VENTAS_DIARIO_FILE)):
+            ventas = leer_con_diario(ruta(VENTAS_FILE), ruta(VENTAS_DIARIO_FILE), "ventas")
+            if "Valor_Unitario" not in ventas.columns:
+                ventas["Valor_Unitario"] = 0
+            if "Es_Credito" not in ventas.columns:
+                ventas["Es_Credito"] = False
+            if "ID" not in ventas.columns:
+                ventas.insert(0, "ID", 0)
+            ventas = ordenar_por_fecha(completar_ids(aplicar_esquema(ventas, "ventas")))
+            ventas = filas_en_rango(ventas, desde, hasta)
+        else:
+            ventas = tabla_vacia("ventas")
+            ventas.to_csv(ruta(VENTAS_FILE), index=False)
+        return ventas.reset_index(drop=True)
+    except:
+        return tabla_vacia("ventas")
+
+def completar_abonado(creditos):
+    """Créditos anteriores a los abonos: los pagados quedan abonados completos y los demás en 0"""
+    pagados = creditos["Pagado"].map(VALORES_BOOL).fillna(False).astype(bool)
+    abonado = creditos["Abonado"] if "Abonado" in creditos.columns else pd.Series(index=creditos.index, dtype="float64")
+    creditos["Abonado"] = abonado.fillna(pd.to_numeric(creditos["Monto"], errors="coerce").where(pagados, 0))
+    return creditos
+
+def cargar_creditos():
+    try:
+        if BACKEND == "sqlite":
+            return aplicar_esquema(almacenamiento_sqlite.leer_tabla("creditos", base_sqlite()), "creditos")
+        if os.path.exists(ruta(CREDITOS_FILE)) or os.path.exists(ruta(CREDITOS_DIARIO_FILE)):
+            creditos = leer_con_diario(ruta(CREDITOS_FILE), ruta(CREDITOS_DIARIO_FILE), "creditos")
+            if "Venta_ID" not in creditos.columns:
+                # Créditos anteriores a los ID de venta
+                creditos["Venta_ID"] = 0
+            creditos = aplicar_esquema(completar_abonado(creditos), "creditos")
+        else:
+            creditos = tabla_vacia("creditos")
+            creditos.to_csv(ruta(CREDITOS_FILE), index=False)
+        return creditos
+    except:
+        return tabla_vacia("creditos")
+
+def cargar_abonos(cliente=None):
+    """Libro de abonos (de un cliente, o completo), del más reciente al más antiguo"""
+    try:
+        if BACKEND == "sqlite":
+            where, parametros = ("WHERE Cliente = ?", (cliente,)) if cliente is not None else ("", ())
+            abonos = aplicar_esquema(almacenamiento_sqlite.leer_tabla("abonos", base_sqlite(), where, parametros),
+                                     "abonos")
+        elif os.path.exists(ruta(ABONOS_FILE)):
+            abonos = leer_csv(ruta(ABONOS_FILE), "abonos")
+            abonos = aplicar_esquema(abonos, "abonos")
+            if cliente is not None:
+                abonos = abonos[abonos["Cliente"] == cliente]
+        else:
+            abonos = tabla_vacia("abonos")
+        return abonos.iloc[::-1].sort_values("Fecha", ascending=False, kind="stable").reset_index(drop=True)
+    except:
+        return tabla_vacia("abonos")
+
+# ===== ESCRITURA SEGURA =====
+# Todas las escrituras se hacen con el bloqueo de datos/ tomado. Es un
+# bloqueo del sistema operativo sobre BLOQUEO_FILE (flock, o locking en
+# Windows): se suelta solo si el proceso cae, así que nunca queda uno
+# abandonado y el archivo no se borra. Las tablas se escriben primero a
+# archivos temporales; luego se registra la transacción y se renombran. Si
+# el proceso cae a mitad, quien tome el bloqueo después completa la
+# transacción registrada (aplicar_transaccion). Los diarios y el libro de
+# abonos no se reescriben: se les anexan las filas y la transacción guarda su
+# tamaño anterior, para recortarlos si algo falla antes de confirmarla.
+estado_bloqueo = threading.local()
+
+def tomar_bloqueo(fd):
+    """Intenta el bloqueo sin esperar; False si lo tiene otro proceso o hilo"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def soltar_bloqueo(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def bloqueo_datos(timeout=BLOQUEO_TIMEOUT):
+    """Bloqueo exclusivo (reentrante en el mismo hilo) sobre datos/"""
+    if getattr(estado_bloqueo, "profundidad", 0):
+        estado_bloqueo.profundidad += 1
+        try:
+            yield
+        finally:
+            estado_bloqueo.profundidad -= 1
+        return
+    # Cada toma abre su propio descriptor: flock excluye también a otros hilos del proceso
+    fd = os.open(ruta(BLOQUEO_FILE), os.O_CREAT | os.O_RDWR)
+    try:
+        inicio = time.time()
+        while not tomar_bloqueo(fd):
+            if time.time() - inicio > timeout:
+                raise TimeoutError("Los datos están ocupados por otra sesión")
+            time.sleep(0.02 + random.random() * 0.05)
+        estado_bloqueo.profundidad = 1
+        try:
+            # Una escritura que quedó a medias se completa (o se deshace) antes de leer
+            aplicar_transaccion()
+            yield
+        finally:
+            estado_bloqueo.profundidad = 0
+            soltar_bloqueo(fd)
+    finally:
+        os.close(fd)
+
+def aplicar_transaccion():
+    """
+    Completa los renombres y borrados de la transacción registrada. Si no
+    llegó a confirmarse (aún tiene "truncar"), la deshace: los archivos
+    anexados vuelven a su tamaño anterior y se descartan los temporales.
+    """
+    if not os.path.exists(ruta(TRANSACCION_FILE)):
+        return
+    with open(ruta(TRANSACCION_FILE), encoding="utf-8") as f:
+        transaccion = json.load(f)
+    if "truncar" in transaccion:
+        for archivo, tamaño in transaccion["truncar"].items():
+            if os.path.exists(archivo) and os.path.getsize(archivo) > tamaño:
+                with open(archivo, "r+b") as f:
+                    f.truncate(tamaño)
+        for temporal, _ in transaccion["reemplazos"]:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        os.remove(ruta(TRANSACCION_FILE))
+        return
+    for temporal, destino in transaccion["reemplazos"]:
+        if os.path.exists(temporal):
+            os.replace(temporal, destino)
+    for archivo in transaccion["borrados"]:
+        if os.path.exists(archivo):
+            os.remove(archivo)
+    os.remove(ruta(TRANSACCION_FILE))
+
+def registrar_transaccion(transaccion):
+    with open(ruta(TRANSACCION_FILE) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(transaccion, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta(TRANSACCION_FILE) + ".tmp", ruta(TRANSACCION_FILE))
+
+def escribir_transaccion(tablas, borrados=(), preparados=(), anexos=()):
+    """
+    Escribe varias tablas CSV como una unidad: [(df, archivo), ...] y
+    archivos a borrar (p. ej. diarios ya consolidados). preparados:
+    temporales ya escritos [(temporal, archivo), ...] (p. ej. particiones
+    Parquet) que se renombran en la misma transacción. anexos: filas que se
+    agregan al final de un archivo [(df, archivo, columnas), ...].
+    """
+    reemplazos = list(preparados)
+    for df, archivo in tablas:
+        temporal = archivo + ".tmp"
+        df.to_csv(temporal, index=False, date_format="%Y-%m-%d %H:%M:%S")
+        reemplazos.append((temporal, archivo))
+    if anexos:
+        truncar = {archivo: os.path.getsize(archivo) if os.path.exists(archivo) else 0
+                   for _, archivo, _ in anexos}
+        registrar_transaccion({"reemplazos": reemplazos, "borrados": list(borrados), "truncar": truncar})
+        try:
+            for registros, archivo, columnas in anexos:
+                with open(archivo, "a", newline="", encoding="utf-8") as f:
+                    registros[columnas].to_csv(f, header=truncar[archivo] == 0, index=False,
+                                               date_format="%Y-%m-%d %H:%M:%S")
+                    f.flush()
+                    os.fsync(f.fileno())
+            # Confirmación: desde aquí la transacción se completa aunque el proceso caiga
+            registrar_transaccion({"reemplazos": reemplazos, "borrados": list(borrados)})
+        except:
+            # Sin confirmar (p. ej. disco lleno): se recortan los anexos
+            aplicar_transaccion()
+            raise
+    else:
+        registrar_transaccion({"reemplazos": reemplazos, "borrados": list(borrados)})
+    aplicar_transaccion()
+
+def recuperar_transaccion():
+    """Completa una escritura que quedó a medias si el proceso anterior cayó"""
+    if os.path.exists(ruta(TRANSACCION_FILE)):
+        try:
+            with bloqueo_datos():
+                # Al tomar el bloqueo se completa la transacción pendiente
+                pass
+        except TimeoutError:
+            pass
+
+def version_de(tabla):
+    """Versión actual de una tabla en disco"""
+    if tabla == "inventario":
+        return version_tabla(ruta(INVENTARIO_FILE))
+    if tabla == "clientes":
+        return version_tabla(ruta(CLIENTES_FILE))
+    if tabla == "ventas":
+        return version_ventas()
+    return version_tabla(ruta(CREDITOS_FILE), ruta(CREDITOS_DIARIO_FILE))
+
+def sin_conflicto(tablas):
+    """
+    Control optimista: los DataFrames de cargar_datos llevan en attrs la
+    versión leída. Si la tabla cambió en disco desde entonces, otra sesión
+    escribió primero y no se debe sobrescribir.
+    """
+    for tabla, df in tablas.items():
+        if df is not None and "version" in df.attrs and df.attrs["version"] != version_de(tabla):
+            return False
+    return True
+
+def anexar_filas(df, nuevas):
+    """pd.concat que conserva la versión leída (attrs) del DataFrame original"""
+    resultado = pd.concat([df, nuevas], ignore_index=True)
+    resultado.attrs = dict(df.attrs)
+    return resultado
+
+@rendimiento.medido("guardar_datos")
+def guardar_datos(inventario=None, clientes=None, ventas=None, creditos=None, cajas=None, meses_ventas=None):
+    """
+    Reescribe solo las tablas recibidas (las que son None no se tocan).
+    Al reescribir ventas o créditos completos se descarta su diario,
+    porque el DataFrame ya incluye esos registros.
+    cajas: ID de las cajas cuyo stock o umbral cambió, para revisar solo
+    sus alertas (None: se revisa todo el inventario).
+    meses_ventas: meses ('AAAA-MM') con ventas cambiadas; con Parquet solo
+    se reescriben esas particiones (None: todas).
+    Retorna False si otra sesión modificó alguna de esas tablas después
+    de cargarla (hay que recargar y repetir la operación).
+    """
+    try:
+        with bloqueo_datos():
+            if not sin_conflicto({"inventario": inventario, "clientes": clientes,
+                                  "ventas": ventas, "creditos": creditos}):
+                return False
+            version_anterior = version_de("inventario")
+            if BACKEND == "sqlite":
+                tablas = {"inventario": inventario, "clientes": clientes, "ventas": ventas, "creditos": creditos}
+                almacenamiento_sqlite.reemplazar_tablas({t: df for t, df in tablas.items() if df is not None},
+                                                        base_sqlite())
+                if inventario is not None:
+                    actualizar_resumen(inventario=inventario)
+                    actualizar_alertas(inventario, cajas, version_anterior)
+                return True
+            escrituras, borrados, preparados = [], [], []
+            if inventario is not None:
+                escrituras.append((inventario, ruta(INVENTARIO_FILE)))
+            if clientes is not None:
+                escrituras.append((clientes, ruta(CLIENTES_FILE)))
+            if ventas is not None and ventas_en_parquet():
+                preparados, borrados = historial_parquet.preparar_ventas(ventas, carpeta_parquet(), meses_ventas)
+            elif ventas is not None:
+                escrituras.append((ventas, ruta(VENTAS_FILE)))
+                borrados.append(ruta(VENTAS_DIARIO_FILE))
+            if creditos is not None:
+                escrituras.append((creditos, ruta(CREDITOS_FILE)))
+                borrados.append(ruta(CREDITOS_DIARIO_FILE))
+            escribir_transaccion(escrituras, borrados, preparados)
+            if inventario is not None:
+                actualizar_resumen(inventario=inventario)
+                actualizar_alertas(inventario, cajas, version_anterior)
+        return True
+    except:
+        return False
+    finally:
+        invalidar_cache(inventario is not None, clientes is not None,
+                        ventas is not None, creditos is not None)
+
+def diario_lleno(archivo_diario):
+    return os.path.exists(archivo_diario) and os.path.getsize(archivo_diario) > DIARIO_MAX_BYTES
+
+@rendimiento.medido("compactar_diario")
+def compactar_diario():
+    """Consolida los diarios de ventas y créditos en sus archivos base"""
+    if BACKEND == "sqlite":
+        return True
+    try:
+        with bloqueo_datos():
+            creditos_anterior = version_de("creditos")
+            for archivo_base, archivo_diario in [(ruta(VENTAS_FILE), ruta(VENTAS_DIARIO_FILE)),
+                                                 (ruta(CREDITOS_FILE), ruta(CREDITOS_DIARIO_FILE))]:
+                if os.path.exists(archivo_diario):
+                    escribir_transaccion([(leer_con_diario(archivo_base, archivo_diario), archivo_base)],
+                                         [archivo_diario])
+            # Mismos créditos en otros archivos: los saldos siguen valiendo
+            actualizar_saldos(None, creditos_anterior)
+        invalidar_cache(ventas=True, creditos=True)
+        return True
+    except:
+        return False
+
+@rendimiento.medido("registrar_venta")
+def registrar_venta(nueva_venta):
+    """
+    Registra una venta (una o varias líneas) como transacción: con el
+    bloqueo tomado se relee el inventario de disco, se valida el stock de
+    todas las líneas a la vez y se descuenta, así dos cajeros simultáneos no
+    se pisan. El inventario y los diarios de ventas y créditos (o la
+    partición Parquet del mes) se escriben en una sola transacción; a los
+    diarios solo se les anexan las filas nuevas. Cuando un diario supera
+    DIARIO_MAX_BYTES se compacta.
+    Cada línea recibe el siguiente ID de venta libre y las líneas a crédito
+    generan su crédito con Venta_ID apuntando a ella.
+    Con SQLite la venta se inserta y el stock se descuenta en una transacción.
+    Retorna False si no hay stock suficiente o no se pudo guardar.
+    """
+    nueva_venta = nueva_venta.reset_index(drop=True)
+    # Venta_ID provisional: posición de la línea (se desplaza al asignar los ID)
+    nuevo_credito = creditos_de_venta(nueva_venta)
+    if BACKEND == "sqlite":
+        try:
+            with bloqueo_datos():
+                version_anterior = version_de("inventario")
+                creditos_anterior = version_de("creditos")
+                ok = almacenamiento_sqlite.insertar_venta(nueva_venta, nuevo_credito, base_sqlite())
+                if ok:
+                    inventario = cargar_inventario()
+                    actualizar_resumen(ventas_nuevas=nueva_venta, creditos_nuevos=nuevo_credito,
+                                       inventario=inventario)
+                    actualizar_alertas(inventario, inventario.loc[inventario["Caja"].isin(nueva_venta["Caja"]), "ID"],
+                                       version_anterior)
+                    actualizar_saldos(saldos_de(nuevo_credito), creditos_anterior)
+                    actualizar_agregados(ventas_nuevas=nueva_venta)
+            return ok
+        except:
+            return False
+        finally:
+            invalidar_cache(inventario=True, ventas=True, creditos=True)
+    try:
+        with bloqueo_datos():
+            inventario = cargar_inventario()
+            pedidos, stock, faltante = validar_stock(inventario, nueva_venta)
+            if not faltante.empty:
+                return False
+            restante = (stock["Cantidad"] - pedidos).astype(inventario["Cantidad"].dtype)
+            inventario.loc[stock["Fila"].to_numpy(), "Cantidad"] = restante.to_numpy()
+            inicio = siguiente_id_venta()
+            nueva_venta["ID"] = range(inicio, inicio + len(nueva_venta))
+            if nuevo_credito is not None:
+                nuevo_credito["Venta_ID"] += inicio
+            preparados, anexos = [], []
+            if ventas_en_parquet():
+                # Solo se reescribe la partición del mes de la venta
+                preparados, _ = historial_parquet.preparar_anexo(nueva_venta, carpeta_parquet())
+            else:
+                anexos.append((nueva_venta, ruta(VENTAS_DIARIO_FILE), COLUMNAS_VENTAS))
+            if nuevo_credito is not None and not nuevo_credito.empty:
+                anexos.append((nuevo_credito, ruta(CREDITOS_DIARIO_FILE), COLUMNAS_CREDITOS))
+            version_anterior = version_de("inventario")
+            creditos_anterior = version_de("creditos")
+            escribir_transaccion([(inventario, ruta(INVENTARIO_FILE))], preparados=preparados, anexos=anexos)
+            invalidar_cache(inventario=True, ventas=True, creditos=True)
+            actualizar_resumen(ventas_nuevas=nueva_venta, creditos_nuevos=nuevo_credito,
+                               inventario=inventario)
+            actualizar_alertas(inventario, inventario.loc[stock["Fila"].to_numpy(), "ID"], version_anterior)
+            actualizar_saldos(saldos_de(nuevo_credito), creditos_anterior)
+            actualizar_agregados(ventas_nuevas=nueva_venta)
+            if diario_lleno(ruta(VENTAS_DIARIO_FILE)) or diario_lleno(ruta(CREDITOS_DIARIO_FILE)):
+                compactar_diario()
+        return True
+    except:
+        return False
+
+@rendimiento.medido("agregar_unidades")
+def agregar_unidades(caja_id, unidades, nuevo_precio, punto_reorden=None):
+    """
+    Suma unidades a una caja (y fija su precio y, si se indica, su punto de
+    reorden) sobre el stock actual en disco
+    """
+    try:
+        with bloqueo_datos():
+            if BACKEND == "sqlite":
+                version_anterior = version_de("inventario")
+                ok = almacenamiento_sqlite.sumar_unidades(caja_id, unidades, nuevo_precio, punto_reorden,
+                                                          base_sqlite())
+                if ok:
+                    inventario = cargar_inventario()
+                    actualizar_resumen(inventario=inventario)
+                    actualizar_alertas(inventario, [caja_id], version_anterior)
+                return ok
+            inventario = cargar_inventario()
+            fila = inventario.index[inventario["ID"] == caja_id]
+            if fila.empty:
+                return False
+            fila = fila[0]
+            inventario.at[fila, "Cantidad"] = int(inventario.at[fila, "Cantidad"]) + unidades
+            inventario.at[fila, "Cantidad_Total"] = int(inventario.at[fila, "Cantidad_Total"]) + unidades
+            inventario.at[fila, "Valor_Unitario"] = round(nuevo_precio)
+            if punto_reorden is not None:
+                inventario.at[fila, "Punto_Reorden"] = int(punto_reorden)
+            return guardar_datos(inventario=inventario, cajas=[caja_id])
+    except:
+        return False
+    finally:
+        invalidar_cache(inventario=True)
+
+def construir_indice_cajas(inventario):
+    """Caja → etiqueta de fila (la primera, si el nombre está repetido)"""
+    cajas = inventario["Caja"]
+    primeras = ~cajas.duplicated()
+    return dict(zip(cajas[primeras], inventario.index[primeras]))
+
+def indice_cajas(inventario):
+    """
+    Índice Caja → fila del inventario cargado. Para un DataFrame de
+    cargar_datos se reutiliza el índice en caché de esa versión.
+    """
+    version = inventario.attrs.get("version")
+    if version is None:
+        return construir_indice_cajas(inventario)
+    return indice_cajas_cache(version)
+
+def siguiente_id(df):
+    """ID para una fila nueva (los ID no se reutilizan mientras exista el mayor)"""
+    if df.empty or "ID" not in df.columns:
+        return 1
+    return max(int(pd.to_numeric(df["ID"]).max()), 0) + 1
+
+@rendimiento.medido("eliminar_caja")
+def eliminar_caja(caja_id):
+    """Elimina la caja con ese ID sobre el inventario actual en disco"""
+    try:
+        with bloqueo_datos():
+            if BACKEND == "sqlite":
+                version_anterior = version_de("inventario")
+                ok = almacenamiento_sqlite.eliminar_fila("inventario", caja_id, base_sqlite())
+                if ok:
+                    inventario = cargar_inventario()
+                    actualizar_resumen(inventario=inventario)
+                    actualizar_alertas(inventario, [caja_id], version_anterior)
+                return ok
+            inventario = cargar_inventario()
+            if not (inventario["ID"] == caja_id).any():
+                return False
+            return guardar_datos(inventario=inventario[inventario["ID"] != caja_id].reset_index(drop=True),
+                                 cajas=[caja_id])
+    except:
+        return False
+    finally:
+        invalidar_cache(inventario=True)
+
+@rendimiento.medido("agregar_caja")
+def agregar_caja(caja, cantidad, valor_unitario, punto_reorden=PUNTO_REORDEN_DEFECTO):
+    """
+    Agrega una caja nueva sobre el inventario actual en disco. Retorna False
+    si ya existe una con ese nombre (con CAJAS_UNICAS) o no se pudo guardar.
+    """
+    nueva = pd.DataFrame({"Caja": [caja], "Cantidad": [int(cantidad)], "Valor_Unitario": [round(valor_unitario)],
+                          "Cantidad_Total": [int(cantidad)], "Punto_Reorden": [int(punto_reorden)]})
+    try:
+        with bloqueo_datos():
+            inventario = cargar_inventario()
+            if CAJAS_UNICAS and (inventario["Caja"] == caja).any():
+                return False
+            if BACKEND == "sqlite":
+                version_anterior = version_de("inventario")
+                caja_id = almacenamiento_sqlite.insertar_fila("inventario", nueva, base_sqlite())
+                inventario = cargar_inventario()
+                actualizar_resumen(inventario=inventario)
+                actualizar_alertas(inventario, [caja_id], version_anterior)
+                return True
+            nueva.insert(0, "ID", siguiente_id(inventario))
+            return guardar_datos(inventario=anexar_filas(inventario, nueva), cajas=nueva["ID"])
+    except:
+        return False
+    finally:
+        invalidar_cache(inventario=True)
+
+@rendimiento.medido("agregar_cliente")
+def agregar_cliente(nombre, cedula, telefono=""):
+    """
+    Agrega un cliente sobre la tabla actual en disco. Retorna False si ya
+    existe uno con esa cédula o ese nombre, o no se pudo guardar.
+    """
+    nuevo = pd.DataFrame({"Nombre": [nombre], "Cedula": [cedula], "Telefono": [telefono]})
+    try:
+        with bloqueo_datos():
+            clientes = cargar_tabla("clientes")
+            if cliente_por_cedula(clientes, cedula) is not None or cliente_por_nombre(clientes, nombre) is not None:
+                return False
+            if BACKEND == "sqlite":
+                almacenamiento_sqlite.insertar_fila("clientes", nuevo, base_sqlite())
+                return True
+            return guardar_datos(clientes=anexar_filas(clientes, nuevo))
+    except:
+        return False
+    finally:
+        invalidar_cache(clientes=True)
+
+@rendimiento.medido("eliminar_cliente")
+def eliminar_cliente(clientes, fila):
+    """
+    Elimina el cliente de esa fila (solo esa: los homónimos se conservan).
+    Con SQLite la fila es el id; con CSV se reescribe la tabla cargada, y
+    retorna False si otra sesión la modificó.
+    """
+    try:
+        if BACKEND == "sqlite":
+            with bloqueo_datos():
+                return almacenamiento_sqlite.eliminar_fila("clientes", fila, base_sqlite())
+        return guardar_datos(clientes=clientes.drop(index=fila).reset_index(drop=True))
+    except:
+        return False
+    finally:
+        invalidar_cache(clientes=True)
+
+@rendimiento.medido("filtrar_productos")
+def filtrar_productos(inventario, busqueda="", solo_stock_bajo=False, orden="Nombre"):
+    """Filtra y ordena el catálogo para la vista paginada de productos"""
+    productos = inventario
+    if busqueda:
+        productos = productos[productos["Caja"].astype(str).str.contains(busqueda, case=False, regex=False)]
+    if solo_stock_bajo:
+        productos = verificar_stock_bajo(productos)
+    columna, ascendente = ORDENES_PRODUCTOS[orden]
+    return productos.sort_values(columna, ascending=ascendente, kind="stable")
+
+def creditos_de_ventas(creditos, eliminadas):
+    """
+    Máscara de los créditos de las ventas eliminadas: por Venta_ID y, para
+    créditos anteriores a los ID (Venta_ID 0), emparejando uno a uno por
+    cliente, monto y día.
+    """
+    mascara = creditos["Venta_ID"].isin(eliminadas["ID"])
+    antiguos = creditos[creditos["Venta_ID"] == 0]
+    sin_credito = eliminadas[eliminadas["Es_Credito"] & ~eliminadas["ID"].isin(creditos["Venta_ID"])]
+    if antiguos.empty or sin_credito.empty:
+        return mascara
+    def claves(df, fecha):
+        datos = pd.DataFrame({"Cliente": df["Cliente"].astype(str), "Monto": df["Monto"],
+                              "Dia": df[fecha].dt.normalize()}, index=df.index)
+        datos["N"] = datos.groupby(["Cliente", "Monto", "Dia"]).cumcount()
+        return datos
+    pares = claves(antiguos, "Fecha_Credito").reset_index().merge(
+        claves(sin_credito, "Fecha"), on=["Cliente", "Monto", "Dia", "N"])
+    return mascara | creditos.index.isin(pares["index"])
+
+@rendimiento.medido("eliminar_ventas")
+def eliminar_ventas(ids, inventario, ventas, creditos):
+    """
+    Elimina las ventas con esos ID, devuelve su stock a las cajas y borra
+    sus créditos con operaciones de conjunto (isin, groupby) en una sola
+    escritura. Con SQLite solo se borran y actualizan esas filas (DELETE y
+    UPDATE por id). Retorna False si hubo conflicto con otra sesión.
+    """
+    borrar = ventas["ID"].isin(ids)
+    eliminadas = ventas[borrar]
+    devolver = eliminadas.groupby(eliminadas["Caja"].astype(str))["Cantidad"].sum()
+    stock = stock_por_caja(inventario).reindex(devolver.index).dropna()
+    filas = stock["Fila"].astype("int64").to_numpy()
+    cajas = inventario.loc[filas, "ID"]
+    borrar_creditos = creditos_de_ventas(creditos, eliminadas)
+    creditos_eliminados = creditos[borrar_creditos]
+    try:
+        # Los cambios incrementales se aplican sin soltar el bloqueo de la escritura
+        with bloqueo_datos():
+            if BACKEND == "sqlite":
+                if not sin_conflicto({"inventario": inventario, "ventas": ventas, "creditos": creditos}):
+                    return False
+                version_anterior = version_de("inventario")
+                # Índice de los créditos de SQLite = id de la fila
+                almacenamiento_sqlite.eliminar_ventas(eliminadas["ID"], creditos_eliminados.index,
+                                                      dict(zip(cajas, devolver[stock.index])), base_sqlite())
+                invalidar_cache(inventario=True, ventas=True, creditos=True)
+                inventario = cargar_inventario()
+                actualizar_alertas(inventario, cajas, version_anterior)
+            else:
+                restaurado = (stock["Cantidad"] + devolver[stock.index]).astype(inventario["Cantidad"].dtype)
+                inventario.loc[filas, "Cantidad"] = restaurado.to_numpy()
+                if not guardar_datos(inventario=inventario, ventas=ventas[~borrar].reset_index(drop=True),
+                                     creditos=creditos[~borrar_creditos].reset_index(drop=True), cajas=cajas,
+                                     meses_ventas=set(eliminadas["Fecha"].dt.strftime("%Y-%m"))):
+                    return False
+            actualizar_resumen(ventas_eliminadas=eliminadas, creditos_eliminados=creditos_eliminados,
+                               inventario=inventario)
+            actualizar_saldos(-saldos_de(creditos_eliminados), creditos.attrs.get("version"))
+            actualizar_agregados(ventas_eliminadas=eliminadas)
+        return True
+    except:
+        return False
+
+def repartir_abono(pendientes, monto, fecha):
+    """
+    Reparte el abono entre los créditos pendientes del más antiguo al más
+    reciente. Retorna los créditos a los que se aplicó (con su
+    Abonado_Anterior) o None si el monto no es válido o supera el saldo.
+    """
+    pendientes = pendientes.sort_values("Fecha_Credito", kind="stable")
+    saldo = pendientes["Monto"] - pendientes["Abonado"]
+    if monto <= 0 or monto > saldo.sum():
+        return None
+    # Lo que queda del abono después de cubrir los créditos anteriores
+    aplicado = (monto - (saldo.cumsum() - saldo)).clip(lower=0, upper=saldo)
+    aplicados = pendientes[aplicado > 0].assign(Abonado_Anterior=pendientes["Abonado"])
+    aplicados["Abonado"] = aplicados["Abonado"] + aplicado[aplicado > 0]
+    aplicados["Pagado"] = aplicados["Abonado"] >= aplicados["Monto"]
+    aplicados.loc[aplicados["Pagado"], "Fecha_Pago"] = fecha
+    return aplicados
+
+@rendimiento.medido("registrar_abono")
+def registrar_abono(cliente, monto):
+    """
+    Registra un abono (pago parcial o total) de un cliente: se aplica a sus
+    créditos pendientes del más antiguo al más reciente, los que quedan
+    cubiertos pasan a pagados y el abono se anota en el libro de abonos,
+    todo en una transacción. Los créditos se releen de disco con el bloqueo
+    tomado. Retorna False si el monto no es válido, supera el saldo del
+    cliente o los datos cambiaron en otra sesión.
+    """
+    monto = int(round(monto))
+    fecha = pd.Timestamp(datetime.now().replace(microsecond=0))
+    abono = pd.DataFrame({"Fecha": [fecha], "Cliente": [cliente], "Monto": [monto]})
+    try:
+        with bloqueo_datos():
+            version_anterior = version_de("creditos")
+            if BACKEND == "sqlite":
+                actuales = aplicar_esquema(almacenamiento_sqlite.creditos_pendientes_cliente(cliente, base_sqlite()),
+                                           "creditos")
+            else:
+                actuales = cargar_creditos()
+            pendientes = actuales[(actuales["Cliente"].astype(str) == cliente) & ~actuales["Pagado"]]
+            aplicados = repartir_abono(pendientes, monto, fecha)
+            if aplicados is None:
+                return False
+            if BACKEND == "sqlite":
+                if not almacenamiento_sqlite.registrar_abono(abono, aplicados, base_sqlite()):
+                    return False
+            else:
+                for columna in ["Abonado", "Pagado", "Fecha_Pago"]:
+                    actuales.loc[aplicados.index, columna] = aplicados[columna]
+                escribir_transaccion([(actuales, ruta(CREDITOS_FILE))], [ruta(CREDITOS_DIARIO_FILE)],
+                                     anexos=[(abono, ruta(ABONOS_FILE), COLUMNAS_ABONOS)])
+            invalidar_cache(creditos=True)
+            actualizar_resumen(abonado=monto)
+            actualizar_saldos(cambio_de_saldo(cliente, -monto, -int(aplicados["Pagado"].sum())),
+                              version_anterior)
+        return True
+    except:
+        return False
+    finally:
+        invalidar_cache(creditos=True)
+
+# ===== ÍNDICE DE CLIENTES =====
+# Los selectores no recorren la tabla de clientes: buscan por prefijo en un
+# arreglo ordenado de claves (cada sufijo por palabras del nombre
+# normalizado, para encontrar "Ana García" escribiendo "gar") y la cédula y
+# el nombre se resuelven con diccionarios. El índice se construye una vez por
+# versión. Ventas y créditos guardan solo el nombre, así que no se admiten
+# dos clientes con el mismo nombre normalizado.
+
+def normalizar_nombres(serie):
+    """Minúsculas, sin tildes y con un solo espacio entre palabras"""
+    return (serie.fillna("").astype(str).str.normalize("NFKD")
+            .str.encode("ascii", "ignore").str.decode("ascii")
+            .str.lower().str.split().str.join(" "))
+
+def normalizar_cedulas(serie):
+    """Solo letras y dígitos, en mayúsculas ("1.020-3" → "10203")"""
+    return serie.fillna("").astype(str).str.replace(r"[^0-9A-Za-z]", "", regex=True).str.upper()
+
+def construir_indice_clientes(clientes):
+    """Claves de búsqueda ordenadas con su fila, orden alfabético, cédula → fila y nombre → fila"""
+    nombres = normalizar_nombres(clientes["Nombre"]).to_numpy(dtype=str)
+    etiquetas = clientes.index.to_numpy()
+    claves, filas = [], []
+    for nombre, fila in zip(nombres, etiquetas):
+        palabras = nombre.split(" ")
+        for i in range(len(palabras)):
+            claves.append(" ".join(palabras[i:]))
+            filas.append(fila)
+    claves = np.array(claves, dtype=str)
+    orden_claves = np.argsort(claves, kind="stable")
+    cedulas = normalizar_cedulas(clientes["Cedula"])
+    con_cedula = (cedulas != "") & ~cedulas.duplicated()
+    con_nombre = (nombres != "") & ~pd.Series(nombres).duplicated().to_numpy()
+    return {
+        "claves": claves[orden_claves],
+        "filas": np.array(filas, dtype=etiquetas.dtype)[orden_claves],
+        "orden": etiquetas[np.argsort(nombres, kind="stable")],
+        "cedulas": dict(zip(cedulas[con_cedula], clientes.index[con_cedula])),
+        "nombres": dict(zip(nombres[con_nombre], etiquetas[con_nombre])),
+    }
+
+def indice_clientes(clientes):
+    """Índice de búsqueda de clientes; en caché para los DataFrames de cargar_datos"""
+    version = clientes.attrs.get("version")
+    if version is None:
+        return construir_indice_clientes(clientes)
+    return indice_clientes_cache(version)
+
+def buscar_clientes(clientes, texto="", limite=CLIENTES_MAX_RESULTADOS):
+    """
+    Filas de los clientes cuyo nombre tiene una palabra que empieza por el
+    texto (sin distinguir tildes ni mayúsculas); sin texto, los primeros
+    en orden alfabético. Como mucho `limite` filas.
+    """
+    indice = indice_clientes(clientes)
+    consulta = normalizar_nombres(pd.Series([texto])).iloc[0]
+    if not consulta:
+        return indice["orden"][:limite].tolist()
+    inicio = np.searchsorted(indice["claves"], consulta, side="left")
+    fin = np.searchsorted(indice["claves"], consulta + "\uffff", side="left")
+    return pd.unique(indice["filas"][inicio:fin])[:limite].tolist()
+
+def cliente_por_cedula(clientes, cedula):
+    """Fila del cliente con esa cédula, o None"""
+    clave = normalizar_cedulas(pd.Series([cedula])).iloc[0]
+    if not clave:
+        return None
+    return indice_clientes(clientes)["cedulas"].get(clave)
+
+def cliente_por_nombre(clientes, nombre):
+    """Fila del cliente con ese nombre (sin distinguir tildes, mayúsculas ni espacios), o None"""
+    clave = normalizar_nombres(pd.Series([nombre])).iloc[0]
+    if not clave:
+        return None
+    return indice_clientes(clientes)["nombres"].get(clave)
+
+def etiqueta_cliente(clientes, fila):
+    """Nombre y cédula de una fila, para distinguir homónimos en los selectores"""
+    nombre = clientes.at[fila, "Nombre"]
+    cedula = clientes.at[fila, "Cedula"]
+    return f"{nombre} — CC {cedula}" if pd.notna(cedula) and str(cedula).strip() else str(nombre)
+
+# ===== VENTAS POR LOTES =====
+# El carrito y la importación arman un DataFrame con todas las líneas; se
+# valida y se registra completo con registrar_venta (una sola transacción).
+COLUMNAS_IMPORTACION = ["Fecha", "Cliente", "Caja", "Cantidad"]
+
+def stock_por_caja(inventario):
+    """Caja → fila del inventario y unidades disponibles (primera fila de cada nombre)"""
+    primeras = inventario.drop_duplicates("Caja")
+    return pd.DataFrame({"Fila": primeras.index, "Cantidad": primeras["Cantidad"].to_numpy()},
+                        index=primeras["Caja"].astype(str))
+
+def validar_stock(inventario, lineas):
+    """
+    Suma las líneas por caja y las compara con el stock de una vez.
+    Retorna (pedido por caja, stock de esas cajas, faltante de las cajas
+    que no alcanzan o no existen).
+    """
+    pedidos = lineas.groupby(lineas["Caja"].astype(str))["Cantidad"].sum()
+    stock = stock_por_caja(inventario).reindex(pedidos.index)
+    faltante = pedidos - stock["Cantidad"].fillna(0)
+    return pedidos, stock, faltante[faltante > 0]
+
+def armar_venta(lineas, inventario):
+    """
+    Completa líneas (Fecha, Cliente, Caja, Cantidad y opcionalmente
+    Valor_Unitario y Es_Credito) con el precio de la caja y el monto.
+    """
+    venta = lineas.copy()
+    columnas = [c for c in COLUMNAS_VENTAS if c != "ID"]
+    precios = inventario.drop_duplicates("Caja").set_index("Caja")["Valor_Unitario"]
+    if "Valor_Unitario" not in venta.columns:
+        venta["Valor_Unitario"] = None
+    if "Es_Credito" not in venta.columns:
+        venta["Es_Credito"] = False
+    venta["Fecha"] = pd.to_datetime(venta["Fecha"], errors="coerce", format="mixed", dayfirst=True)
+    venta["Cliente"] = venta["Cliente"].astype(str).str.strip()
+    venta["Caja"] = venta["Caja"].astype(str).str.strip()
+    venta["Cantidad"] = pd.to_numeric(venta["Cantidad"], errors="coerce").fillna(0).astype(int)
+    venta["Valor_Unitario"] = pd.to_numeric(venta["Valor_Unitario"], errors="coerce").fillna(
+        venta["Caja"].map(precios)).fillna(0).round().astype(int)
+    venta["Monto"] = venta["Cantidad"] * venta["Valor_Unitario"]
+    venta["Es_Credito"] = venta["Es_Credito"].map(VALORES_BOOL).fillna(False).astype(bool)
+    return venta[columnas].reset_index(drop=True)
+
+def creditos_de_venta(venta):
+    """
+    Un crédito pendiente por cada línea vendida a crédito (None si no hay),
+    con Venta_ID = ID de la línea (o su posición si aún no tiene ID).
+    """
+    a_credito = venta[venta["Es_Credito"]]
+    if a_credito.empty:
+        return None
+    return pd.DataFrame({
+        "Cliente": a_credito["Cliente"].to_numpy(),
+        "Monto": a_credito["Monto"].to_numpy(),
+        "Fecha_Credito": a_credito["Fecha"].to_numpy(),
+        "Pagado": False,
+        "Fecha_Pago": pd.NaT,
+        "Venta_ID": (a_credito["ID"] if "ID" in a_credito.columns else a_credito.index).to_numpy(),
+        "Abonado": 0
+    })
+
+def errores_de_venta(venta, inventario, clientes):
+    """Mensajes de las líneas que no se pueden registrar (lista vacía si todo está bien)"""
+    errores = []
+    for mascara, mensaje in [
+        (venta["Fecha"].isna(), "fecha inválida"),
+        (venta["Cantidad"] <= 0, "cantidad inválida"),
+        (~venta["Cliente"].isin(clientes["Nombre"].astype(str)), "cliente no registrado"),
+    ]:
+        if mascara.any():
+            filas = ", ".join(str(i + 1) for i in venta.index[mascara][:10])
+            errores.append(f"Líneas {filas}: {mensaje}")
+    validas = venta[venta["Cantidad"] > 0]
+    pedidos, stock, faltante = validar_stock(inventario, validas)
+    for caja, falta in faltante.items():
+        if pd.isna(stock.at[caja, "Fila"]):
+            errores.append(f"{caja}: la caja no existe")
+        else:
+            errores.append(f"{caja}: se piden {int(pedidos[caja])} y hay {int(stock.at[caja, 'Cantidad'])}")
+    return errores
+
+def leer_importacion(archivo):
+    """Lee un CSV o Excel subido con las líneas de venta"""
+    if archivo.name.lower().endswith(".xlsx"):
+        lineas = pd.read_excel(archivo, dtype={"Cliente": str, "Caja": str})
+    else:
+        lineas = pd.read_csv(archivo, dtype={"Cliente": str, "Caja": str})
+    lineas.columns = [str(c).strip() for c in lineas.columns]
+    faltantes = [c for c in COLUMNAS_IMPORTACION if c not in lineas.columns]
+    if faltantes:
+        raise ValueError(f"Faltan las columnas: {', '.join(faltantes)}")
+    return lineas.dropna(how="all")
+
+# ===== CACHÉ DE DATOS =====
+# Caché compartida por todas las sesiones del proceso, con entradas propias
+# para cada tienda: servir varias tiendas no desaloja las tablas de las
+# demás. La clave es la versión de los archivos (ruta, mtime y tamaño), así
+# que una escritura hecha por otro proceso también invalida la entrada;
+# guardar_datos además limpia la caché de las tablas que reescribe, solo en
+# la tienda activa.
+def cache_por_tienda(maxsize=CACHE_MAX_ENTRADAS):
+    """
+    Como functools.lru_cache, pero con una caché de maxsize entradas por
+    tienda (la activa en el hilo). cache_clear() limpia solo la de la
+    tienda activa.
+    """
+    def decorador(funcion):
+        caches = {}
+        bloqueo = threading.Lock()
+
+        def cache_activa():
+            directorio = os.path.abspath(directorio_datos())
+            with bloqueo:
+                if directorio not in caches:
+                    caches[directorio] = functools.lru_cache(maxsize=maxsize)(funcion)
+                return caches[directorio]
+
+        @functools.wraps(funcion)
+        def envoltura(*args):
+            return cache_activa()(*args)
+        envoltura.cache_clear = lambda: cache_activa().cache_clear()
+        return envoltura
+    return decorador
+
+def version_archivos(*archivos):
+    """Retorna (ruta, mtime, tamaño) de cada archivo; solo la ruta si no existe"""
+    version = []
+    for archivo in archivos:
+        try:
+            info = os.stat(archivo)
+            version.append((archivo, info.st_mtime_ns, info.st_size))
+        except OSError:
+            version.append((archivo,))
+    return tuple(version)
+
+def version_tabla(*archivos):
+    """Versión de una tabla según el almacenamiento activo"""
+    if BACKEND == "sqlite":
+        return (base_sqlite(), almacenamiento_sqlite.version_datos(base_sqlite()))
+    return version_archivos(*archivos)
+
+def version_ventas():
+    if ventas_en_parquet():
+        return (carpeta_parquet(),) + historial_parquet.version(carpeta_parquet())
+    return version_tabla(ruta(VENTAS_FILE), ruta(VENTAS_DIARIO_FILE))
+
+@cache_por_tienda()
+def cargar_inventario_cache(version):
+    return cargar_inventario()
+
+@cache_por_tienda()
+def cargar_clientes_cache(version):
+    return cargar_clientes()
+
+@cache_por_tienda()
+def cargar_ventas_cache(version):
+    return cargar_ventas()
+
+@cache_por_tienda(CACHE_MAX_ENTRADAS * 4)
+def cargar_ventas_rango_cache(version, desde, hasta):
+    if BACKEND == "csv" and not ventas_en_parquet():
+        # El CSV se lee completo de todos modos: se corta el historial en caché
+        return filas_en_rango(cargar_ventas_cache(version), desde, hasta)
+    return cargar_ventas(desde, hasta)
+
+@cache_por_tienda()
+def contar_ventas_cache(version):
+    if BACKEND == "sqlite":
+        return almacenamiento_sqlite.contar_filas("ventas", base_sqlite())
+    if ventas_en_parquet():
+        return historial_parquet.contar_ventas(carpeta_parquet())
+    return len(cargar_ventas_cache(version))
+
+@cache_por_tienda()
+def ultimas_ventas_cache(version, n):
+    try:
+        if BACKEND == "sqlite":
+            ventas = almacenamiento_sqlite.leer_tabla("ventas", base_sqlite(), orden="Fecha DESC, id DESC", limite=n)
+            return aplicar_esquema(ventas.iloc[::-1].reset_index(drop=True), "ventas")
+        if ventas_en_parquet():
+            return aplicar_esquema(historial_parquet.ultimas_ventas(n, carpeta_parquet()), "ventas")
+        return cargar_ventas_cache(version).tail(n)
+    except:
+        return tabla_vacia("ventas")
+
+@cache_por_tienda()
+def cargar_creditos_cache(version):
+    return cargar_creditos()
+
+@cache_por_tienda()
+def indice_cajas_cache(version):
+    return construir_indice_cajas(cargar_inventario_cache(version))
+
+@cache_por_tienda()
+def indice_clientes_cache(version):
+    return construir_indice_clientes(cargar_clientes_cache(version))
+
+def invalidar_cache(inventario=False, clientes=False, ventas=False, creditos=False):
+    if inventario:
+        cargar_inventario_cache.cache_clear()
+        indice_cajas_cache.cache_clear()
+    if clientes:
+        cargar_clientes_cache.cache_clear()
+        indice_clientes_cache.cache_clear()
+    if ventas:
+        cargar_ventas_cache.cache_clear()
+        cargar_ventas_rango_cache.cache_clear()
+        contar_ventas_cache.cache_clear()
+        ultimas_ventas_cache.cache_clear()
+    if creditos:
+        cargar_creditos_cache.cache_clear()
+
+CARGAS_CACHE = {"inventario": cargar_inventario_cache, "clientes": cargar_clientes_cache,
+                "ventas": cargar_ventas_cache, "creditos": cargar_creditos_cache}
+
+def cargar_tabla(tabla):
+    """
+    Una tabla desde la caché. Es una copia superficial: con Copy-on-Write,
+    modificarla no altera la caché.
+    """
+    version = version_de(tabla)
+    df = CARGAS_CACHE[tabla](version).copy(deep=False)
+    # Versión leída, para detectar escrituras concurrentes al guardar
+    df.attrs = {"version": version}
+    return df
+
+@rendimiento.medido("cargar_datos")
+def cargar_datos():
+    """Retorna los cuatro DataFrames desde la caché"""
+    return tuple(cargar_tabla(tabla) for tabla in ("inventario", "clientes", "ventas", "creditos"))
+
+def cargar_ventas_rango(desde=None, hasta=None):
+    """
+    Ventas de un rango de fechas desde la caché. Con CSV es un corte del
+    historial en caché; con Parquet solo se leen las particiones de los
+    meses del rango y con SQLite se usa el índice de Fecha.
+    """
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+    return cargar_ventas_rango_cache(version_ventas(), desde, hasta).copy(deep=False)
+
+# Consultas sobre las ventas que no necesitan el historial completo: con
+# SQLite usan el índice de Fecha y con Parquet los metadatos o el último
+# mes. Solo el historial de la pantalla de ventas carga todas las filas.
+def contar_ventas():
+    return contar_ventas_cache(version_ventas())
+
+def ultimas_ventas(n):
+    """Las n ventas más recientes, en orden de Fecha"""
+    return ultimas_ventas_cache(version_ventas(), n).copy(deep=False)
+
+def primera_fecha_ventas():
+    """Fecha de la venta más antigua, o None si no hay ventas"""
+    if ventas_en_parquet():
+        return historial_parquet.primera_fecha(carpeta_parquet())
+    if BACKEND == "sqlite":
+        fechas = almacenamiento_sqlite.leer_tabla("ventas", base_sqlite(), orden="Fecha, id", limite=1)["Fecha"]
+    else:
+        fechas = cargar_tabla("ventas")["Fecha"]
+    return fechas.iloc[0] if not fechas.empty else None
+
+def siguiente_id_venta():
+    """ID para la próxima venta; con Parquet sale de las estadísticas de las particiones"""
+    if ventas_en_parquet():
+        return historial_parquet.max_id(carpeta_parquet()) + 1
+    return siguiente_id(cargar_ventas_cache(version_ventas()))
+
+@rendimiento.medido("verificar_stock_bajo")
+def verificar_stock_bajo(inventario):
+    """Retorna un DataFrame con cajas en o bajo su punto de reorden"""
+    if inventario.empty:
+        return pd.DataFrame()
+    cajas_alerta = inventario[inventario['Cantidad'] <= inventario['Punto_Reorden']]
+    return cajas_alerta
+
+@rendimiento.medido("calcular_ganancia_neta")
+def calcular_ganancia_neta(ventas):
+    """
+    Ganancia Neta = (Monto Total - 7000) por cada venta
+    """
+    if ventas is None or ventas.empty:
+        return 0
+    montos = pd.to_numeric(ventas['Monto'], errors='coerce').fillna(0)
+    return float((montos - COSTO_POR_VENTA).clip(lower=0).sum())
+
+# ===== RESUMEN DE INDICADORES =====
+# Los indicadores del Dashboard y Reportes se guardan en RESUMEN_FILE y se
+# actualizan con cada venta, eliminación y pago, en lugar de sumar las
+# tablas completas en cada recarga. Estos derivados se actualizan después de
+# confirmar la escritura: si la actualización falla, el archivo se elimina
+# para recalcularlo en la próxima lectura y la operación sigue siendo exitosa.
+def descartar_derivado(archivo):
+    try:
+        if os.path.exists(archivo):
+            os.remove(archivo)
+    except OSError:
+        pass
+
+def monto_pendiente(creditos):
+    if creditos is None or creditos.empty:
+        return 0.0
+    pendientes = creditos[~creditos['Pagado'].fillna(False).astype(bool)]
+    saldo = pd.to_numeric(pendientes['Monto'], errors='coerce').fillna(0) - pendientes['Abonado']
+    return float(saldo.sum())
+
+def valor_del_inventario(inventario):
+    if inventario is None or inventario.empty:
+        return 0.0
+    return float((inventario['Cantidad'] * inventario['Valor_Unitario']).sum())
+
+def guardar_resumen(resumen):
+    temporal = ruta(RESUMEN_FILE) + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(resumen, f)
+    os.replace(temporal, ruta(RESUMEN_FILE))
+
+def leer_resumen():
+    try:
+        with open(ruta(RESUMEN_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return None
+
+def recalcular_resumen(inventario, ventas, creditos):
+    """Calcula los indicadores desde las tablas completas y los guarda"""
+    resumen = {
+        "venta_total": float(pd.to_numeric(ventas['Monto'], errors='coerce').fillna(0).sum()) if not ventas.empty else 0.0,
+        "ganancia_neta": calcular_ganancia_neta(ventas),
+        "credito_pendiente": monto_pendiente(creditos),
+        "valor_inventario": valor_del_inventario(inventario),
+        "num_ventas": len(ventas),
+        "num_creditos": len(creditos),
+    }
+    try:
+        guardar_resumen(resumen)
+    except:
+        pass
+    return resumen
+
+@rendimiento.medido("cargar_resumen")
+def cargar_resumen(inventario, creditos, ventas=None):
+    """
+    Retorna el resumen guardado. Si no existe o no corresponde a las tablas
+    (p. ej. tras una migración), se recalcula; sin ventas, el historial
+    solo se carga en ese caso.
+    """
+    resumen = leer_resumen()
+    num_ventas = contar_ventas() if ventas is None else len(ventas)
+    if (resumen is None or resumen.get("num_ventas") != num_ventas
+            or resumen.get("num_creditos") != len(creditos)):
+        ventas = cargar_tabla("ventas") if ventas is None else ventas
+        resumen = recalcular_resumen(inventario, ventas, creditos)
+    return resumen
+
+def actualizar_resumen(ventas_nuevas=None, ventas_eliminadas=None, creditos_nuevos=None,
+                       creditos_eliminados=None, abonado=0, inventario=None):
+    """Aplica al resumen guardado solo el cambio de una operación"""
+    try:
+        with bloqueo_datos():
+            aplicar_cambio_resumen(ventas_nuevas, ventas_eliminadas, creditos_nuevos,
+                                   creditos_eliminados, abonado, inventario)
+    except:
+        descartar_derivado(ruta(RESUMEN_FILE))
+
+def aplicar_cambio_resumen(ventas_nuevas, ventas_eliminadas, creditos_nuevos,
+                           creditos_eliminados, abonado, inventario):
+    resumen = leer_resumen()
+    if resumen is None:
+        # Sin resumen previo: se calculará completo en la próxima lectura
+        return
+    for df, signo in [(ventas_nuevas, 1), (ventas_eliminadas, -1)]:
+        if df is not None and not df.empty:
+            resumen["venta_total"] += signo * float(pd.to_numeric(df['Monto'], errors='coerce').fillna(0).sum())
+            resumen["ganancia_neta"] += signo * calcular_ganancia_neta(df)
+            resumen["num_ventas"] += signo * len(df)
+    for df, signo in [(creditos_nuevos, 1), (creditos_eliminados, -1)]:
+        if df is not None and not df.empty:
+            resumen["credito_pendiente"] += signo * monto_pendiente(df)
+            resumen["num_creditos"] += signo * len(df)
+    resumen["credito_pendiente"] -= abonado
+    if inventario is not None:
+        resumen["valor_inventario"] = valor_del_inventario(inventario)
+    try:
+        guardar_resumen(resumen)
+    except:
+        pass
+
+# ===== ALERTAS DE STOCK =====
+# Cajas con Cantidad <= Punto_Reorden. El conjunto se guarda en ALERTAS_FILE
+# con la versión del inventario a la que corresponde; cada escritura del
+# inventario revisa solo las cajas que cambió, y al leerlo no se recorre
+# el catálogo salvo que el inventario haya cambiado por otra vía.
+COLUMNAS_ALERTAS = ["ID", "Caja", "Cantidad", "Punto_Reorden"]
+
+def version_json(version):
+    """La versión tal como queda al guardarla en JSON (tuplas → listas)"""
+    return json.loads(json.dumps(version))
+
+def cajas_en_alerta(inventario):
+    if inventario is None or inventario.empty:
+        return pd.DataFrame(columns=COLUMNAS_ALERTAS)
+    return inventario.loc[inventario["Cantidad"] <= inventario["Punto_Reorden"], COLUMNAS_ALERTAS]
+
+def guardar_alertas(alertas, version):
+    temporal = ruta(ALERTAS_FILE) + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "alertas": alertas[COLUMNAS_ALERTAS].to_dict("records")}, f)
+    os.replace(temporal, ruta(ALERTAS_FILE))
+
+@cache_por_tienda()
+def leer_alertas_cache(version):
+    with open(ruta(ALERTAS_FILE), encoding="utf-8") as f:
+        guardadas = json.load(f)
+    alertas = pd.DataFrame(guardadas["alertas"], columns=COLUMNAS_ALERTAS)
+    return guardadas["version"], alertas.sort_values("Cantidad", kind="stable").reset_index(drop=True)
+
+def leer_alertas():
+    """(versión del inventario, alertas) guardadas, o (None, None)"""
+    try:
+        return leer_alertas_cache(version_archivos(ruta(ALERTAS_FILE)))
+    except:
+        return None, None
+
+def actualizar_alertas(inventario, cajas=None, version_anterior=None):
+    """
+    Tras escribir el inventario: si las alertas guardadas corresponden a
+    version_anterior, solo se revisan las cajas con esos ID (las que ya no
+    existen salen del conjunto); si no, se recalculan con todo el inventario.
+    """
+    try:
+        with bloqueo_datos():
+            version, alertas = leer_alertas()
+            if cajas is None or alertas is None or version != version_json(version_anterior):
+                alertas = cajas_en_alerta(inventario)
+            else:
+                cajas = pd.Series(cajas, dtype="int64")
+                revisadas = inventario[inventario["ID"].isin(cajas)]
+                alertas = pd.concat([alertas[~alertas["ID"].isin(cajas)], cajas_en_alerta(revisadas)],
+                                    ignore_index=True)
+            guardar_alertas(alertas, version_json(version_de("inventario")))
+    except:
+        descartar_derivado(ruta(ALERTAS_FILE))
+
+@rendimiento.medido("cargar_alertas")
+def cargar_alertas(inventario):
+    """
+    Cajas en alerta del inventario cargado: las guardadas si corresponden a
+    su versión; si no, se calculan y se guardan para las próximas lecturas.
+    """
+    version = version_json(inventario.attrs.get("version"))
+    guardada, alertas = leer_alertas()
+    if alertas is not None and version is not None and guardada == version:
+        return alertas.copy(deep=False)
+    alertas = cajas_en_alerta(inventario)
+    if version is not None:
+        try:
+            guardar_alertas(alertas, version)
+        except:
+            pass
+    return alertas.sort_values("Cantidad", kind="stable").reset_index(drop=True)
+
+# ===== SALDOS POR CLIENTE =====
+# Saldo pendiente (Monto - Abonado de los créditos sin pagar) y número de
+# créditos pendientes de cada cliente con deuda. Se guardan en SALDOS_FILE
+# con la versión de los créditos a la que corresponden y cada venta a
+# crédito, abono o eliminación aplica solo su cambio.
+COLUMNAS_SALDOS = ["Cliente", "Saldo", "Creditos"]
+
+def saldos_de(creditos):
+    """Saldo y créditos pendientes por cliente (índice Cliente)"""
+    if creditos is None or creditos.empty:
+        return pd.DataFrame({"Saldo": [], "Creditos": []}, index=pd.Index([], name="Cliente"), dtype="int64")
+    pendientes = creditos[~creditos["Pagado"].fillna(False).astype(bool)]
+    saldos = pd.DataFrame({
+        "Saldo": pd.to_numeric(pendientes["Monto"], errors="coerce").fillna(0) - pendientes["Abonado"],
+        "Creditos": 1,
+    }).groupby(pendientes["Cliente"].astype(str).to_numpy()).sum()
+    saldos.index.name = "Cliente"
+    return saldos
+
+def cambio_de_saldo(cliente, saldo, creditos):
+    return pd.DataFrame({"Saldo": [saldo], "Creditos": [creditos]}, index=pd.Index([cliente], name="Cliente"))
+
+def guardar_saldos(saldos, version):
+    temporal = ruta(SALDOS_FILE) + ".tmp"
+    registros = saldos[COLUMNAS_SALDOS].astype({"Saldo": "int64", "Creditos": "int64"}).to_dict("records")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "saldos": registros}, f, ensure_ascii=False)
+    os.replace(temporal, ruta(SALDOS_FILE))
+
+@cache_por_tienda()
+def leer_saldos_cache(version):
+    with open(ruta(SALDOS_FILE), encoding="utf-8") as f:
+        guardados = json.load(f)
+    saldos = pd.DataFrame(guardados["saldos"], columns=COLUMNAS_SALDOS)
+    return guardados["version"], saldos.sort_values("Saldo", ascending=False, kind="stable").reset_index(drop=True)
+
+def leer_saldos():
+    """(versión de los créditos, saldos) guardados, o (None, None)"""
+    try:
+        return leer_saldos_cache(version_archivos(ruta(SALDOS_FILE)))
+    except:
+        return None, None
+
+def actualizar_saldos(cambio=None, version_anterior=None):
+    """
+    Suma el cambio (DataFrame por Cliente con Saldo y Creditos) a los saldos
+    guardados si corresponden a version_anterior de los créditos; si no, se
+    dejan como están y se recalculan en la próxima lectura.
+    """
+    try:
+        with bloqueo_datos():
+            version, saldos = leer_saldos()
+            if saldos is None or version != version_json(version_anterior):
+                return
+            if cambio is not None and not cambio.empty:
+                saldos = saldos.set_index("Cliente").add(cambio, fill_value=0)
+                saldos = saldos[(saldos["Saldo"] > 0) | (saldos["Creditos"] > 0)].reset_index()
+            guardar_saldos(saldos, version_json(version_de("creditos")))
+    except:
+        descartar_derivado(ruta(SALDOS_FILE))
+
+@rendimiento.medido("cargar_saldos")
+def cargar_saldos(creditos):
+    """
+    Clientes con saldo pendiente, de mayor a menor saldo: los guardados si
+    corresponden a la versión de los créditos cargados; si no, se calculan
+    y se guardan para las próximas lecturas.
+    """
+    version = version_json(creditos.attrs.get("version"))
+    guardada, saldos = leer_saldos()
+    if saldos is not None and version is not None and guardada == version:
+        return saldos.copy(deep=False)
+    saldos = saldos_de(creditos).reset_index()
+    if version is not None:
+        try:
+            guardar_saldos(saldos, version)
+        except:
+            pass
+    return saldos.sort_values("Saldo", ascending=False, kind="stable").reset_index(drop=True)
+
+# ===== AGREGADOS DIARIOS =====
+# Cantidad, monto y número de ventas por día y caja. Las gráficas del
+# Dashboard agrupan esta tabla (por día, mes o caja) en lugar de las ventas.
+COLUMNAS_AGREGADOS = ["Dia", "Caja", "Cantidad", "Monto", "Ventas"]
+
+def agregar_por_dia(ventas):
+    """Agrupa ventas por día y caja"""
+    if ventas is None or ventas.empty:
+        return pd.DataFrame(columns=COLUMNAS_AGREGADOS).astype({"Dia": "datetime64[ns]"})
+    agregados = ventas.assign(
+        Dia=pd.to_datetime(ventas['Fecha']).dt.normalize(),
+        Ventas=1
+    ).groupby(['Dia', 'Caja'], as_index=False, observed=True)[['Cantidad', 'Monto', 'Ventas']].sum()
+    agregados['Caja'] = agregados['Caja'].astype(str)
+    return agregados[COLUMNAS_AGREGADOS]
+
+def guardar_agregados(agregados):
+    temporal = ruta(AGREGADOS_FILE) + ".tmp"
+    agregados.to_csv(temporal, index=False, date_format="%Y-%m-%d")
+    os.replace(temporal, ruta(AGREGADOS_FILE))
+
+@cache_por_tienda()
+def leer_agregados_cache(version):
+    agregados = pd.read_csv(ruta(AGREGADOS_FILE))
+    agregados["Dia"] = pd.to_datetime(agregados["Dia"])
+    return agregados
+
+@rendimiento.medido("cargar_agregados")
+def cargar_agregados(ventas=None):
+    """
+    Retorna los agregados guardados; si no existen o no cuadran con el
+    número de ventas, los recalcula desde las ventas (sin ventas, se carga
+    el historial solo en ese caso).
+    """
+    agregados = None
+    if os.path.exists(ruta(AGREGADOS_FILE)):
+        try:
+            agregados = leer_agregados_cache(version_archivos(ruta(AGREGADOS_FILE)))
+        except:
+            agregados = None
+    num_ventas = contar_ventas() if ventas is None else len(ventas)
+    if agregados is None or int(agregados['Ventas'].sum()) != num_ventas:
+        agregados = agregar_por_dia(cargar_tabla("ventas") if ventas is None else ventas)
+        try:
+            guardar_agregados(agregados)
+        except:
+            pass
+    return agregados.copy(deep=False)
+
+def actualizar_agregados(ventas_nuevas=None, ventas_eliminadas=None):
+    """Suma (o resta) al agregado guardado solo los días y cajas afectados"""
+    with bloqueo_datos():
+        aplicar_cambio_agregados(ventas_nuevas, ventas_eliminadas)
+
+def aplicar_cambio_agregados(ventas_nuevas, ventas_eliminadas):
+    if not os.path.exists(ruta(AGREGADOS_FILE)):
+        # Se calculará completo en la próxima lectura
+        return
+    try:
+        partes = [leer_agregados_cache(version_archivos(ruta(AGREGADOS_FILE)))]
+        if ventas_nuevas is not None and not ventas_nuevas.empty:
+            partes.append(agregar_por_dia(ventas_nuevas))
+        if ventas_eliminadas is not None and not ventas_eliminadas.empty:
+            restar = agregar_por_dia(ventas_eliminadas)
+            restar[['Cantidad', 'Monto', 'Ventas']] *= -1
+            partes.append(restar)
+        agregados = pd.concat(partes, ignore_index=True).groupby(
+            ['Dia', 'Caja'], as_index=False
+        )[['Cantidad', 'Monto', 'Ventas']].sum()
+        guardar_agregados(agregados[agregados['Ventas'] > 0][COLUMNAS_AGREGADOS])
+    except:
+        # Si falla, se elimina para forzar el recálculo completo
+        if os.path.exists(ruta(AGREGADOS_FILE)):
+            os.remove(ruta(AGREGADOS_FILE))
+
+# ===== REPOSICIÓN SUGERIDA =====
+# El pronóstico se calcula desde los agregados diarios (que ya se actualizan
+# con cada venta), así su costo depende de la ventana y el número de cajas,
+# no de los años de ventas. Queda en caché por versión de los agregados y
+# del inventario, y por día.
+@cache_por_tienda()
+def reposicion_cache(version_agregados, version_inventario, hoy):
+    return pronostico.reposicion(leer_agregados_cache(version_agregados),
+                                 cargar_inventario_cache(version_inventario), hoy)
+
+@rendimiento.medido("cargar_reposicion")
+def cargar_reposicion(inventario, ventas=None, hoy=None):
+    """Demanda, días de cobertura y unidades a reponer por caja"""
+    hoy = hoy or datetime.now().date()
+    agregados = cargar_agregados(ventas)
+    version = inventario.attrs.get("version")
+    if version is None or not os.path.exists(ruta(AGREGADOS_FILE)):
+        return pronostico.reposicion(agregados, inventario, hoy)
+    return reposicion_cache(version_archivos(ruta(AGREGADOS_FILE)), version, hoy).copy(deep=False)
+
+# ===== CONSOLIDADO DE TIENDAS =====
+# Indicadores y agregados diarios de todas las tiendas para la casa matriz.
+# Cada tienda se calcula en un proceso del grupo (un proceso por núcleo): la
+# lectura de los historiales corre en paralelo sin competir por el GIL y
+# solo se unen los resultados, que son pequeños. Los procesos se crean con
+# "spawn" (el servidor de Streamlit tiene hilos) y se reutilizan; si uno
+# muere, el grupo roto se cierra y se reemplaza. El resultado queda en
+# caché por la versión de cada tienda.
+COLUMNAS_CONSOLIDADO = ["Tienda", "venta_total", "ganancia_neta", "credito_pendiente", "valor_inventario",
+                        "num_ventas", "num_creditos"]
+
+def indicadores_tienda(directorio):
+    """Resumen y agregados diarios de una tienda (se ejecuta en un proceso del grupo)"""
+    with en_tienda(directorio):
+        inventario, creditos = cargar_tabla("inventario"), cargar_tabla("creditos")
+        return cargar_resumen(inventario, creditos), cargar_agregados()
+
+estado_grupo = {"grupo": None}
+bloqueo_grupo = threading.Lock()
+
+def grupo_procesos(reemplazar=None):
+    """
+    Grupo de procesos compartido, uno por núcleo. Con reemplazar (el grupo
+    roto que falló) se cierra ese grupo y se crea otro; si otro hilo ya lo
+    reemplazó, se usa el nuevo.
+    """
+    with bloqueo_grupo:
+        grupo = estado_grupo["grupo"]
+        if grupo is not None and grupo is reemplazar:
+            grupo.shutdown(wait=False, cancel_futures=True)
+            grupo = None
+        if grupo is None:
+            grupo = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"))
+            estado_grupo["grupo"] = grupo
+        return grupo
+
+def version_tienda(directorio):
+    with en_tienda(directorio):
+        return tuple(version_de(tabla) for tabla in ("inventario", "ventas", "creditos"))
+
+@functools.lru_cache(maxsize=CACHE_MAX_ENTRADAS)
+def consolidado_cache(tiendas):
+    """tiendas: ((nombre, carpeta, versión), ...)"""
+    futuros = {}
+    if tiendas:
+        grupo = grupo_procesos()
+        try:
+            futuros = {nombre: grupo.submit(indicadores_tienda, directorio) for nombre, directorio, _ in tiendas}
+        except BrokenProcessPool:
+            # Un proceso murió con el grupo libre: se reemplaza antes de enviar
+            grupo = grupo_procesos(reemplazar=grupo)
+            futuros = {nombre: grupo.submit(indicadores_tienda, directorio) for nombre, directorio, _ in tiendas}
+    filas, partes, errores = [], [], {}
+    for nombre, futuro in futuros.items():
+        try:
+            resumen, agregados = futuro.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Un proceso murió: el grupo no sirve más, se cierra y se crea otro
+                grupo_procesos(reemplazar=grupo)
+            errores[nombre] = str(e) or type(e).__name__
+            continue
+        filas.append({"Tienda": nombre, **resumen})
+        partes.append(agregados.assign(Tienda=nombre))
+    indicadores = pd.DataFrame(filas, columns=COLUMNAS_CONSOLIDADO)
+    if partes:
+        agregados = pd.concat(partes, ignore_index=True)
+    else:
+        agregados = pd.DataFrame(columns=COLUMNAS_AGREGADOS + ["Tienda"]).astype({"Dia": "datetime64[ns]"})
+    return indicadores, agregados, errores
+
+@rendimiento.medido("cargar_consolidado")
+def cargar_consolidado(tiendas=None):
+    """
+    Retorna (indicadores con una fila por tienda, agregados diarios de todas
+    con columna Tienda, errores por tienda). Por defecto, las de tiendas.csv.
+    """
+    tiendas = cargar_tiendas() if tiendas is None else tiendas
+    claves, errores = [], {}
+    for nombre, directorio in tiendas.items():
+        if os.path.isdir(directorio):
+            claves.append((nombre, directorio, version_tienda(directorio)))
+        else:
+            errores[nombre] = f"No existe la carpeta {directorio}"
+    indicadores, agregados, fallidas = consolidado_cache(tuple(claves))
+    if fallidas:
+        # No se guarda un resultado con tiendas fallidas: la próxima llamada reintenta
+        consolidado_cache.cache_clear()
+    return indicadores.copy(deep=False), agregados.copy(deep=False), {**errores, **fallidas}
+
+# ===== EXPORTACIÓN =====
+# Los reportes se arman en un búfer temporal (en memoria hasta
+# EXPORTACION_MAX_MEMORIA, luego en disco) y se entregan con un botón de
+# descarga; nada se guarda en la carpeta del servidor. El trabajo guarda el
+# búfer (no su contenido) y solo se lee al descargarlo o copiarlo a un archivo.
+EXPORTACION_MAX_MEMORIA = 16 * 1024 * 1024
+EXPORTACION_BLOQUE = 5000
+FORMATOS_EXPORTACION = {
+    "Excel (.xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV (.csv)": ("csv", "text/csv"),
+    "Parquet (.parquet)": ("parquet", "application/octet-stream"),
+}
+PARQUET_DISPONIBLE = importlib.util.find_spec("pyarrow") is not None
+
+# Reportes en segundo plano: hilos del grupo y trabajos terminados que se conservan
+TRABAJOS_HILOS = int(os.environ.get("BIODESICION_TRABAJOS_HILOS", "2"))
+TRABAJOS_MAX_TERMINADOS = 20
+
+# Un trabajo terminado puede ser de varias sesiones: su búfer se lee de a una
+bloqueo_reportes = threading.Lock()
+
+def bloques_de(df):
+    """Bloques de filas del DataFrame, con los vacíos (NaN/NaT) como None"""
+    for inicio in range(0, len(df), EXPORTACION_BLOQUE):
+        bloque = df.iloc[inicio:inicio + EXPORTACION_BLOQUE].astype(object)
+        yield list(bloque.where(bloque.notna(), None).itertuples(index=False, name=None))
+
+def sin_avance(avance):
+    pass
+
+def exportar_excel(hojas, avance=sin_avance):
+    """
+    Libro .xlsx en modo de solo escritura de openpyxl: las filas se escriben
+    por bloques sin armar todas las celdas del libro en memoria.
+    """
+    libro = rendimiento.importar("openpyxl").Workbook(write_only=True)
+    total = max(sum(len(df) for df in hojas.values()), 1)
+    escritas = 0
+    try:
+        for nombre, df in hojas.items():
+            hoja = libro.create_sheet(nombre)
+            hoja.append(list(df.columns))
+            for bloque in bloques_de(df):
+                for fila in bloque:
+                    hoja.append(fila)
+                escritas += len(bloque)
+                avance(0.9 * escritas / total)
+    except BaseException:
+        # Cancelado o con error: se cierran las hojas y sus temporales
+        for hoja in libro.worksheets:
+            hoja.close()
+        raise
+    buffer = tempfile.SpooledTemporaryFile(max_size=EXPORTACION_MAX_MEMORIA)
+    libro.save(buffer)
+    return buffer
+
+def exportar_csv(df, avance=sin_avance):
+    buffer = tempfile.SpooledTemporaryFile(max_size=EXPORTACION_MAX_MEMORIA)
+    buffer.write("\ufeff".encode("utf-8"))
+    for inicio in range(0, max(len(df), 1), EXPORTACION_BLOQUE):
+        df.iloc[inicio:inicio + EXPORTACION_BLOQUE].to_csv(
+            buffer, index=False, header=inicio == 0, encoding="utf-8",
+            date_format="%Y-%m-%d %H:%M:%S"
+        )
+        avance((inicio + EXPORTACION_BLOQUE) / max(len(df), 1))
+    return buffer
+
+def exportar_parquet(df, avance=sin_avance):
+    buffer = tempfile.SpooledTemporaryFile(max_size=EXPORTACION_MAX_MEMORIA)
+    df.to_parquet(buffer, engine="pyarrow", index=False, compression="zstd")
+    return buffer
+
+def tablas_reporte(desde, hasta, inventario, clientes, creditos):
+    """Tablas del reporte; ventas y créditos limitados al rango de fechas (días completos)"""
+    inicio, fin = limites_dias(desde, hasta)
+    ventas = cargar_ventas_rango(inicio, fin)
+    en_rango = creditos['Fecha_Credito'].between(inicio, fin)
+    return {"Ventas": ventas, "Inventario": inventario, "Clientes": clientes,
+            "Créditos": creditos[en_rango]}
+
+def exportar_reporte(hojas, formato, avance=sin_avance):
+    """Retorna (nombre de archivo, búfer al inicio, tipo MIME) del reporte"""
+    extension, mime = FORMATOS_EXPORTACION[formato]
+    if extension == "xlsx":
+        buffer = exportar_excel(hojas, avance)
+        base = "Reporte"
+    else:
+        # CSV y Parquet: una sola tabla
+        base, df = next(iter(hojas.items()))
+        buffer = exportar_csv(df, avance) if extension == "csv" else exportar_parquet(df, avance)
+    buffer.seek(0)
+    return f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}", buffer, mime
+
+def leer_reporte(buffer):
+    """Contenido del búfer de un reporte, para entregarlo al descargar"""
+    with bloqueo_reportes:
+        buffer.seek(0)
+        return buffer.read()
+
+def generar_reporte(trabajo, directorio, desde, hasta, hojas, formato, inventario, clientes, creditos):
+    """
+    Función de trabajo en segundo plano (ver trabajos.Ejecutor): lee las
+    ventas del rango en la tienda indicada y exporta las hojas pedidas. El
+    reporte terminado queda en disco hasta que se descarta el trabajo.
+    """
+    with en_tienda(directorio):
+        tablas = tablas_reporte(desde, hasta, inventario, clientes, creditos)
+    nombre, buffer, mime = exportar_reporte({hoja: tablas[hoja] for hoja in hojas}, formato, trabajo.informar)
+    buffer.rollover()
+    return nombre, buffer, mime
+
+# ===== LÍNEA DE COMANDOS =====
+def comando_importar_ventas(args):
+    """Importa ventas (CSV/Excel) validando stock y clientes; todo o nada"""
+    inventario, clientes = cargar_tabla("inventario"), cargar_tabla("clientes")
+    try:
+        with open(args.archivo, "rb") as archivo:
+            venta = armar_venta(leer_importacion(archivo), inventario)
+    except Exception as e:
+        print(f"❌ No se pudo leer el archivo: {e}")
+        return 1
+    errores = errores_de_venta(venta, inventario, clientes)
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        return 1
+    if not registrar_venta(venta):
+        print("❌ No se pudo registrar: el stock cambió o los datos están ocupados")
+        return 1
+    print(f"✅ {len(venta)} ventas importadas (${venta['Monto'].sum():,.0f})")
+    return 0
+
+def comando_recalcular(args):
+    """Recalcula desde cero los indicadores, los agregados diarios, las alertas de stock y los saldos"""
+    inventario, _, ventas, creditos = cargar_datos()
+    with bloqueo_datos():
+        guardar_resumen(recalcular_resumen(inventario, ventas, creditos))
+        guardar_agregados(agregar_por_dia(ventas))
+        guardar_alertas(cajas_en_alerta(inventario), version_json(inventario.attrs.get("version")))
+        guardar_saldos(saldos_de(creditos).reset_index(), version_json(creditos.attrs.get("version")))
+    print("✅ Resumen, agregados, alertas y saldos recalculados")
+    return comando_resumen(args)
+
+def comando_compactar(args):
+    """Consolida los diarios de ventas y créditos"""
+    if not compactar_diario():
+        print("❌ No se pudo compactar")
+        return 1
+    print("✅ Diarios compactados")
+    return 0
+
+def comando_exportar(args):
+    """Exporta un reporte; el formato sale de la extensión del archivo"""
+    inventario, clientes, creditos = cargar_tabla("inventario"), cargar_tabla("clientes"), cargar_tabla("creditos")
+    formatos = {extension: formato for formato, (extension, _) in FORMATOS_EXPORTACION.items()}
+    extension = os.path.splitext(args.archivo)[1].lstrip(".").lower()
+    if extension not in formatos:
+        print(f"❌ Formato no soportado: {extension}")
+        return 1
+    primera = primera_fecha_ventas()
+    desde = args.desde or (primera.date() if primera is not None else datetime.now().date())
+    hasta = args.hasta or datetime.now().date()
+    hojas = tablas_reporte(desde, hasta, inventario, clientes, creditos)
+    if extension != "xlsx":
+        hojas = {args.tabla: hojas[args.tabla]}
+    _, buffer, _ = exportar_reporte(hojas, formatos[extension])
+    with buffer, open(args.archivo, "wb") as f:
+        shutil.copyfileobj(buffer, f)
+    print(f"✅ Reporte guardado: {args.archivo}")
+    return 0
+
+def comando_resumen(args):
+    """Muestra los indicadores"""
+    inventario, creditos = cargar_tabla("inventario"), cargar_tabla("creditos")
+    print(json.dumps(cargar_resumen(inventario, creditos), indent=2, ensure_ascii=False))
+    return 0
+
+def comando_consolidado(args):
+    """Indicadores de todas las tiendas, calculadas en paralelo, y su total"""
+    indicadores, _, errores = cargar_consolidado()
+    total = indicadores.drop(columns="Tienda").sum()
+    tabla = pd.concat([indicadores, pd.DataFrame([{"Tienda": "TOTAL", **total}])], ignore_index=True)
+    tabla = tabla.astype({"num_ventas": "int64", "num_creditos": "int64"})
+    print(tabla.to_string(index=False))
+    for tienda, error in errores.items():
+        print(f"❌ {tienda}: {error}")
+    return 1 if errores else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Operaciones por lotes de BIODESICION")
+    parser.add_argument("--directorio", help="carpeta que contiene datos/ (por defecto, la actual)")
+    parser.add_argument("--tienda", help="tienda de tiendas.csv sobre la que se trabaja (por defecto, datos/)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    importar = comandos.add_parser("importar-ventas", help=comando_importar_ventas.__doc__)
+    importar.add_argument("archivo")
+    importar.set_defaults(funcion=comando_importar_ventas)
+    comandos.add_parser("recalcular", help=comando_recalcular.__doc__).set_defaults(funcion=comando_recalcular)
+    comandos.add_parser("compactar", help=comando_compactar.__doc__).set_defaults(funcion=comando_compactar)
+    exportar = comandos.add_parser("exportar", help=comando_exportar.__doc__)
+    exportar.add_argument("archivo", help="reporte.xlsx, ventas.csv o ventas.parquet")
+    exportar.add_argument("--desde", type=lambda t: datetime.strptime(t, "%Y-%m-%d").date())
+    exportar.add_argument("--hasta", type=lambda t: datetime.strptime(t, "%Y-%m-%d").date())
+    exportar.add_argument("--tabla", default="Ventas", choices=["Ventas", "Inventario", "Clientes", "Créditos"],
+                          help="tabla para CSV/Parquet")
+    exportar.set_defaults(funcion=comando_exportar)
+    comandos.add_parser("resumen", help=comando_resumen.__doc__).set_defaults(funcion=comando_resumen)
+    comandos.add_parser("consolidado", help=comando_consolidado.__doc__).set_defaults(funcion=comando_consolidado)
+    args = parser.parse_args(argv)
+    if args.directorio:
+        os.chdir(args.directorio)
+        os.makedirs(DATOS_DIR, exist_ok=True)
+    tiendas = cargar_tiendas()
+    if args.tienda is not None and args.tienda not in tiendas:
+        print(f"❌ Tienda desconocida: {args.tienda} (hay: {', '.join(tiendas)})")
+        return 1
+    usar_tienda(tiendas[args.tienda] if args.tienda is not None else DATOS_DIR)
+    return args.funcion(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Pronóstico de demanda y reposición sugerida por caja.
+
+Trabaja sobre los agregados diarios (día, caja, cantidad), no sobre las
+ventas: se arma una matriz días × cajas de la ventana reciente y todas las
+cajas se calculan a la vez con operaciones por columna de pandas/NumPy:
+  - velocidad: unidades por día en la ventana completa.
+  - media móvil: promedio de los últimos MEDIA_MOVIL_DIAS.
+  - EWMA: promedio exponencial (vida media VIDA_MEDIA_DIAS); es la demanda
+    diaria usada para la cobertura y la reposición.
+  - días de cobertura: stock / demanda diaria.
+  - reponer: unidades para cubrir DIAS_ENTREGA + DIAS_OBJETIVO de demanda.
+El día actual no entra en la ventana (está incompleto y bajaría la media).
+"""
+import numpy as np
+import pandas as pd
+
+VENTANA_DIAS = 90
+MEDIA_MOVIL_DIAS = 28
+VIDA_MEDIA_DIAS = 14
+DIAS_ENTREGA = 7
+DIAS_OBJETIVO = 30
+
+COLUMNAS_REPOSICION = ["ID", "Caja", "Cantidad", "Punto_Reorden", "Velocidad", "Media_Movil",
+                       "Demanda", "Dias_Cobertura", "Punto_Sugerido", "Reponer"]
+
+
+def matriz_demanda(agregados, hoy, ventana=VENTANA_DIAS):
+    """Unidades vendidas por día (filas) y caja (columnas) en la ventana; 0 los días sin ventas"""
+    dias = pd.date_range(end=pd.Timestamp(hoy).normalize() - pd.Timedelta(days=1), periods=ventana, freq="D")
+    recientes = agregados[(agregados["Dia"] >= dias[0]) & (agregados["Dia"] <= dias[-1])]
+    matriz = recientes.pivot_table(index="Dia", columns="Caja", values="Cantidad", aggfunc="sum", fill_value=0)
+    return matriz.reindex(dias, fill_value=0).astype("float64")
+
+
+def reposicion(agregados, inventario, hoy, ventana=VENTANA_DIAS, media_movil=MEDIA_MOVIL_DIAS,
+               vida_media=VIDA_MEDIA_DIAS, dias_entrega=DIAS_ENTREGA, dias_objetivo=DIAS_OBJETIVO):
+    """Demanda, cobertura y unidades a reponer de cada caja del inventario"""
+    if inventario.empty:
+        return pd.DataFrame(columns=COLUMNAS_REPOSICION)
+    cajas = inventario["Caja"].astype(str)
+    matriz = matriz_demanda(agregados, hoy, ventana).reindex(columns=cajas.unique(), fill_value=0.0)
+    por_caja = pd.DataFrame({
+        "Velocidad": matriz.sum() / ventana,
+        "Media_Movil": matriz.tail(media_movil).mean(),
+        "Demanda": matriz.ewm(halflife=vida_media).mean().iloc[-1],
+    }).reindex(cajas.to_numpy())
+    tabla = inventario[["ID", "Caja", "Cantidad", "Punto_Reorden"]].reset_index(drop=True)
+    demanda = por_caja["Demanda"].to_numpy()
+    stock = tabla["Cantidad"].to_numpy(dtype="float64")
+    for columna in ["Velocidad", "Media_Movil", "Demanda"]:
+        tabla[columna] = por_caja[columna].to_numpy().round(2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tabla["Dias_Cobertura"] = np.where(demanda > 0, stock / demanda, np.inf).round(1)
+    tabla["Punto_Sugerido"] = np.ceil(demanda * dias_entrega).astype("int64")
+    objetivo = np.ceil(demanda * (dias_entrega + dias_objetivo))
+    tabla["Reponer"] = np.maximum(objetivo - stock, 0).astype("int64")
+    return tabla[COLUMNAS_REPOSICION]
@@ -0,0 +1,217 @@
+"""
+Medición de tiempos por ejecución del script de BIODESICION.
+
+Cada ejecución (rerun) de Streamlit crea un Medidor en su hilo:
+  - tramo(nombre) / @medido(nombre): tiempo de una operación (carga,
+    cálculo, escritura); si se repite en la ejecución, se suma.
+  - marca(nombre): fase secuencial; mide el tiempo desde la marca anterior
+    (útil para secciones de la interfaz sin reindentar su código).
+  - importar(módulo): importación diferida de dependencias pesadas
+    (plotly, openpyxl), medida como tramo la primera vez.
+Al terminar, la ejecución se escribe como una línea JSON en un log
+rotativo, del que se calculan percentiles. Opcionalmente se perfila una
+ejecución completa con cProfile.
+"""
+import cProfile
+import functools
+import importlib
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+ACTIVO = os.environ.get("BIODESICION_RENDIMIENTO", "1") != "0"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_RESPALDOS = 3
+
+estado = threading.local()
+
+
+class Medidor:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.ultima_marca = self.inicio
+        self.marcas = {}
+        self.tramos = {}
+        self.perfil = None
+        self.finalizado = False
+
+    @contextmanager
+    def tramo(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tramos[nombre] = self.tramos.get(nombre, 0.0) + time.perf_counter() - inicio
+
+    def marca(self, nombre):
+        ahora = time.perf_counter()
+        self.marcas[nombre] = self.marcas.get(nombre, 0.0) + ahora - self.ultima_marca
+        self.ultima_marca = ahora
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def tabla(self):
+        """Marcas y tramos de esta ejecución en milisegundos"""
+        filas = [("fase", n, s * 1000) for n, s in self.marcas.items()]
+        filas += [("función", n, s * 1000) for n, s in self.tramos.items()]
+        return pd.DataFrame(filas, columns=["Tipo", "Nombre", "ms"])
+
+
+def iniciar(perfilar=False):
+    """Empieza la medición de la ejecución actual (una por hilo del script)"""
+    estado.medidor = Medidor() if ACTIVO or perfilar else None
+    if estado.medidor is not None and perfilar:
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+            estado.medidor.perfil = perfil
+        except ValueError:
+            # Otra sesión ya está perfilando (un solo perfilador por proceso desde Python 3.12)
+            pass
+    return estado.medidor
+
+
+def actual():
+    return getattr(estado, "medidor", None)
+
+
+@contextmanager
+def tramo(nombre):
+    medidor = actual()
+    if medidor is None:
+        yield
+        return
+    with medidor.tramo(nombre):
+        yield
+
+
+def medido(nombre):
+    """Decorador: registra la función como tramo de la ejecución actual"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with tramo(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def marca(nombre):
+    medidor = actual()
+    if medidor is not None:
+        medidor.marca(nombre)
+
+
+def importar(modulo):
+    """
+    Importa un módulo pesado la primera vez que se usa y registra lo que
+    tardó como tramo "importar <módulo>"; después lo toma de sys.modules.
+    """
+    if modulo in sys.modules:
+        return sys.modules[modulo]
+    with tramo(f"importar {modulo}"):
+        return importlib.import_module(modulo)
+
+
+def registro(archivo):
+    """Logger con rotación por tamaño (uno por archivo y proceso)"""
+    logger = logging.getLogger(f"biodesicion.rendimiento.{archivo}")
+    if not logger.handlers:
+        manejador = RotatingFileHandler(archivo, maxBytes=LOG_MAX_BYTES, backupCount=LOG_RESPALDOS,
+                                        encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(manejador)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def finalizar(archivo, **contexto):
+    """
+    Cierra la medición: escribe la línea del log y, si se perfiló,
+    retorna (resumen en texto, archivo .prof en bytes). Solo la primera
+    llamada de la ejecución hace algo; las siguientes retornan None.
+    """
+    medidor = actual()
+    if medidor is None or medidor.finalizado:
+        return None
+    medidor.finalizado = True
+    perfil = None
+    if medidor.perfil is not None:
+        medidor.perfil.disable()
+        perfil = resumen_perfil(medidor.perfil)
+    if ACTIVO:
+        entrada = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            **contexto,
+            "total_ms": round(medidor.total() * 1000, 2),
+            "fases": {n: round(s * 1000, 2) for n, s in medidor.marcas.items()},
+            "funciones": {n: round(s * 1000, 2) for n, s in medidor.tramos.items()},
+        }
+        try:
+            registro(archivo).info(json.dumps(entrada, ensure_ascii=False))
+        except OSError:
+            pass
+    return perfil
+
+
+def resumen_perfil(perfil, lineas=40):
+    """Las funciones con más tiempo acumulado y el perfil completo (.prof)"""
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(lineas)
+    with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as temporal:
+        ruta = temporal.name
+    try:
+        perfil.dump_stats(ruta)
+        with open(ruta, "rb") as f:
+            datos = f.read()
+    finally:
+        os.remove(ruta)
+    return texto.getvalue(), datos
+
+
+def leer_registro(archivo, ultimas=1000):
+    """Últimas ejecuciones registradas (incluye los archivos rotados)"""
+    lineas = []
+    for ruta in [archivo] + [f"{archivo}.{i}" for i in range(1, LOG_RESPALDOS + 1)]:
+        if len(lineas) >= ultimas:
+            break
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                lineas = f.readlines()[-(ultimas - len(lineas)):] + lineas
+    entradas = []
+    for linea in lineas:
+        try:
+            entradas.append(json.loads(linea))
+        except ValueError:
+            continue
+    return entradas
+
+
+def percentiles(archivo, ultimas=1000):
+    """p50/p90/p99 en ms de cada fase y función en las últimas ejecuciones"""
+    filas = []
+    for entrada in leer_registro(archivo, ultimas):
+        filas.append(("total", "total", entrada.get("total_ms", 0.0)))
+        for tipo, clave in [("fase", "fases"), ("función", "funciones")]:
+            filas += [(tipo, nombre, ms) for nombre, ms in entrada.get(clave, {}).items()]
+    if not filas:
+        return pd.DataFrame(columns=["Tipo", "Nombre", "n", "p50", "p90", "p99"])
+    datos = pd.DataFrame(filas, columns=["Tipo", "Nombre", "ms"])
+    grupos = datos.groupby(["Tipo", "Nombre"])["ms"]
+    tabla = grupos.quantile([0.5, 0.9, 0.99]).unstack()
+    tabla.columns = ["p50", "p90", "p99"]
+    tabla.insert(0, "n", grupos.size())
+    return tabla.reset_index().sort_values("p90", ascending=False).round(1)
@@ -0,0 +1,116 @@
+"""
+Abonos a créditos: reparto entre créditos, límites del saldo y eliminación
+de ventas con abonos parciales. Cada prueba corre con CSV, SQLite y Parquet.
+
+    python -m pytest tests
+"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import motor
+
+
+@pytest.fixture(params=["csv", "sqlite", "parquet"])
+def tienda(request, tmp_path, monkeypatch):
+    """Tienda vacía en tmp_path con una caja de 100 unidades a $1.000 y dos clientes"""
+    monkeypatch.setattr(motor, "BACKEND", "sqlite" if request.param == "sqlite" else "csv")
+    monkeypatch.setattr(motor, "VENTAS_FORMATO", "parquet" if request.param == "parquet" else "csv")
+    monkeypatch.chdir(tmp_path)
+    motor.usar_tienda("datos")
+    motor.invalidar_cache(inventario=True, clientes=True, ventas=True, creditos=True)
+    # Como la aplicación al iniciar: la primera carga crea las tablas vacías
+    motor.cargar_datos()
+    assert motor.agregar_caja("A", 100, 1000)
+    assert motor.agregar_cliente("Ana", "1")
+    assert motor.agregar_cliente("Beto", "2")
+    return request.param
+
+
+def vender_a_credito(cliente, cantidad):
+    lineas = pd.DataFrame({"Fecha": [pd.Timestamp(datetime.now().replace(microsecond=0))], "Cliente": [cliente],
+                           "Caja": ["A"], "Cantidad": [cantidad], "Es_Credito": [True]})
+    assert motor.registrar_venta(motor.armar_venta(lineas, motor.cargar_tabla("inventario")))
+
+
+def creditos_de(cliente):
+    creditos = motor.cargar_tabla("creditos")
+    return creditos[creditos["Cliente"] == cliente].sort_values("Monto", ascending=False)
+
+
+def saldo(cliente):
+    """Saldo guardado del cliente; debe coincidir con el calculado desde los créditos"""
+    creditos = motor.cargar_tabla("creditos")
+    guardados = motor.cargar_saldos(creditos).set_index("Cliente")["Saldo"]
+    calculados = motor.saldos_de(creditos)["Saldo"]
+    assert guardados.get(cliente, 0) == calculados.get(cliente, 0)
+    return guardados.get(cliente, 0)
+
+
+def pendiente():
+    return motor.cargar_resumen(motor.cargar_tabla("inventario"), motor.cargar_tabla("creditos"))["credito_pendiente"]
+
+
+def test_abono_parcial_cubre_dos_creditos(tienda):
+    vender_a_credito("Ana", 3)
+    vender_a_credito("Ana", 2)
+    vender_a_credito("Beto", 1)
+
+    assert motor.registrar_abono("Ana", 4000)
+
+    creditos = creditos_de("Ana")
+    assert creditos["Abonado"].tolist() == [3000, 1000]
+    assert creditos["Pagado"].tolist() == [True, False]
+    assert saldo("Ana") == 1000
+    assert saldo("Beto") == 1000
+    assert pendiente() == 2000
+    assert motor.cargar_abonos("Ana")["Monto"].tolist() == [4000]
+
+
+def test_abono_mayor_al_saldo_se_rechaza(tienda):
+    vender_a_credito("Ana", 3)
+    vender_a_credito("Ana", 2)
+
+    assert not motor.registrar_abono("Ana", 5001)
+    assert not motor.registrar_abono("Beto", 1)
+
+    assert creditos_de("Ana")["Abonado"].tolist() == [0, 0]
+    assert saldo("Ana") == 5000
+    assert pendiente() == 5000
+    assert motor.cargar_abonos("Ana").empty
+
+
+def test_abono_igual_al_saldo_paga_todo(tienda):
+    vender_a_credito("Ana", 3)
+    vender_a_credito("Ana", 2)
+
+    assert motor.registrar_abono("Ana", 5000)
+
+    creditos = creditos_de("Ana")
+    assert creditos["Pagado"].all()
+    assert creditos["Abonado"].tolist() == [3000, 2000]
+    assert creditos["Fecha_Pago"].notna().all()
+    assert saldo("Ana") == 0
+    assert pendiente() == 0
+    assert not motor.registrar_abono("Ana", 1)
+
+
+def test_eliminar_venta_con_credito_abonado(tienda):
+    vender_a_credito("Ana", 3)
+    vender_a_credito("Ana", 2)
+    assert motor.registrar_abono("Ana", 1000)
+    assert creditos_de("Ana")["Abonado"].tolist() == [1000, 0]
+
+    ventas = motor.cargar_tabla("ventas")
+    venta_abonada = ventas.loc[ventas["Cantidad"] == 3, "ID"]
+    assert motor.eliminar_ventas(venta_abonada, motor.cargar_tabla("inventario"), ventas,
+                                 motor.cargar_tabla("creditos"))
+
+    creditos = creditos_de("Ana")
+    assert creditos["Monto"].tolist() == [2000]
+    assert creditos["Abonado"].tolist() == [0]
+    assert saldo("Ana") == 2000
+    assert pendiente() == 2000
+    assert motor.cargar_tabla("ventas")["Cantidad"].tolist() == [2]
+    assert motor.cargar_tabla("inventario")["Cantidad"].tolist() == [98]
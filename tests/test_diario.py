@@ -0,0 +1,98 @@
+"""
+Diarios de ventas y créditos: las ventas se anexan al diario, al compactar
+pasan al archivo base sin cambiar sus valores y los anexos de una
+transacción sin confirmar se recortan. Corre con CSV y con Parquet (las
+ventas van a particiones, pero los créditos siguen en su diario).
+
+    python -m pytest tests
+"""
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import motor
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def tienda(request, tmp_path, monkeypatch):
+    """Tienda vacía en tmp_path con la caja "007" y el cliente "007" (ceros a la izquierda)"""
+    monkeypatch.setattr(motor, "BACKEND", "csv")
+    monkeypatch.setattr(motor, "VENTAS_FORMATO", request.param)
+    monkeypatch.chdir(tmp_path)
+    motor.usar_tienda("datos")
+    motor.invalidar_cache(inventario=True, clientes=True, ventas=True, creditos=True)
+    motor.cargar_datos()
+    assert motor.agregar_caja("007", 100, 1000)
+    assert motor.agregar_cliente("007", "1")
+    return request.param
+
+
+def vender(cantidad, credito):
+    lineas = pd.DataFrame({"Fecha": [pd.Timestamp(datetime.now().replace(microsecond=0))], "Cliente": ["007"],
+                           "Caja": ["007"], "Cantidad": [cantidad], "Es_Credito": [credito]})
+    assert motor.registrar_venta(motor.armar_venta(lineas, motor.cargar_tabla("inventario")))
+
+
+def columnas_texto(df):
+    return df.astype({c: str for c in df.columns if df[c].dtype == "category"})
+
+
+def test_compactar_conserva_las_ventas(tienda):
+    vender(3, True)
+    assert motor.compactar_diario()
+    vender(2, True)
+    vender(1, False)
+    ventas = columnas_texto(motor.cargar_tabla("ventas"))
+    creditos = columnas_texto(motor.cargar_tabla("creditos"))
+
+    assert motor.compactar_diario()
+
+    assert not os.path.exists(motor.ruta(motor.VENTAS_DIARIO_FILE))
+    assert not os.path.exists(motor.ruta(motor.CREDITOS_DIARIO_FILE))
+    pd.testing.assert_frame_equal(columnas_texto(motor.cargar_tabla("ventas")), ventas)
+    pd.testing.assert_frame_equal(columnas_texto(motor.cargar_tabla("creditos")), creditos)
+    assert ventas["Cliente"].tolist() == ["007"] * 3
+    assert ventas["Caja"].tolist() == ["007"] * 3
+    saldos = motor.cargar_saldos(motor.cargar_tabla("creditos"))
+    assert saldos["Cliente"].tolist() == ["007"]
+    assert saldos["Saldo"].tolist() == [5000]
+
+
+def test_confirmacion_fallida_deshace_los_anexos(tienda, monkeypatch):
+    vender(3, True)
+    diario = motor.ruta(motor.CREDITOS_DIARIO_FILE)
+    tamaño = os.path.getsize(diario)
+    registrar = motor.registrar_transaccion
+
+    def disco_lleno(transaccion):
+        if "truncar" not in transaccion:
+            raise OSError("No queda espacio en el disco")
+        registrar(transaccion)
+
+    monkeypatch.setattr(motor, "registrar_transaccion", disco_lleno)
+    lineas = pd.DataFrame({"Fecha": [pd.Timestamp(datetime.now().replace(microsecond=0))], "Cliente": ["007"],
+                           "Caja": ["007"], "Cantidad": [2], "Es_Credito": [True]})
+    assert not motor.registrar_venta(motor.armar_venta(lineas, motor.cargar_tabla("inventario")))
+
+    assert not os.path.exists(motor.ruta(motor.TRANSACCION_FILE))
+    assert os.path.getsize(diario) == tamaño
+    assert motor.cargar_tabla("ventas")["Cantidad"].tolist() == [3]
+    assert motor.cargar_tabla("creditos")["Monto"].tolist() == [3000]
+    assert motor.cargar_tabla("inventario")["Cantidad"].tolist() == [97]
+
+
+def test_transaccion_sin_confirmar_se_deshace_al_tomar_el_bloqueo(tienda):
+    vender(3, True)
+    diario = motor.ruta(motor.CREDITOS_DIARIO_FILE)
+    tamaño = os.path.getsize(diario)
+    # Un proceso que cayó después de anexar y antes de confirmar
+    motor.registrar_transaccion({"reemplazos": [], "borrados": [], "truncar": {diario: tamaño}})
+    with open(diario, "a", encoding="utf-8") as f:
+        f.write("007,9000,2026-01-01 00:00:00,False,,99,0\n")
+
+    with motor.bloqueo_datos():
+        assert not os.path.exists(motor.ruta(motor.TRANSACCION_FILE))
+        assert os.path.getsize(diario) == tamaño
+    assert motor.cargar_tabla("creditos")["Monto"].tolist() == [3000]
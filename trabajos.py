@@ -0,0 +1,129 @@
+"""
+Trabajos en segundo plano para BIODESICION.
+
+Los reportes pesados se ejecutan en un grupo de hilos fuera del hilo del
+script de Streamlit, así la interfaz sigue respondiendo. Cada trabajo
+informa su avance (0 a 1) y, al hacerlo, revisa si se pidió cancelarlo.
+El resultado queda en el registro para descargarlo después; un trabajo
+con la misma clave que uno ya terminado reutiliza su resultado. Varias
+sesiones pueden compartir un trabajo: cada una lo suelta por separado y
+solo se cancela y se quita cuando ninguna lo tiene.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+LISTO = "listo"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+
+class Cancelado(Exception):
+    """El trabajo fue cancelado por el usuario"""
+
+
+class Trabajo:
+    def __init__(self, nombre, clave=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.nombre = nombre
+        self.clave = clave
+        self.estado = PENDIENTE
+        self.avance = 0.0
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.terminado_en = None
+        self.cancelacion = threading.Event()
+        # Sesiones que lo muestran (ver Ejecutor.descartar)
+        self.sesiones = set()
+
+    def informar(self, avance):
+        """Actualiza el avance; lanza Cancelado si se pidió cancelar"""
+        if self.cancelacion.is_set():
+            raise Cancelado()
+        self.avance = min(max(float(avance), 0.0), 1.0)
+
+    def cancelar(self):
+        self.cancelacion.set()
+
+    @property
+    def terminado(self):
+        return self.estado in (LISTO, ERROR, CANCELADO)
+
+    @property
+    def duracion(self):
+        return (self.terminado_en or time.time()) - self.creado
+
+
+class Ejecutor:
+    """Grupo de hilos con registro de trabajos (compartido entre sesiones)"""
+
+    def __init__(self, hilos=2, max_terminados=20):
+        self.grupo = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="trabajo")
+        self.max_terminados = max_terminados
+        self.trabajos = {}
+        self.candado = threading.Lock()
+
+    def enviar(self, nombre, funcion, *args, clave=None, sesion=None, **kwargs):
+        """
+        Programa funcion(trabajo, *args, **kwargs) y retorna el Trabajo. Si
+        ya hay uno con la misma clave en curso o terminado bien, se reutiliza.
+        sesion: quien lo pide; queda entre las que tienen el trabajo.
+        """
+        with self.candado:
+            if clave is not None:
+                for trabajo in self.trabajos.values():
+                    if trabajo.clave == clave and trabajo.estado in (PENDIENTE, EJECUTANDO, LISTO):
+                        if sesion is not None:
+                            trabajo.sesiones.add(sesion)
+                        return trabajo
+            trabajo = Trabajo(nombre, clave)
+            if sesion is not None:
+                trabajo.sesiones.add(sesion)
+            self.trabajos[trabajo.id] = trabajo
+            self.podar()
+        self.grupo.submit(self.ejecutar, trabajo, funcion, args, kwargs)
+        return trabajo
+
+    def ejecutar(self, trabajo, funcion, args, kwargs):
+        try:
+            if trabajo.cancelacion.is_set():
+                raise Cancelado()
+            trabajo.estado = EJECUTANDO
+            trabajo.resultado = funcion(trabajo, *args, **kwargs)
+            trabajo.avance = 1.0
+            trabajo.estado = LISTO
+        except Cancelado:
+            trabajo.estado = CANCELADO
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        finally:
+            trabajo.terminado_en = time.time()
+
+    def obtener(self, trabajo_id):
+        return self.trabajos.get(trabajo_id)
+
+    def descartar(self, trabajo_id, sesion=None):
+        """
+        La sesión suelta el trabajo. Si ninguna otra lo tiene (o sin sesion),
+        se cancela (si sigue en curso) y se quita del registro.
+        """
+        with self.candado:
+            trabajo = self.trabajos.get(trabajo_id)
+            if trabajo is None:
+                return
+            trabajo.sesiones.discard(sesion)
+            if sesion is not None and trabajo.sesiones:
+                return
+            del self.trabajos[trabajo_id]
+        trabajo.cancelar()
+
+    def podar(self):
+        """Quita los trabajos terminados más antiguos (con el candado tomado)"""
+        terminados = sorted((t for t in self.trabajos.values() if t.terminado), key=lambda t: t.creado)
+        for trabajo in terminados[:max(len(terminados) - self.max_terminados, 0)]:
+            del self.trabajos[trabajo.id]